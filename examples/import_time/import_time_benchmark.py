@@ -0,0 +1,116 @@
+"""
+Measures how long importing the finetuna entry points takes in a fresh interpreter,
+and which heavy optional dependencies each of them pulls in.
+
+usage: python import_time_benchmark.py [--repeats 5] [--importtime] [--check]
+
+With --check the script exits with an error if any of the modules (e.g. finetuna.run_al) loads a heavy dependency.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "finetuna.run_al",
+    "finetuna.online_learner.online_learner",
+    "finetuna.online_learner.delta_learner",
+    "finetuna.offline_learner.offline_learner",
+    "finetuna.atomistic_methods",
+    "finetuna.utils",
+]
+
+HEAVY_DEPENDENCIES = [
+    "torch",
+    "ocpmodels",
+    "wandb",
+    "pymongo",
+    "pymatgen",
+    "vasp_interactive",
+    "spglib",
+    "yaml",
+    "ase.calculators.vasp",
+    "ase.calculators.espresso",
+    "ase.calculators.socketio",
+]
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+end = time.perf_counter()
+heavy = [name for name in {heavy} if name in sys.modules]
+print(end - start, ",".join(heavy))
+"""
+
+
+def time_import(module):
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            SCRIPT.format(module=module, heavy=HEAVY_DEPENDENCIES),
+        ],
+        text=True,
+    )
+    seconds, _, heavy = output.strip().partition(" ")
+    return float(seconds), heavy
+
+
+def print_importtime(module, top=15):
+    """
+    Prints the slowest imports (cumulative time) reported by python -X importtime for module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.strip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print("    %8.1f ms  %s" % (cumulative / 1000, name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help="also print the slowest imports of every module",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with an error if any module loads a heavy dependency",
+    )
+    args = parser.parse_args()
+
+    failed = []
+
+    for module in MODULES:
+        try:
+            times = []
+            for _ in range(args.repeats):
+                seconds, heavy = time_import(module)
+                times.append(seconds)
+        except subprocess.CalledProcessError:
+            print("%-45s import failed" % module)
+            failed.append(module)
+            continue
+        if heavy:
+            failed.append(module)
+        print(
+            "%-45s median %.3f s (min %.3f s)  heavy dependencies loaded: %s"
+            % (module, statistics.median(times), min(times), heavy or "none")
+        )
+        if args.importtime:
+            print_importtime(module)
+
+    if args.check and failed:
+        sys.exit("heavy dependencies loaded or import failed: " + ", ".join(failed))
@@ -1,6 +1,6 @@
 import ase
 import ase.io
-from ase.neb import SingleCalculatorNEB
+from ase.neb import NEB, SingleCalculatorNEB
 from ase.optimize import BFGS
 from ase.optimize.minimahopping import MinimaHopping
 import copy
@@ -12,10 +12,19 @@ import os
 from ase.optimize import QuasiNewton
 from ase.parallel import paropen, world
 from ase.md import MDLogger
+from ase.calculators.singlepoint import SinglePointCalculator
+from concurrent.futures import ThreadPoolExecutor
+from finetuna.traj_io import ChunkedTrajectoryWriter, open_trajectory
 
 
 class NEBcalc:
-    def __init__(self, starting_images, intermediate_samples=3):
+    def __init__(
+        self,
+        starting_images,
+        intermediate_samples=3,
+        endpoint_calcs=None,
+        endpoint_cache=None,
+    ):
         """
         Computes a NEB given an initial and final image.
 
@@ -24,10 +33,20 @@ class NEBcalc:
         starting_images: list. Initial and final images to be used for the NEB.
 
         intermediate_samples: int. Number of intermediate samples to be used in constructing the NEB
+
+        endpoint_calcs: list. Optional separate calculators (e.g. learners) for the initial and final image,
+        the endpoints are then relaxed concurrently in two threads.
+        Otherwise calculators implementing calculate_band (e.g. NEBLearner) relax both endpoints in lockstep
+        with batched predictions, and other calculators relax them one after the other.
+
+        endpoint_cache: EndpointCache. Optional cache of relaxed endpoints, endpoints found in it are not relaxed again
+        and newly relaxed endpoints are added to it.
         """
 
         self.starting_images = copy.deepcopy(starting_images)
         self.intermediate_samples = intermediate_samples
+        self.endpoint_calcs = endpoint_calcs
+        self.endpoint_cache = endpoint_cache
 
     def run(self, calc, filename):
         """
@@ -37,42 +56,96 @@ class NEBcalc:
         calc: object. Calculator to be used to run method.
         filename: str. Label to save generated trajectory files."""
 
-        initial = self.starting_images[0].copy()
-        final = self.starting_images[-1].copy()
         # Relax initial and final images
-        ml_initial = initial
-        ml_initial.set_calculator(calc)
-        ml_final = final
-        ml_final.set_calculator(calc)
-        print("BUILDING INITIAL")
-        qn = BFGS(
-            ml_initial, trajectory="initial.traj", logfile="initial_relax_log.txt"
-        )
-        qn.run(fmax=0.01, steps=100)
-        print("BUILDING FINAL")
-        qn = BFGS(ml_final, trajectory="final.traj", logfile="final_relax_log.txt")
-        qn.run(fmax=0.01, steps=100)
+        ml_initial, ml_final = self.relax_endpoints(calc)
         initial = ml_initial.copy()
         final = ml_final.copy()
 
-        initial.set_calculator(calc)
-        final.set_calculator(calc)
-
-        images = [initial]
-        for i in range(self.intermediate_samples):
-            image = initial.copy()
-            image.set_calculator(calc)
-            images.append(image)
-        images.append(final)
-
-        print("NEB BEING BUILT")
-        neb = SingleCalculatorNEB(images)
+        # calculators evaluating the whole band at once (e.g. NEBLearner) are given the interior images together,
+        # the relaxed endpoints keep their results as singlepoints
+        if hasattr(calc, "calculate_band"):
+            for image, ml_image in [(initial, ml_initial), (final, ml_final)]:
+                image.calc = SinglePointCalculator(
+                    image,
+                    energy=ml_image.get_potential_energy(),
+                    forces=ml_image.get_forces(apply_constraint=False),
+                )
+            images = [initial]
+            for i in range(self.intermediate_samples):
+                images.append(initial.copy())
+            images.append(final)
+
+            print("NEB BEING BUILT")
+            neb = BatchedNEB(images, calc)
+        else:
+            initial.set_calculator(calc)
+            final.set_calculator(calc)
+
+            images = [initial]
+            for i in range(self.intermediate_samples):
+                image = initial.copy()
+                image.set_calculator(calc)
+                images.append(image)
+            images.append(final)
+
+            print("NEB BEING BUILT")
+            neb = SingleCalculatorNEB(images)
         neb.interpolate()
         print("NEB BEING OPTIMISED")
         opti = BFGS(neb, trajectory=filename + ".traj", logfile="al_neb_log.txt")
         opti.run(fmax=0.01, steps=100)
         print("NEB DONE")
 
+    def relax_endpoints(self, calc):
+        """
+        Returns the relaxed initial and final image, with their calculators (or singlepoints) attached.
+        """
+        endpoints = [self.starting_images[0].copy(), self.starting_images[-1].copy()]
+        labels = ["initial", "final"]
+        relaxed = [None, None]
+        if self.endpoint_cache is not None:
+            relaxed = [self.endpoint_cache.get(endpoint) for endpoint in endpoints]
+            for label, image in zip(labels, relaxed):
+                if image is not None:
+                    print("USING CACHED " + label.upper())
+        pending = [i for i in range(2) if relaxed[i] is None]
+
+        if self.endpoint_calcs is not None and len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = [
+                    executor.submit(
+                        relax_endpoint,
+                        endpoints[i].copy(),
+                        self.endpoint_calcs[i],
+                        labels[i],
+                    )
+                    for i in pending
+                ]
+            for i, future in zip(pending, futures):
+                relaxed[i] = future.result()
+        elif hasattr(calc, "calculate_band") and len(pending) > 1:
+            print("BUILDING INITIAL AND FINAL")
+            relaxed_images = relax_endpoints_batched(
+                [endpoints[i].copy() for i in pending],
+                calc,
+                [labels[i] for i in pending],
+            )
+            for i, image in zip(pending, relaxed_images):
+                relaxed[i] = image
+        else:
+            for i in pending:
+                endpoint_calc = calc
+                if self.endpoint_calcs is not None:
+                    endpoint_calc = self.endpoint_calcs[i]
+                relaxed[i] = relax_endpoint(
+                    endpoints[i].copy(), endpoint_calc, labels[i]
+                )
+
+        if self.endpoint_cache is not None:
+            for i in pending:
+                self.endpoint_cache.put(endpoints[i], relaxed[i])
+        return relaxed
+
     def get_trajectory(self, filename):
         atom_list = []
         trajectory = ase.io.Trajectory(filename + ".traj")
@@ -83,8 +156,74 @@ class NEBcalc:
         return atom_list
 
 
+def relax_endpoint(atoms, calc, label):
+    """Relax a NEB endpoint with calc"""
+    print("BUILDING " + label.upper())
+    atoms.set_calculator(calc)
+    qn = BFGS(atoms, trajectory=label + ".traj", logfile=label + "_relax_log.txt")
+    qn.run(fmax=0.01, steps=100)
+    return atoms
+
+
+def relax_endpoints_batched(images, band_calc, labels, fmax=0.01, steps=100):
+    """
+    Relax several NEB endpoints in lockstep, calculating all unconverged endpoints
+    with one band_calc.calculate_band(images) call per step.
+    """
+    optimizers = []
+    for image, label in zip(images, labels):
+        optimizer = BFGS(
+            image, trajectory=label + ".traj", logfile=label + "_relax_log.txt"
+        )
+        optimizer.fmax = fmax
+        optimizers.append(optimizer)
+
+    active = list(range(len(images)))
+    while active:
+        band_calc.calculate_band([images[i] for i in active])
+        still_active = []
+        for i in active:
+            optimizer = optimizers[i]
+            forces = images[i].get_forces()
+            optimizer.log(forces)
+            optimizer.call_observers()
+            if optimizer.converged(forces) or optimizer.nsteps >= steps:
+                continue
+            optimizer.step(forces)
+            optimizer.nsteps += 1
+            still_active.append(i)
+        active = still_active
+    return images
+
+
+class BatchedNEB(NEB):
+    """
+    NEB whose interior images are all calculated by one call of band_calc.calculate_band(images)
+    before the forces of the band are projected, instead of one image at a time.
+    """
+
+    def __init__(self, images, band_calc, **kwargs):
+        NEB.__init__(self, images, **kwargs)
+        self.band_calc = band_calc
+
+    def get_forces(self):
+        self.band_calc.calculate_band(self.images[1:-1])
+        return NEB.get_forces(self)
+
+
 class MDsimulate:
-    def __init__(self, thermo_ensemble, dt, temp, count, initial_geometry=None):
+    def __init__(
+        self,
+        thermo_ensemble,
+        dt,
+        temp,
+        count,
+        initial_geometry=None,
+        traj_format="traj",
+        traj_interval=1,
+        chunk_size=1000,
+        print_interval=10,
+    ):
         """
         Parameters
         ----------
@@ -92,6 +231,11 @@ class MDsimulate:
         dt: md time step (fs)
         temp: temperature (K)
         initial_slab: initial geometry to use, if None - will be generated
+        traj_format: "traj" for an ase trajectory (filename.traj),
+            "chunked" for a buffered ChunkedTrajectoryWriter written in the background (filename.chunks)
+        traj_interval: write every traj_interval-th step to the trajectory
+        chunk_size: frames per chunk of the chunked trajectory
+        print_interval: print the energies every print_interval steps, None to not print
         """
         self.ensemble = thermo_ensemble
         self.dt = dt
@@ -101,6 +245,10 @@ class MDsimulate:
             raise Exception("Initial structure not provided!")
         else:
             self.starting_geometry = initial_geometry
+        self.traj_format = traj_format
+        self.traj_interval = traj_interval
+        self.chunk_size = chunk_size
+        self.print_interval = print_interval
 
     def run(self, calc, filename):
         slab = self.starting_geometry.copy()
@@ -115,10 +263,8 @@ class MDsimulate:
             )
         elif self.ensemble == "langevin":
             dyn = Langevin(slab, self.dt * units.fs, self.temp * units.kB, 0.002)
-        traj = ase.io.Trajectory(
-            filename + ".traj", "w", slab, properties=["energy", "forces"]
-        )
-        dyn.attach(traj.write, interval=1)
+        traj = open_trajectory_writer(filename, slab, self.traj_format, self.chunk_size)
+        dyn.attach(traj.write, interval=self.traj_interval)
         try:
             fixed_atoms = len(slab.constraints[0].get_indices())
         except Exception:
@@ -134,24 +280,41 @@ class MDsimulate:
                 "Etot = %.3feV" % (epot, ekin, ekin / (1.5 * units.kB), epot + ekin)
             )
 
-        if printenergy:
-            dyn.attach(printenergy, interval=10)
-        dyn.run(self.count)
+        if self.print_interval is not None:
+            dyn.attach(printenergy, interval=self.print_interval)
+        try:
+            dyn.run(self.count)
+        finally:
+            traj.close()
+            # frames still buffered by learners batching their queries (e.g. MDLearner) are queried and trained on
+            if hasattr(calc, "flush_queries"):
+                calc.flush_queries()
 
     def get_trajectory(self, filename):
-        trajectory = ase.io.Trajectory(filename + ".traj")
-        return trajectory
+        return open_trajectory(filename, self.traj_format)
 
 
 class Relaxation:
     def __init__(
-        self, initial_geometry, optimizer, fmax=0.05, steps=None, maxstep=None
+        self,
+        initial_geometry,
+        optimizer,
+        fmax=0.05,
+        steps=None,
+        maxstep=None,
+        traj_format="traj",
+        chunk_size=1000,
     ):
         self.initial_geometry = initial_geometry
         self.optimizer = optimizer
         self.fmax = fmax
         self.steps = steps
         self.maxstep = maxstep
+        # "traj" for an ase trajectory, "chunked" for a buffered ChunkedTrajectoryWriter (see MDsimulate)
+        self.traj_format = traj_format
+        self.chunk_size = chunk_size
+        self.images = None
+        self.hessian = None
 
     def run(
         self,
@@ -161,15 +324,51 @@ class Relaxation:
         max_parent_calls=None,
         check_final=False,
         online_ml_fmax=None,
+        initial_structure=None,
+        hessian=None,
+        store_images=False,
     ):
-        structure = self.initial_geometry.copy()
+        """
+        Runs the relaxation with calc, writing the trajectory to filename.traj
+        (or filename.chunks for the chunked trajectory format).
+
+        initial_structure and hessian warm start the relaxation from another structure than initial_geometry
+        and, for optimizers keeping a hessian (BFGS), from a previous hessian, e.g. the hessian attribute
+        left by the last run.
+        If store_images is True, every step is also kept in memory as a singlepoint in the images attribute.
+        """
+        if initial_structure is None:
+            initial_structure = self.initial_geometry
+        structure = initial_structure.copy()
         structure.set_calculator(calc)
-        if self.maxstep is not None:
-            dyn = self.optimizer(
-                structure, maxstep=self.maxstep, trajectory="{}.traj".format(filename)
+        chunked_traj = None
+        trajectory = "{}.traj".format(filename)
+        if self.traj_format == "chunked":
+            trajectory = None
+        elif self.traj_format != "traj":
+            raise ValueError(
+                "invalid trajectory format given (" + str(self.traj_format) + ")"
             )
+        if self.maxstep is not None:
+            dyn = self.optimizer(structure, maxstep=self.maxstep, trajectory=trajectory)
         else:
-            dyn = self.optimizer(structure, trajectory="{}.traj".format(filename))
+            dyn = self.optimizer(structure, trajectory=trajectory)
+        if trajectory is None:
+            chunked_traj = ChunkedTrajectoryWriter(
+                filename + ".chunks", structure, chunk_size=self.chunk_size
+            )
+            dyn.attach(chunked_traj.write, 1)
+
+        if hessian is not None:
+            # with r0 at the starting positions the first update of the hessian is skipped
+            dyn.H = hessian.copy()
+            dyn.r0 = structure.get_positions().ravel()
+            dyn.f0 = np.zeros(3 * len(structure))
+
+        self.images = None
+        if store_images:
+            self.images = []
+            dyn.attach(store_image, 1, structure, self.images)
 
         if replay_traj is not False:
             if replay_traj is True:
@@ -201,11 +400,42 @@ class Relaxation:
             dyn.ml_fmax = online_ml_fmax
             dyn.attach(set_online_ml_fmax, 1, calc, dyn)
 
-        dyn.run(fmax=self.fmax, steps=self.steps)
+        try:
+            dyn.run(fmax=self.fmax, steps=self.steps)
+        finally:
+            if chunked_traj is not None:
+                chunked_traj.close()
+        self.hessian = getattr(dyn, "H", None)
 
     def get_trajectory(self, filename):
-        trajectory = ase.io.Trajectory(filename + ".traj")
-        return trajectory
+        return open_trajectory(filename, self.traj_format)
+
+
+def open_trajectory_writer(filename, atoms, traj_format="traj", chunk_size=1000):
+    """
+    Opens a trajectory writer for filename, an ase Trajectory (filename.traj)
+    or a ChunkedTrajectoryWriter (filename.chunks).
+    """
+    if traj_format == "chunked":
+        return ChunkedTrajectoryWriter(
+            filename + ".chunks", atoms, chunk_size=chunk_size
+        )
+    elif traj_format == "traj":
+        return ase.io.Trajectory(
+            filename + ".traj", "w", atoms, properties=["energy", "forces"]
+        )
+    raise ValueError("invalid trajectory format given (" + str(traj_format) + ")")
+
+
+def store_image(atoms, images):
+    """Keep a singlepoint copy of the current step"""
+    image = atoms.copy()
+    image.calc = SinglePointCalculator(
+        image,
+        energy=atoms.get_potential_energy(),
+        forces=atoms.get_forces(apply_constraint=False),
+    )
+    images.append(image)
 
 
 def set_online_ml_fmax(calc, optimizer):
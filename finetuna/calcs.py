@@ -3,14 +3,15 @@ from ase.calculators.mixing import LinearCombinationCalculator
 from ase.calculators.calculator import Calculator
 from ase.calculators.calculator import PropertyNotImplementedError
 import copy
+import threading
 import numpy as np
-from finetuna.ml_potentials.finetuner_calc import FinetunerCalc
+from collections import OrderedDict
 
 
 class DeltaCalc(LinearCombinationCalculator):
     implemented_properties = ["energy", "forces"]
 
-    def __init__(self, calcs, mode, refs, atoms=None):
+    def __init__(self, calcs, mode, refs, atoms=None, base_cache=None):
         """Implementation of sum of calculators.
 
         calcs: list
@@ -28,6 +29,10 @@ class DeltaCalc(LinearCombinationCalculator):
         atoms: Atoms object
             Optional :class:`~ase.Atoms` object to which the calculator will
             be attached.
+        base_cache: ResultCache
+            Optional cache of the base Calculator results by geometry,
+            share it between delta calcs using the same base Calculator
+            so every geometry is evaluated only once by the base Calculator.
         """
         if mode == "sub":
             weights = [1, -1]
@@ -56,6 +61,11 @@ class DeltaCalc(LinearCombinationCalculator):
         self.parent_results = calcs[0].results
         self.base_results = calcs[1].results
         self.force_calls = 0
+        if base_cache is None:
+            base_cache = ResultCache()
+        self.base_cache = base_cache
+        # energy offset of the references, computed on first use
+        self.ref_offset = None
 
     def calculate(self, atoms=None, properties=["energy"], system_changes=all_changes):
         """Calculates the desired property.
@@ -68,53 +78,63 @@ class DeltaCalc(LinearCombinationCalculator):
             raise ValueError("calc[0] and refs[0] calc are the same")
         if self.calcs[1] is self.refs[1].calc:
             raise ValueError("calc[1] and refs[1] calc are the same")
-        if self.diff_ref:
-            if atoms is not None:
-                self.atoms = atoms.copy()
-            atoms_list = [atoms, atoms[self.ref1_idx]]
-            for atoms, calc in zip(atoms_list, self.calcs):
-                if calc.calculation_required(atoms, ["energy", "forces"]):
-                    calc.calculate(atoms, ["energy", "forces"], system_changes)
-            self.results["energy"] = (
-                self.calcs[0].results["energy"] - self.calcs[1].results["energy"]
-            )
-
-        else:
-            super().calculate(atoms, properties, system_changes)
+        Calculator.calculate(self, atoms, properties, system_changes)
+        if self.calcs[0].calculation_required(atoms, ["energy", "forces"]):
+            self.calcs[0].calculate(atoms, ["energy", "forces"], system_changes)
         self.parent_results = self.calcs[0].results
-        self.base_results = self.calcs[1].results
         if self.diff_ref:
+            self.base_results = self.get_base_results(
+                atoms[self.ref1_idx], system_changes
+            )
             zeros = np.zeros(self.parent_results["forces"].shape)
             zeros[self.ref1_idx] = self.base_results["forces"]
             self.base_results["forces"] = zeros
-            properties = ["energy"]
-        shared_properties = list(
-            set(self.parent_results).intersection(self.base_results)
-        )
-        for w, calc in zip(self.weights, self.calcs):
+        else:
+            self.base_results = self.get_base_results(atoms, system_changes)
+
+        self.results = {}
+        shared_properties = set(self.parent_results).intersection(self.base_results)
+        for w, results in zip(self.weights, [self.parent_results, self.base_results]):
             for k in shared_properties:
-                if k not in properties:
-                    if k not in self.results:
-                        self.results[k] = w * calc.results[k]
-                    else:
-                        self.results[k] += w * calc.results[k]
+                if k not in self.results:
+                    self.results[k] = w * results[k]
+                else:
+                    self.results[k] += w * results[k]
+        if self.diff_ref:
+            self.results["energy"] = (
+                self.parent_results["energy"] - self.base_results["energy"]
+            )
 
         if "energy" in self.results:
+            self.results["energy"] += self.get_ref_offset()
+        self.force_calls += 1
+
+    def get_base_results(self, atoms, system_changes):
+        """
+        Returns a copy of the base Calculator results for atoms, from the base cache if that geometry was evaluated before.
+        """
+        results = self.base_cache.get(atoms)
+        if results is None:
+            if self.calcs[1].calculation_required(atoms, ["energy", "forces"]):
+                self.calcs[1].calculate(atoms, ["energy", "forces"], system_changes)
+            results = self.calcs[1].results
+            self.base_cache.put(atoms, results)
+        return {k: copy.copy(v) for k, v in results.items()}
+
+    def get_ref_offset(self):
+        """
+        Returns the energy offset between the references that is added to the delta energy.
+        """
+        if self.ref_offset is None:
+            parent_ref_energy = self.refs[0].get_potential_energy(
+                apply_constraint=False
+            )
+            base_ref_energy = self.refs[1].get_potential_energy(apply_constraint=False)
             if self.mode == "sub":
-                self.results["energy"] -= self.refs[0].get_potential_energy(
-                    apply_constraint=False
-                )
-                self.results["energy"] += self.refs[1].get_potential_energy(
-                    apply_constraint=False
-                )
+                self.ref_offset = base_ref_energy - parent_ref_energy
             else:
-                self.results["energy"] -= self.refs[1].get_potential_energy(
-                    apply_constraint=False
-                )
-                self.results["energy"] += self.refs[0].get_potential_energy(
-                    apply_constraint=False
-                )
-        self.force_calls += 1
+                self.ref_offset = parent_ref_energy - base_ref_energy
+        return self.ref_offset
 
     def get_property(self, name, atoms=None, allow_calculation=True):
         if name not in self.implemented_properties:
@@ -149,6 +169,71 @@ class DeltaCalc(LinearCombinationCalculator):
         super(LinearCombinationCalculator, self).reset()
 
 
+class ResultCache:
+    """
+    Least recently used cache of calculator results, keyed by the exact geometry
+    (atomic numbers, positions, cell and pbc) they were calculated for.
+    Copies of the cache (e.g. of calculators copied to run concurrently) share the same entries.
+
+    Parameters
+    ----------
+    max_size: int
+        maximum number of geometries to keep results for
+    """
+
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def get_key(atoms):
+        return (
+            atoms.get_atomic_numbers().tobytes(),
+            atoms.get_positions().tobytes(),
+            atoms.cell.array.tobytes(),
+            atoms.pbc.tobytes(),
+        )
+
+    def get(self, atoms):
+        """
+        Returns the cached results for the geometry of atoms, or None.
+        """
+        key = self.get_key(atoms)
+        with self.lock:
+            results = self.entries.get(key, None)
+            if results is not None:
+                self.entries.move_to_end(key)
+        return results
+
+    def put(self, atoms, results):
+        """
+        Stores a copy of results for the geometry of atoms, dropping the least recently used geometry if full.
+        """
+        key = self.get_key(atoms)
+        results = {k: copy.copy(v) for k, v in results.items()}
+        with self.lock:
+            self.entries[key] = results
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
 class CounterCalc(Calculator):
     implemented_properties = ["energy", "forces", "uncertainty"]
     """
@@ -188,13 +273,11 @@ class Dummy(Calculator):
         atoms.info["max_force_stds"] = np.nanmax(self.results["force_stds"])
 
 
-class ClonedFinetunerCalc(FinetunerCalc):
-    def __init__(self, finetuner_calc: FinetunerCalc):
-        self.finetuner_calc = finetuner_calc
-        FinetunerCalc.__init__(
-            self, finetuner_calc.checkpoint_path, finetuner_calc.mlp_params
-        )
-        self.ml_model = True
+def __getattr__(name):
+    # ClonedFinetunerCalc lives with FinetunerCalc, which imports torch and ocpmodels,
+    # so it is only imported once it is used
+    if name == "ClonedFinetunerCalc":
+        from finetuna.ml_potentials.finetuner_calc import ClonedFinetunerCalc
 
-    def load_trainer(self):
-        self.trainer = self.finetuner_calc.trainer
+        return ClonedFinetunerCalc
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
@@ -0,0 +1,307 @@
+import argparse
+import copy
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from ase.io import Trajectory
+from finetuna.job_creator import create_job_dir, merge_dict, write_job_config
+
+# (section, key) of the config entries holding file paths, relative paths are resolved against the base config directory
+CONFIG_PATHS = [
+    ("links", "traj"),
+    ("links", "images_path"),
+    ("links", "incar"),
+    ("links", "kpoints"),
+    ("ocp", "checkpoint_path"),
+    ("ocp", "checkpoint_path_list"),
+    ("base_calc", "model_path"),
+    ("base_calc", "checkpoint_path"),
+]
+
+
+class Campaign:
+    """
+    Runs a sweep of active_learning jobs on the local node, as an alternative to create_job and kubectl.
+
+    Every job is a deep copy of the base config merged with one entry of param_overrides,
+    run on one of the structures (if given, the sweep is all override/structure combinations).
+    Each job runs active_learning in its own subprocess, with its own directory
+    campaign_dir/job_name as working directory, so no job (and not the campaign) changes the working directory.
+    Relative file paths of the job configs (see CONFIG_PATHS) are made absolute when the jobs are built,
+    relative to the directory of the base config file (or the working directory if the base config is a dict).
+
+    Concurrency is limited by the cores of the node: a job holds cores_per_job cores
+    (or the "cores" entry of its overrides, OMP/MKL threads are set to match) while it runs.
+    Jobs using a parent calc other than emt additionally hold one of parent_slots slots (if given),
+    e.g. to limit the number of concurrent VASP jobs to the available licenses or memory.
+
+    The status of every job (pending, running, done or failed, with exit code and wall time)
+    is kept in the ledger campaign_dir/campaign_ledger.json, which is rewritten after every change.
+    Running the same campaign again skips the jobs that are done and reruns the others,
+    e.g. after the campaign was interrupted.
+
+    Parameters
+    ----------
+    base_config: dict or str
+        config (or path to a config yml) every job starts from
+
+    param_overrides: list[dict]
+        overrides of the base config, one per job (per structure),
+        the job name is taken from learner: wandb_init: name if given
+
+    structures: list[str or Atoms or list[Atoms]]
+        trajectory paths (or images written to a trajectory in the job directory) the jobs start from,
+        if None the links: traj of the configs are used
+
+    campaign_dir: str
+        directory the job directories and the ledger are created in
+
+    cores_per_job: int
+        cores a job holds while running
+
+    total_cores: int
+        cores available to the campaign, defaults to all cores of the node
+
+    parent_slots: int
+        maximum number of jobs with a parent calc other than emt running at once, unlimited if None
+    """
+
+    def __init__(
+        self,
+        base_config,
+        param_overrides,
+        structures=None,
+        campaign_dir="campaign",
+        cores_per_job=1,
+        total_cores=None,
+        parent_slots=None,
+    ):
+        self.config_dir = os.getcwd()
+        if isinstance(base_config, str):
+            self.config_dir = os.path.dirname(os.path.abspath(base_config))
+            with open(base_config, "r") as config_file:
+                base_config = yaml.safe_load(config_file)
+        self.base_config = base_config
+        self.campaign_dir = os.path.abspath(campaign_dir)
+        self.cores_per_job = cores_per_job
+        self.total_cores = total_cores if total_cores is not None else os.cpu_count()
+        os.makedirs(self.campaign_dir, exist_ok=True)
+
+        self.jobs = self.build_jobs(param_overrides, structures)
+
+        self.ledger_lock = threading.Lock()
+        self.ledger_path = os.path.join(self.campaign_dir, "campaign_ledger.json")
+        self.ledger = self.load_ledger()
+
+        self.cores_condition = threading.Condition()
+        self.free_cores = self.total_cores
+        if parent_slots is not None:
+            self.parent_slots = threading.Semaphore(parent_slots)
+        else:
+            self.parent_slots = None
+
+    def build_jobs(self, param_overrides, structures):
+        """
+        Returns the dict of jobs (name: {"params", "structure", "cores"}) of the sweep, in sweep order.
+        """
+        if structures is None:
+            structures = [None]
+        jobs = {}
+        for i, job_overrides in enumerate(param_overrides):
+            for j, structure in enumerate(structures):
+                overrides = copy.deepcopy(job_overrides)
+                cores = overrides.pop("cores", self.cores_per_job)
+                params = merge_dict(copy.deepcopy(self.base_config), overrides)
+                self.resolve_paths(params)
+                name = (
+                    params.get("learner", {})
+                    .get("wandb_init", {})
+                    .get("name", "job_" + str(i))
+                )
+                if len(structures) > 1:
+                    name += "_structure_" + str(j)
+                if name in jobs:
+                    raise ValueError("duplicate job name (" + name + ") in sweep")
+                if cores > self.total_cores:
+                    raise ValueError(
+                        "job "
+                        + name
+                        + " needs more cores ("
+                        + str(cores)
+                        + ") than available ("
+                        + str(self.total_cores)
+                        + ")"
+                    )
+                jobs[name] = {"params": params, "structure": structure, "cores": cores}
+        return jobs
+
+    def resolve_paths(self, params):
+        """
+        Makes the relative file paths in params (see CONFIG_PATHS) absolute, relative to config_dir, in place.
+        """
+        for section, key in CONFIG_PATHS:
+            value = (params.get(section) or {}).get(key, None)
+            if isinstance(value, str):
+                params[section][key] = os.path.join(self.config_dir, value)
+            elif isinstance(value, list):
+                params[section][key] = [
+                    os.path.join(self.config_dir, path) for path in value
+                ]
+
+    def load_ledger(self):
+        """
+        Loads the ledger of a previous run of the campaign, jobs that did not finish are reset to pending.
+        """
+        ledger = {}
+        if os.path.exists(self.ledger_path):
+            with open(self.ledger_path, "r") as ledger_file:
+                ledger = json.load(ledger_file)
+        for name in self.jobs:
+            if ledger.get(name, {}).get("status") != "done":
+                ledger[name] = {"status": "pending"}
+        self.write_ledger(ledger)
+        return ledger
+
+    def write_ledger(self, ledger):
+        temp_path = self.ledger_path + ".tmp"
+        with open(temp_path, "w") as ledger_file:
+            json.dump(ledger, ledger_file, indent=2)
+        os.replace(temp_path, self.ledger_path)
+
+    def update_ledger(self, name, **entries):
+        with self.ledger_lock:
+            self.ledger[name].update(entries)
+            self.write_ledger(self.ledger)
+
+    def run(self):
+        """
+        Runs all jobs that are not done yet, blocks until they finished and returns the ledger.
+        """
+        names = [name for name in self.jobs if self.ledger[name]["status"] != "done"]
+        print(
+            "Campaign: running "
+            + str(len(names))
+            + " of "
+            + str(len(self.jobs))
+            + " jobs on "
+            + str(self.total_cores)
+            + " cores"
+        )
+        max_workers = max(1, self.total_cores // max(1, self.cores_per_job))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self.run_job, names))
+        print("Campaign: " + str(self.summary()))
+        return self.ledger
+
+    def summary(self):
+        """
+        Returns the number of jobs per status.
+        """
+        counts = {}
+        with self.ledger_lock:
+            for name in self.jobs:
+                status = self.ledger[name]["status"]
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def run_job(self, name):
+        job = self.jobs[name]
+        params = copy.deepcopy(job["params"])
+        uses_parent_slot = (
+            self.parent_slots is not None
+            and params["links"].get("parent_calc", "vasp") != "emt"
+        )
+        # the parent slot is taken first, so jobs waiting for a slot hold no cores
+        if uses_parent_slot:
+            self.parent_slots.acquire()
+        self.acquire_cores(job["cores"])
+        try:
+            # the job directory is reused when the job is rerun
+            job_dir = create_job_dir(self.campaign_dir, name, unique=False)
+            if job["structure"] is not None:
+                params["links"]["traj"] = self.write_structure(
+                    job["structure"], job_dir
+                )
+            config_path = write_job_config(params, job_dir, name)
+            self.update_ledger(
+                name,
+                status="running",
+                job_dir=job_dir,
+                config_path=config_path,
+                start_time=time.time(),
+            )
+            start = time.perf_counter()
+            env = dict(os.environ)
+            for variable in ["OMP_NUM_THREADS", "MKL_NUM_THREADS"]:
+                env[variable] = str(job["cores"])
+            with open(os.path.join(job_dir, "run_logs.txt"), "w") as log_file:
+                returncode = subprocess.call(
+                    [sys.executable, "-m", "finetuna.campaign", config_path],
+                    cwd=job_dir,
+                    env=env,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                )
+            self.update_ledger(
+                name,
+                status="done" if returncode == 0 else "failed",
+                returncode=returncode,
+                wall_time=time.perf_counter() - start,
+            )
+            print(
+                "Campaign: job " + name + " finished with exit code " + str(returncode)
+            )
+        except Exception as error:
+            self.update_ledger(name, status="failed", error=repr(error))
+            print("Campaign: job " + name + " failed (" + repr(error) + ")")
+        finally:
+            if uses_parent_slot:
+                self.parent_slots.release()
+            self.release_cores(job["cores"])
+
+    def write_structure(self, structure, job_dir):
+        """
+        Returns the trajectory path of the structure, images are written to job_dir/initial_structure.traj.
+        """
+        if isinstance(structure, str):
+            return os.path.abspath(structure)
+        if not isinstance(structure, list):
+            structure = [structure]
+        traj_path = os.path.join(job_dir, "initial_structure.traj")
+        with Trajectory(traj_path, "w") as traj:
+            for image in structure:
+                traj.write(image)
+        return traj_path
+
+    def acquire_cores(self, cores):
+        with self.cores_condition:
+            self.cores_condition.wait_for(lambda: self.free_cores >= cores)
+            self.free_cores -= cores
+
+    def release_cores(self, cores):
+        with self.cores_condition:
+            self.free_cores += cores
+            self.cores_condition.notify_all()
+
+
+def run_config(config_path):
+    """
+    Runs active_learning on the config in the current working directory, used by the campaign subprocesses.
+    """
+    from finetuna.run_al import active_learning
+
+    with open(config_path, "r") as config_file:
+        config = yaml.safe_load(config_file)
+    active_learning(config)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("config_yml", help="Path to the config file")
+    args = parser.parse_args()
+    run_config(args.config_yml)
@@ -0,0 +1,225 @@
+import numpy as np
+from ase.atoms import Atoms
+from ase.calculators.singlepoint import SinglePointCalculator
+
+
+class CompactDataset:
+    """
+    List-like store of atoms frames with singlepoint energies and forces, kept in contiguous numpy arrays.
+
+    Positions and forces of all frames are stacked row-wise in growable arrays, with per-frame offsets into them.
+    Numbers, cell, pbc, tags (if the frame has them) and constraints are stored once per distinct combination (template)
+    and shared by all frames using it, so long runs on the same system only store positions, forces, energy and info
+    per frame.
+    Frames are returned as new Atoms objects with a SinglePointCalculator when indexed or iterated,
+    other per-atom arrays (e.g. momenta) are not kept.
+
+    Supports len, indexing with integers and slices, iteration, append, extend and +=, so it can replace
+    the lists of Atoms used as datasets by the learners.
+
+    Parameters
+    ----------
+    images: list[Atoms]
+        initial frames
+
+    max_frames: int
+        maximum number of frames kept, older frames are evicted when it is exceeded, None to keep everything
+
+    evict: str
+        "ml_first" to evict the oldest frame not checked with the parent (info["check"] is not True) first,
+        "oldest" to evict the oldest frame, the most recent frame is never evicted
+    """
+
+    def __init__(self, images=(), max_frames=None, evict="ml_first"):
+        if evict not in ["ml_first", "oldest"]:
+            raise ValueError("invalid eviction policy given (" + str(evict) + ")")
+        self.max_frames = max_frames
+        self.evict = evict
+
+        # per atom rows
+        self.positions = np.zeros((0, 3))
+        self.forces = np.zeros((0, 3))
+        self.n_rows = 0
+        self.n_live_rows = 0
+
+        # per frame entries
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.energies = np.zeros(0)
+        self.template_ids = np.zeros(0, dtype=np.int64)
+        self.checked = np.zeros(0, dtype=bool)
+        self.infos = []
+        self.n_frames = 0
+
+        self.templates = []
+        self.template_keys = {}
+
+        self.extend(images)
+
+    def __len__(self):
+        return self.n_frames
+
+    def __iter__(self):
+        for i in range(self.n_frames):
+            yield self.get_atoms(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get_atoms(i) for i in range(*index.indices(self.n_frames))]
+        if index < 0:
+            index += self.n_frames
+        if index < 0 or index >= self.n_frames:
+            raise IndexError("CompactDataset index out of range")
+        return self.get_atoms(index)
+
+    def __iadd__(self, images):
+        self.extend(images)
+        return self
+
+    @property
+    def nbytes(self):
+        return (
+            self.positions.nbytes
+            + self.forces.nbytes
+            + self.starts.nbytes
+            + self.energies.nbytes
+            + self.template_ids.nbytes
+            + self.checked.nbytes
+        )
+
+    def extend(self, images):
+        for atoms in images:
+            self.append(atoms)
+
+    def append(self, atoms):
+        """
+        Copies the structure, singlepoint results and info of atoms into the dataset.
+        """
+        natoms = len(atoms)
+        energy = np.nan
+        forces = np.full((natoms, 3), np.nan)
+        if atoms.calc is not None:
+            results = atoms.calc.results
+            energy = results.get("energy", np.nan)
+            forces = results.get("forces", forces)
+
+        if self.n_rows + natoms > len(self.positions):
+            capacity = max(2 * len(self.positions), self.n_rows + natoms)
+            self.positions = self.resize(self.positions, capacity)
+            self.forces = self.resize(self.forces, capacity)
+        if self.n_frames == len(self.starts):
+            capacity = max(2 * len(self.starts), 16)
+            self.starts = self.resize(self.starts, capacity)
+            self.energies = self.resize(self.energies, capacity)
+            self.template_ids = self.resize(self.template_ids, capacity)
+            self.checked = self.resize(self.checked, capacity)
+
+        self.positions[self.n_rows : self.n_rows + natoms] = atoms.positions
+        self.forces[self.n_rows : self.n_rows + natoms] = forces
+        self.starts[self.n_frames] = self.n_rows
+        self.energies[self.n_frames] = energy
+        self.template_ids[self.n_frames] = self.get_template_id(atoms)
+        self.checked[self.n_frames] = atoms.info.get("check", False) is True
+        self.infos.append(dict(atoms.info))
+        self.n_rows += natoms
+        self.n_live_rows += natoms
+        self.n_frames += 1
+
+        if self.max_frames is not None:
+            while self.n_frames > self.max_frames:
+                self.evict_frame()
+
+    def get_atoms(self, index):
+        template = self.templates[self.template_ids[index]]
+        start = self.starts[index]
+        end = start + len(template["numbers"])
+        atoms = Atoms(
+            numbers=template["numbers"],
+            positions=self.positions[start:end],
+            cell=template["cell"],
+            pbc=template["pbc"],
+            tags=template["tags"],
+            constraint=[constraint.copy() for constraint in template["constraints"]],
+            info=dict(self.infos[index]),
+        )
+        if not np.isnan(self.energies[index]):
+            sp_calc = SinglePointCalculator(
+                atoms=atoms,
+                energy=float(self.energies[index]),
+                forces=self.forces[start:end].copy(),
+            )
+            sp_calc.implemented_properties = ["energy", "forces"]
+            atoms.calc = sp_calc
+        return atoms
+
+    def get_template_id(self, atoms):
+        numbers = atoms.get_atomic_numbers()
+        # frames without tags must come back without them, e.g. the trainer derives tags only if none are given
+        has_tags = "tags" in atoms.arrays
+        tags = atoms.get_tags()
+        cell = atoms.cell.array
+        pbc = atoms.pbc
+        constraints = [constraint.todict() for constraint in atoms.constraints]
+        key = (
+            numbers.tobytes(),
+            has_tags,
+            tags.tobytes(),
+            cell.tobytes(),
+            pbc.tobytes(),
+            repr(constraints),
+        )
+        template_id = self.template_keys.get(key, None)
+        if template_id is None:
+            template_id = len(self.templates)
+            self.template_keys[key] = template_id
+            self.templates.append(
+                {
+                    "numbers": numbers.copy(),
+                    "tags": tags.copy() if has_tags else None,
+                    "cell": cell.copy(),
+                    "pbc": pbc.copy(),
+                    "constraints": [
+                        constraint.copy() for constraint in atoms.constraints
+                    ],
+                }
+            )
+        return template_id
+
+    def evict_frame(self):
+        index = 0
+        if self.evict == "ml_first":
+            unchecked = np.flatnonzero(~self.checked[: self.n_frames - 1])
+            if len(unchecked) > 0:
+                index = unchecked[0]
+
+        natoms = len(self.templates[self.template_ids[index]]["numbers"])
+        for array in [self.starts, self.energies, self.template_ids, self.checked]:
+            array[index : self.n_frames - 1] = array[index + 1 : self.n_frames]
+        del self.infos[index]
+        self.n_frames -= 1
+        self.n_live_rows -= natoms
+
+        # the rows of evicted frames are only reclaimed once they make up half of the stored rows
+        if 2 * self.n_live_rows < self.n_rows:
+            self.compact()
+
+    def compact(self):
+        """
+        Moves the rows of the remaining frames to the front of the row arrays.
+        """
+        n_rows = 0
+        for index in range(self.n_frames):
+            start = self.starts[index]
+            natoms = len(self.templates[self.template_ids[index]]["numbers"])
+            self.positions[n_rows : n_rows + natoms] = self.positions[
+                start : start + natoms
+            ]
+            self.forces[n_rows : n_rows + natoms] = self.forces[start : start + natoms]
+            self.starts[index] = n_rows
+            n_rows += natoms
+        self.n_rows = n_rows
+
+    @staticmethod
+    def resize(array, capacity):
+        new_array = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        new_array[: len(array)] = array
+        return new_array
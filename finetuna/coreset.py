@@ -0,0 +1,131 @@
+import numpy as np
+from finetuna.utils import compute_with_calc
+
+
+def select_coreset(
+    dataset,
+    size,
+    ml_potential,
+    method="diversity",
+    keep_recent=1,
+    descriptor_cache=None,
+):
+    """
+    Selects the indices of at most size structures of dataset to keep for training.
+    The keep_recent most recent structures are always kept, the rest is chosen by method:
+
+    "diversity": farthest point sampling of the structure descriptors (mean atom embedding of ml_potential.get_descriptors),
+    starting from the structures that are kept anyway
+
+    "error": largest mean absolute force error of the ml_potential prediction w.r.t. the dataset singlepoints
+
+    "uncertainty": largest force uncertainty (max_force_stds) of the ml_potential prediction
+
+    Parameters
+    ----------
+    dataset: list[Atoms]
+        structures with singlepoint calculators (the training set)
+
+    size: int
+        maximum number of structures to keep
+
+    ml_potential: MLPCalc
+        ml potential used for the descriptors, errors or uncertainties
+
+    method: str
+        selection method, "diversity", "error" or "uncertainty"
+
+    keep_recent: int
+        number of most recent structures that are always kept
+
+    descriptor_cache: dict
+        optional cache of the structure descriptors (see get_structure_key), filled with the descriptors computed here,
+        so structures kept over several selections are only passed through the ml_potential once
+    """
+    n = len(dataset)
+    if n <= size:
+        return list(range(n))
+
+    keep = list(range(max(0, n - min(keep_recent, size)), n))
+    candidates = list(range(n - len(keep)))
+    n_select = size - len(keep)
+
+    if method == "diversity":
+        if not hasattr(ml_potential, "get_descriptors"):
+            raise ValueError(
+                "diversity coreset requires an ml_potential implementing get_descriptors()"
+            )
+        if descriptor_cache is None:
+            descriptor_cache = {}
+        descriptors = []
+        for atoms in dataset:
+            key = get_structure_key(atoms)
+            if key not in descriptor_cache:
+                descriptor_cache[key] = get_structure_descriptor(ml_potential, atoms)
+            descriptors.append(descriptor_cache[key])
+        descriptors = np.array(descriptors)
+        selected = farthest_point_selection(descriptors, n_select, keep)
+    elif method in ["error", "uncertainty"]:
+        predictions = compute_with_calc([dataset[i] for i in candidates], ml_potential)
+        if method == "error":
+            scores = [
+                np.mean(
+                    np.abs(
+                        prediction.get_forces(apply_constraint=False)
+                        - dataset[i].get_forces(apply_constraint=False)
+                    )
+                )
+                for i, prediction in zip(candidates, predictions)
+            ]
+        else:
+            scores = [prediction.info["max_force_stds"] for prediction in predictions]
+        order = np.argsort(scores)[::-1][:n_select]
+        selected = [candidates[i] for i in order]
+    else:
+        raise ValueError("invalid coreset method given (" + str(method) + ")")
+
+    return sorted(selected + keep)
+
+
+def get_structure_key(atoms):
+    """
+    Returns the key of atoms in a descriptor cache.
+    """
+    return (
+        atoms.get_atomic_numbers().tobytes(),
+        atoms.positions.tobytes(),
+        atoms.cell.array.tobytes(),
+    )
+
+
+def get_structure_descriptor(ml_potential, atoms):
+    """
+    Returns the mean of the atom embeddings of atoms, ignoring atoms outside of the active region.
+    """
+    descriptors = ml_potential.get_descriptors(atoms)
+    known = np.isfinite(descriptors).all(axis=1)
+    return np.mean(descriptors[known], axis=0)
+
+
+def farthest_point_selection(descriptors, n_select, initial):
+    """
+    Greedily selects n_select indices of descriptors, each time the one farthest from all selected and initial indices.
+    """
+    if n_select <= 0:
+        return []
+    min_distances = np.full(len(descriptors), np.inf)
+    for i in initial:
+        min_distances = np.minimum(
+            min_distances, np.linalg.norm(descriptors - descriptors[i], axis=1)
+        )
+    min_distances[initial] = -np.inf
+
+    selected = []
+    for _ in range(n_select):
+        i = int(np.argmax(min_distances))
+        selected.append(i)
+        min_distances = np.minimum(
+            min_distances, np.linalg.norm(descriptors - descriptors[i], axis=1)
+        )
+        min_distances[i] = -np.inf
+    return selected
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class EmbeddingIndex:
+    """
+    Flat nearest neighbor index over per-atom embeddings, kept separately for every element.
+
+    Used to measure how far the local environments of a new structure are from the environments seen in training:
+    query returns the euclidean distance of each atom embedding to the closest stored embedding of the same element,
+    or inf for elements that were never added.
+
+    Parameters
+    ----------
+    backend: str
+        "flat" for the exact numpy search, "faiss" to keep each element in a faiss IndexFlatL2 (requires faiss)
+
+    chunk_size: int
+        number of stored embeddings compared at once in query with the flat backend, bounds the memory of the distance matrix
+    """
+
+    def __init__(self, backend="flat", chunk_size=65536):
+        if backend == "faiss":
+            import faiss
+
+            self.faiss = faiss
+        elif backend != "flat":
+            raise ValueError("invalid embedding index backend given")
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.embeddings = {}
+
+    def __len__(self):
+        if self.backend == "faiss":
+            return sum(index.ntotal for index in self.embeddings.values())
+        return sum(len(embeddings) for embeddings in self.embeddings.values())
+
+    def reset(self):
+        self.embeddings = {}
+
+    def add(self, numbers, embeddings):
+        """
+        Adds the embeddings (n_atoms, n_features) of atoms with the given atomic numbers to the index.
+        """
+        numbers = np.asarray(numbers)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for number in np.unique(numbers):
+            new_embeddings = embeddings[numbers == number]
+            if self.backend == "faiss":
+                if number not in self.embeddings:
+                    self.embeddings[number] = self.faiss.IndexFlatL2(
+                        embeddings.shape[1]
+                    )
+                self.embeddings[number].add(np.ascontiguousarray(new_embeddings))
+                continue
+            if number in self.embeddings:
+                new_embeddings = np.concatenate(
+                    [self.embeddings[number], new_embeddings]
+                )
+            self.embeddings[number] = new_embeddings
+
+    def query(self, numbers, embeddings):
+        """
+        Returns the distance of every embedding to its nearest stored embedding of the same element.
+        """
+        numbers = np.asarray(numbers)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        distances = np.full(len(numbers), np.inf)
+        for number in np.unique(numbers):
+            if number not in self.embeddings:
+                continue
+            mask = numbers == number
+            if self.backend == "faiss":
+                squared, _ = self.embeddings[number].search(
+                    np.ascontiguousarray(embeddings[mask]), 1
+                )
+                distances[mask] = np.sqrt(np.maximum(squared[:, 0], 0))
+            else:
+                distances[mask] = self.nearest_distances(
+                    embeddings[mask], self.embeddings[number]
+                )
+        return distances
+
+    def nearest_distances(self, queries, stored):
+        query_norms = np.sum(queries**2, axis=1)
+        nearest = np.full(len(queries), np.inf)
+        for start in range(0, len(stored), self.chunk_size):
+            chunk = stored[start : start + self.chunk_size]
+            squared = (
+                query_norms[:, None]
+                + np.sum(chunk**2, axis=1)[None, :]
+                - 2 * queries @ chunk.T
+            )
+            nearest = np.minimum(nearest, squared.min(axis=1))
+        return np.sqrt(np.maximum(nearest, 0))
@@ -0,0 +1,67 @@
+import ase.db
+from ase.calculators.singlepoint import SinglePointCalculator
+from finetuna.utils import get_structure_hash, write_unique_row
+
+
+class EndpointCache:
+    """
+    Cache of relaxed NEB endpoints in an ase db, so NEBs sharing an endpoint relax it only once.
+
+    Entries are keyed by a hash of the unrelaxed structure (atomic numbers, positions rounded to decimals,
+    cell, pbc and tags) and of the key given to the cache, which should identify everything else the relaxation
+    depends on (e.g. the calculator and the relaxation settings).
+
+    Parameters
+    ----------
+    db_path: str
+        path of the ase db file
+
+    key: str
+        identifier of the calculator and relaxation settings, stored with and required to match every entry
+
+    decimals: int
+        number of decimals the positions are rounded to before hashing
+    """
+
+    def __init__(self, db_path="neb_endpoints.db", key="", decimals=4):
+        self.db_path = db_path
+        self.key = key
+        self.decimals = decimals
+
+    def get_hash(self, atoms):
+        return get_structure_hash(atoms, self.key, self.decimals)
+
+    def get(self, atoms):
+        """
+        Returns the relaxed structure (with a singlepoint calculator) cached for the unrelaxed atoms, or None.
+        """
+        with ase.db.connect(self.db_path) as db:
+            rows = list(db.select(endpoint_hash=self.get_hash(atoms), limit=1))
+        if not rows:
+            return None
+        relaxed = rows[0].toatoms()
+        sp_calc = SinglePointCalculator(
+            relaxed,
+            energy=rows[0].energy,
+            forces=rows[0].forces,
+        )
+        sp_calc.implemented_properties = ["energy", "forces"]
+        relaxed.calc = sp_calc
+        return relaxed
+
+    def put(self, atoms, relaxed):
+        """
+        Stores the relaxed structure (with energy and forces available) for the unrelaxed atoms,
+        unless a relaxed structure is stored for them already. Returns whether it was stored.
+        """
+        relaxed_sp = relaxed.copy()
+        relaxed_sp.calc = SinglePointCalculator(
+            relaxed_sp,
+            energy=relaxed.get_potential_energy(),
+            forces=relaxed.get_forces(apply_constraint=False),
+        )
+        endpoint_hash = self.get_hash(atoms)
+        with ase.db.connect(self.db_path) as db:
+            return write_unique_row(
+                db, relaxed_sp, endpoint_hash, endpoint_hash=endpoint_hash
+            )
@@ -0,0 +1,147 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+import copy
+import torch
+
+
+def state_to_cpu(state):
+    """
+    Recursively copies a (nested) checkpoint state into CPU memory.
+    Tensors are detached and copied so the training loop can keep updating its parameters
+    while the copy is written out, everything else is deep copied.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    elif isinstance(state, OrderedDict):
+        return OrderedDict((key, state_to_cpu(value)) for key, value in state.items())
+    elif isinstance(state, dict):
+        return {key: state_to_cpu(value) for key, value in state.items()}
+    elif isinstance(state, list):
+        return [state_to_cpu(value) for value in state]
+    elif isinstance(state, tuple):
+        return tuple(state_to_cpu(value) for value in state)
+    return copy.deepcopy(state)
+
+
+def write_checkpoint(state, checkpoint_path):
+    """
+    Writes the state to a temporary file next to checkpoint_path, then moves it into place,
+    so readers never see a partially written checkpoint.
+    """
+    temp_path = checkpoint_path + ".tmp"
+    torch.save(state, temp_path)
+    os.replace(temp_path, checkpoint_path)
+    return checkpoint_path
+
+
+class CheckpointWriter:
+    """
+    Background checkpoint writer.
+
+    Checkpoint states are handed over already snapshotted to CPU memory and written from a single worker thread.
+    Only the most recent pending state is kept for each path, so saves that arrive faster than the disk can absorb them
+    (or within min_interval seconds of the previous write to the same path) are coalesced into one write.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._min_interval = {}
+        self._last_write = {}
+        self._writing = False
+        self._flushing = 0
+        self._error = None
+        self._thread = None
+
+    def submit(self, state, checkpoint_path, min_interval=0.0):
+        """
+        Queues state to be written to checkpoint_path, replacing any state still pending for that path.
+        """
+        with self._condition:
+            self._raise_error()
+            self._pending[checkpoint_path] = state
+            self._min_interval[checkpoint_path] = min_interval
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="finetuna-checkpoint-writer", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self):
+        """
+        Blocks until every pending checkpoint has been written, ignoring the throttle interval.
+        Re-raises the first error encountered by the writer thread.
+        """
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while self._pending or self._writing:
+                    self._condition.wait()
+            finally:
+                self._flushing -= 1
+            self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise RuntimeError("Asynchronous checkpoint write failed") from error
+
+    def _next_ready(self):
+        # pick the pending path that becomes writable first under its throttle interval
+        now = time.monotonic()
+        next_path, next_wait = None, None
+        for checkpoint_path in self._pending:
+            wait = 0.0
+            if not self._flushing and checkpoint_path in self._last_write:
+                wait = (
+                    self._last_write[checkpoint_path]
+                    + self._min_interval[checkpoint_path]
+                    - now
+                )
+            if next_wait is None or wait < next_wait:
+                next_path, next_wait = checkpoint_path, wait
+        return next_path, next_wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                checkpoint_path, wait = self._next_ready()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                    continue
+                state = self._pending.pop(checkpoint_path)
+                self._writing = True
+            try:
+                write_checkpoint(state, checkpoint_path)
+            except Exception as error:
+                with self._condition:
+                    if self._error is None:
+                        self._error = error
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._last_write[checkpoint_path] = time.monotonic()
+                    self._condition.notify_all()
+
+
+_checkpoint_writer = None
+
+
+def get_checkpoint_writer():
+    """
+    Returns the process wide CheckpointWriter, creating it on first use.
+    Pending checkpoints are flushed when the interpreter exits.
+    """
+    global _checkpoint_writer
+    if _checkpoint_writer is None:
+        _checkpoint_writer = CheckpointWriter()
+        atexit.register(_checkpoint_writer.flush)
+    return _checkpoint_writer
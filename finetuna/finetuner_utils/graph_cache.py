@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+import logging
+import numpy as np
+import torch
+
+
+class GraphCache:
+    """
+    Verlet-skin cache of the GemNet interaction graph for the prediction path.
+
+    The graph (edges, symmetric edge swap indices and triplets) is built with the model cutoff enlarged by skin,
+    and is reused as long as no atom has moved more than skin / 2 since it was built.
+    In between rebuilds only the edge distances and vectors are recomputed from the current positions.
+    Edges longer than the model cutoff are zeroed by the radial envelope of the model,
+    so predictions are unchanged while every pair within the cutoff is guaranteed to be in the cached graph.
+
+    Parameters
+    ----------
+    skin: float
+        width of the Verlet skin in Angstrom added to the model cutoff when the graph is built
+    """
+
+    def __init__(self, skin=1.0):
+        self.skin = skin
+        self.model = None
+        self.graph = None
+        self.builds = 0
+
+    @contextmanager
+    def attach(self, model):
+        """
+        Routes the interaction graph generation of model through this cache while the context is active.
+        """
+        if model is not self.model:
+            self.model = model
+            self.graph = None
+        model.generate_interaction_graph = self.generate_interaction_graph
+        try:
+            yield
+        finally:
+            del model.generate_interaction_graph
+
+    def generate_interaction_graph(self, data):
+        if data.natoms.numel() != 1:
+            # only single structure predictions are cached
+            return type(self.model).generate_interaction_graph(self.model, data)
+
+        if self.rebuild_required(data):
+            self.build(data)
+
+        (edge_index, neighbors, id_swap, id3_ba, id3_ca, id3_ragged_idx) = self.graph
+        distance_vec = data.pos[edge_index[0]] - data.pos[edge_index[1]] + self.offsets
+        D_st = distance_vec.norm(dim=-1)
+        V_st = -distance_vec / D_st[:, None]
+        return (
+            edge_index,
+            neighbors,
+            D_st,
+            V_st,
+            id_swap,
+            id3_ba,
+            id3_ca,
+            id3_ragged_idx,
+        )
+
+    def rebuild_required(self, data):
+        if self.graph is None:
+            return True
+        if data.pos.shape != self.positions.shape:
+            return True
+        if not torch.equal(data.atomic_numbers, self.atomic_numbers):
+            return True
+        if not torch.allclose(data.cell, self.cell):
+            return True
+        displacement = (data.pos.detach() - self.positions).norm(dim=-1).max()
+        return displacement.item() >= self.skin / 2
+
+    def build(self, data):
+        model = self.model
+        cutoff = model.cutoff
+        max_neighbors = model.max_neighbors
+
+        # keep the neighbor density of the original cutoff sphere in the enlarged one
+        model.cutoff = cutoff + self.skin
+        model.max_neighbors = int(
+            np.ceil(max_neighbors * ((cutoff + self.skin) / cutoff) ** 3)
+        )
+        try:
+            with torch.no_grad():
+                (
+                    edge_index,
+                    neighbors,
+                    D_st,
+                    V_st,
+                    id_swap,
+                    id3_ba,
+                    id3_ca,
+                    id3_ragged_idx,
+                ) = type(model).generate_interaction_graph(model, data)
+        finally:
+            model.cutoff = cutoff
+            model.max_neighbors = max_neighbors
+
+        # the edge vectors are pos[s] - pos[t] plus a constant periodic image offset, store that offset
+        positions = data.pos.detach()
+        distance_vec = -V_st * D_st[:, None]
+        offsets = distance_vec - (positions[edge_index[0]] - positions[edge_index[1]])
+        if not self.valid_offsets(offsets, data.cell[0]):
+            logging.warning(
+                "Cached graph offsets are not lattice vectors, falling back to on the fly graphs"
+            )
+            self.graph = None
+            return
+
+        self.offsets = offsets
+        self.graph = (edge_index, neighbors, id_swap, id3_ba, id3_ca, id3_ragged_idx)
+        self.positions = positions.clone()
+        self.atomic_numbers = data.atomic_numbers.clone()
+        self.cell = data.cell.clone()
+        self.builds += 1
+
+    @staticmethod
+    def valid_offsets(offsets, cell):
+        if offsets.numel() == 0:
+            return True
+        if torch.det(cell).abs() < 1e-8:
+            return torch.allclose(offsets, torch.zeros_like(offsets), atol=1e-4)
+        fractional = offsets @ torch.linalg.inv(cell)
+        return torch.allclose(fractional, fractional.round(), atol=1e-4)
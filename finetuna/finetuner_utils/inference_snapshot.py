@@ -0,0 +1,85 @@
+import copy
+import logging
+import torch
+
+
+class InferenceSnapshot:
+    """
+    Minimal prediction path for the current weights of a trainer's model.
+
+    Skips the OCP predict machinery (data parallel wrapping, tqdm, per image result dicts) and calls the unwrapped model
+    directly in eval mode, denormalizing the outputs with the trainer normalizers.
+    Models with direct forces run under torch.inference_mode, gradient force models only enable autograd inside their forward.
+    The model is optionally wrapped with torch.compile, in which case the first calls are slow while the graph is compiled.
+
+    Without EMA the snapshot holds a reference to the live model.
+    If the trainer keeps EMA weights, the snapshot holds a frozen copy of the model with the EMA weights swapped in
+    (frozen parameters stay shared with the live model), matching what the OCP predict evaluates.
+    Either way the snapshot must be discarded whenever the model is retrained or replaced.
+
+    Parameters
+    ----------
+    trainer: Trainer
+        trainer holding the model and normalizers
+
+    compile: bool
+        whether to wrap the model with torch.compile
+    """
+
+    def __init__(self, trainer, compile=False):
+        self.module = self.get_module(trainer)
+        self.device = trainer.device
+        self.direct_forces = getattr(self.module, "direct_forces", False)
+        self.amp = trainer.scaler is not None
+
+        normalizers = trainer.normalizers if trainer.normalizers is not None else {}
+        self.energy_normalizer = normalizers.get("target", None)
+        self.forces_normalizer = normalizers.get("grad_target", None)
+
+        self.forward = self.module
+        if compile:
+            if hasattr(torch, "compile"):
+                self.forward = torch.compile(self.module)
+            else:
+                logging.warning(
+                    "torch.compile is not available, using the eager model for inference"
+                )
+
+    @staticmethod
+    def get_module(trainer):
+        """
+        Returns the module to predict with, a copy holding the EMA weights if the trainer has any.
+        """
+        module = trainer.get_model_module()
+        ema = getattr(trainer, "ema", None)
+        if not ema:
+            return module
+
+        ema.store()
+        ema.copy_to()
+        try:
+            # frozen parameters are never touched by the EMA, the copy keeps sharing them
+            memo = {id(p): p for p in module.parameters() if not p.requires_grad}
+            snapshot_module = copy.deepcopy(module, memo)
+        finally:
+            ema.restore()
+        for parameter in snapshot_module.parameters():
+            parameter.requires_grad_(False)
+        return snapshot_module
+
+    def __call__(self, batch):
+        """
+        Returns the energy and forces tensors predicted for a collated batch.
+        """
+        self.module.eval()
+        batch = batch.to(self.device)
+        context = torch.inference_mode() if self.direct_forces else torch.no_grad()
+        with context, torch.cuda.amp.autocast(enabled=self.amp):
+            energy, forces = self.forward(batch)
+
+        if energy.shape[-1] == 1:
+            energy = energy.view(-1)
+        if self.energy_normalizer is not None:
+            energy = self.energy_normalizer.denorm(energy)
+            forces = self.forces_normalizer.denorm(forces)
+        return energy.detach(), forces.detach()
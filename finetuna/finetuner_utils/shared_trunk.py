@@ -0,0 +1,171 @@
+import torch
+from torch_scatter import scatter
+from ocpmodels.models.gemnet.gemnet import GemNetT
+from ocpmodels.models.gemnet.utils import inner_product_normalized
+
+
+class SharedTrunkEnsemble:
+    """
+    Ensemble inference for GemNet-T members that only differ in their output blocks.
+
+    The graph, basis functions, embeddings and interaction blocks are evaluated once with the leader model,
+    then the output blocks of every member are applied to the shared atom and edge embeddings.
+    Energies and forces of all members are returned stacked, so the ensemble statistics can be reduced on-tensor.
+
+    Only applies to direct force models whose parameters outside of out_blocks are the same (shared) tensors,
+    see share_frozen_parameters, check with SharedTrunkEnsemble.is_supported before constructing.
+    Members with EMA weights are evaluated through their inference snapshots, which hold the EMA weights like the
+    OCP predict does, without snapshots they are not supported.
+
+    Parameters
+    ----------
+    trainers: list[Trainer]
+        trainers of the ensemble members, the first one is the leader
+    """
+
+    def __init__(self, trainers):
+        self.trainers = trainers
+        self.models = [trainer.get_prediction_module() for trainer in trainers]
+        self.leader = self.models[0]
+
+    @staticmethod
+    def is_supported(trainers):
+        # only the inference snapshot applies the EMA weights outside of the OCP predict
+        if any(
+            trainer.ema and trainer.get_inference_snapshot() is None
+            for trainer in trainers
+        ):
+            return False
+        models = [trainer.get_prediction_module() for trainer in trainers]
+        leader = models[0]
+        if not all(type(model).forward is GemNetT.forward for model in models):
+            return False
+        if not all(model.regress_forces and model.direct_forces for model in models):
+            return False
+        if any(
+            model.num_blocks != leader.num_blocks or model.extensive != leader.extensive
+            for model in models
+        ):
+            return False
+
+        leader_parameters = dict(leader.named_parameters())
+        leader_buffers = dict(leader.named_buffers())
+        for model in models[1:]:
+            for name, parameter in model.named_parameters():
+                if name.startswith("out_blocks."):
+                    continue
+                if leader_parameters.get(name, None) is not parameter:
+                    return False
+            for name, buffer in model.named_buffers():
+                if name.startswith("out_blocks."):
+                    continue
+                leader_buffer = leader_buffers.get(name, None)
+                if leader_buffer is None or not torch.equal(leader_buffer, buffer):
+                    return False
+        return True
+
+    def __call__(self, batch, return_embeddings=False):
+        """
+        Returns the energies (n_members, n_molecules) and forces (n_members, n_atoms, 3) of all members for a collated batch,
+        and the atom embeddings of the last interaction block (n_atoms, emb_size) if requested.
+        """
+        for model in self.models:
+            model.eval()
+        batch = batch.to(self.trainers[0].device)
+        with torch.inference_mode():
+            embeddings, rbf_out, idx_t, V_st = self.get_trunk(batch)
+            energies, forces = [], []
+            for model, trainer in zip(self.models, self.trainers):
+                energy, force = self.get_heads(
+                    model, batch, embeddings, rbf_out, idx_t, V_st
+                )
+                normalizers = trainer.normalizers if trainer.normalizers else {}
+                if "target" in normalizers:
+                    energy = normalizers["target"].denorm(energy)
+                    force = normalizers["grad_target"].denorm(force)
+                energies.append(energy)
+                forces.append(force)
+        if return_embeddings:
+            return torch.stack(energies), torch.stack(forces), embeddings[-1][0]
+        return torch.stack(energies), torch.stack(forces)
+
+    def get_trunk(self, data):
+        model = self.leader
+        atomic_numbers = data.atomic_numbers.long()
+
+        (
+            edge_index,
+            neighbors,
+            D_st,
+            V_st,
+            id_swap,
+            id3_ba,
+            id3_ca,
+            id3_ragged_idx,
+        ) = model.generate_interaction_graph(data)
+        idx_s, idx_t = edge_index
+
+        # Calculate triplet angles
+        cosφ_cab = inner_product_normalized(V_st[id3_ca], V_st[id3_ba])
+        rad_cbf3, cbf3 = model.cbf_basis3(D_st, cosφ_cab, id3_ca)
+
+        rbf = model.radial_basis(D_st)
+
+        # Embedding block
+        h = model.atom_emb(atomic_numbers)
+        m = model.edge_emb(h, rbf, idx_s, idx_t)
+
+        rbf3 = model.mlp_rbf3(rbf)
+        cbf3 = model.mlp_cbf3(rad_cbf3, cbf3, id3_ca, id3_ragged_idx)
+
+        rbf_h = model.mlp_rbf_h(rbf)
+        rbf_out = model.mlp_rbf_out(rbf)
+
+        # inputs of every output block
+        embeddings = [(h, m)]
+        for i in range(model.num_blocks):
+            h, m = model.int_blocks[i](
+                h=h,
+                m=m,
+                rbf3=rbf3,
+                cbf3=cbf3,
+                id3_ragged_idx=id3_ragged_idx,
+                id_swap=id_swap,
+                id3_ba=id3_ba,
+                id3_ca=id3_ca,
+                rbf_h=rbf_h,
+                idx_s=idx_s,
+                idx_t=idx_t,
+            )
+            embeddings.append((h, m))
+
+        return embeddings, rbf_out, idx_t, V_st
+
+    @staticmethod
+    def get_heads(model, data, embeddings, rbf_out, idx_t, V_st):
+        E_t, F_st = None, None
+        for out_block, (h, m) in zip(model.out_blocks, embeddings):
+            E, F = out_block(h, m, rbf_out, idx_t)
+            E_t = E if E_t is None else E_t + E
+            F_st = F if F_st is None else F_st + F
+
+        batch = data.batch
+        nMolecules = torch.max(batch) + 1
+        E_t = scatter(
+            E_t,
+            batch,
+            dim=0,
+            dim_size=nMolecules,
+            reduce="add" if model.extensive else "mean",
+        )
+
+        # map forces in edge directions
+        F_st_vec = F_st[:, :, None] * V_st[:, None, :]
+        F_t = scatter(
+            F_st_vec,
+            idx_t,
+            dim=0,
+            dim_size=data.atomic_numbers.size(0),
+            reduce="add",
+        )
+        return E_t.view(-1), F_t.squeeze(1)
@@ -3,6 +3,7 @@ from ocpmodels.datasets.lmdb_dataset import data_list_collater
 from ocpmodels.common.utils import setup_imports, setup_logging
 from ocpmodels.common import distutils
 import logging
+import contextlib
 import yaml
 from ocpmodels.preprocessing import AtomsToGraphs
 from ocpmodels.modules.loss import DDPLoss, L2MAELoss
@@ -11,14 +12,35 @@ import torch
 import copy
 import torch.nn as nn
 import numpy as np
+from ase.constraints import FixAtoms
+from ase.calculators.singlepoint import SinglePointCalculator
+from ase.geometry import get_distances
 from finetuna.finetuner_utils.loss import (
     RelativeL2MAELoss,
     AtomwiseL2LossNoBatch,
 )
+from finetuna.finetuner_utils.checkpoint_writer import (
+    get_checkpoint_writer,
+    state_to_cpu,
+    write_checkpoint,
+)
+from finetuna.finetuner_utils.graph_cache import GraphCache
+from finetuna.finetuner_utils.inference_snapshot import InferenceSnapshot
 
 
 class Trainer(ForcesTrainer):
-    def __init__(self, config_yml=None, checkpoint=None, cutoff=6, max_neighbors=50):
+    def __init__(
+        self,
+        config_yml=None,
+        checkpoint=None,
+        cutoff=6,
+        max_neighbors=50,
+        graph_skin=None,
+        prune_graph=False,
+        active_region_radius=None,
+        inference_snapshot=True,
+        compile_inference=False,
+    ):
         setup_imports()
         setup_logging()
 
@@ -114,7 +136,128 @@ class Trainer(ForcesTrainer):
             r_edges=False,
         )
 
-    def a2g_convert(self, atoms, train: bool):
+        # reuse the interaction graph between predictions on nearby geometries
+        self.graph_cache = None
+        if graph_skin is not None:
+            self.graph_cache = GraphCache(skin=graph_skin)
+
+        # only atoms within the receptive field of the free atoms are passed to the model
+        self.cutoff = cutoff
+        self.active_region_radius = None
+        if prune_graph:
+            self.active_region_radius = self.get_default_active_region_radius(
+                active_region_radius
+            )
+
+        # lightweight prediction path, taken lazily and discarded on every retrain
+        self.use_inference_snapshot = inference_snapshot
+        self.compile_inference = compile_inference
+        self.inference_snapshot = None
+
+    def get_model_module(self):
+        """
+        Returns the model unwrapped from its data parallel wrapper.
+        """
+        return getattr(self.model, "module", self.model)
+
+    def load_model(self):
+        self.inference_snapshot = None
+        super().load_model()
+
+    def get_inference_snapshot(self):
+        """
+        Returns the inference snapshot of the current (EMA) weights, taking it if needed.
+        Returns None if snapshots are turned off.
+        """
+        if not self.use_inference_snapshot:
+            return None
+        if self.inference_snapshot is None:
+            self.inference_snapshot = InferenceSnapshot(
+                self, compile=self.compile_inference
+            )
+        return self.inference_snapshot
+
+    def get_inference_context(self):
+        """
+        Models with direct forces need no autograd at all for predictions, so they run under torch.inference_mode.
+        Gradient force models still need autograd for the forces and fall back to the default context.
+        """
+        if getattr(self.get_model_module(), "direct_forces", False):
+            return torch.inference_mode()
+        return contextlib.nullcontext()
+
+    def get_prediction_module(self):
+        """
+        Returns the module predictions are run with, the inference snapshot copy if there is one.
+        """
+        snapshot = self.get_inference_snapshot()
+        if snapshot is not None:
+            return snapshot.module
+        return self.get_model_module()
+
+    def get_graph_context(self):
+        """
+        Routes the interaction graph generation through the graph cache, if there is one and the model supports it.
+        """
+        model = self.get_prediction_module()
+        if self.graph_cache is not None and hasattr(
+            model, "generate_interaction_graph"
+        ):
+            return self.graph_cache.attach(model)
+        return contextlib.nullcontext()
+
+    def get_default_active_region_radius(self, active_region_radius=None):
+        """
+        Returns active_region_radius, or the receptive field of the model if it is None.
+        """
+        if active_region_radius is not None:
+            return active_region_radius
+        # embedding block plus one hop per interaction block
+        return (self.config["model"].get("num_blocks", 3) + 1) * self.config[
+            "model"
+        ].get("cutoff", self.cutoff)
+
+    def get_active_mask(self, atoms):
+        """
+        Returns a boolean mask of the atoms within active_region_radius of any atom not fixed by FixAtoms,
+        or None if graph pruning is off or would not remove any atoms.
+        The forces of the free atoms are unchanged by pruning, the energy only covers the atoms in the mask.
+        """
+        if self.active_region_radius is None:
+            return None
+
+        fixed = np.zeros(len(atoms), dtype=bool)
+        for constraint in atoms.constraints:
+            if isinstance(constraint, FixAtoms):
+                fixed[constraint.get_indices()] = True
+        if not fixed.any() or fixed.all():
+            return None
+
+        positions = atoms.get_positions()
+        _, distances = get_distances(
+            positions[~fixed], positions, cell=atoms.cell, pbc=atoms.pbc
+        )
+        active_mask = (distances <= self.active_region_radius).any(axis=0)
+        if active_mask.all():
+            return None
+        return active_mask
+
+    def get_active_atoms(self, atoms, active_mask, train: bool):
+        """
+        Returns the atoms in active_mask as a new atoms object, keeping tags and constraints.
+        When training, the parent forces of the kept atoms and the parent energy are carried over
+        (the energy still refers to the full system, so pruning is meant for force-only training).
+        """
+        active_atoms = atoms[active_mask]
+        if train:
+            active_atoms.calc = SinglePointCalculator(
+                active_atoms,
+                energy=atoms.get_potential_energy(apply_constraint=False),
+                forces=atoms.get_forces(apply_constraint=False)[active_mask],
+            )
+        return active_atoms
+
+    def a2g_convert(self, atoms, train: bool, active_mask=None):
         if "tags" not in atoms.arrays:
             tags = np.array([1] * len(atoms))
             if atoms.constraints != []:
@@ -122,6 +265,9 @@ class Trainer(ForcesTrainer):
 
             atoms.arrays["tags"] = tags
 
+        if active_mask is not None:
+            atoms = self.get_active_atoms(atoms, active_mask, train)
+
         if train:
             data_object = self.a2g_train.convert(atoms)
         else:
@@ -129,15 +275,125 @@ class Trainer(ForcesTrainer):
 
         return data_object
 
-    def get_atoms_prediction(self, atoms):
-        data_object = self.a2g_convert(atoms, False)
+    def get_atoms_batch(self, atoms):
+        """
+        Returns the collated prediction batch for atoms and the active region mask it was pruned with (or None).
+        """
+        active_mask = self.get_active_mask(atoms)
+        data_object = self.a2g_convert(atoms, False, active_mask)
         batch = data_list_collater([data_object], self.otf_graph)
-        predictions = self.predict(
-            data_loader=batch, per_image=False, results_file=None, disable_tqdm=True
-        )
-        energy = predictions["energy"].item()
-        forces = predictions["forces"].cpu().numpy()
-        return energy, forces
+        return batch, active_mask
+
+    def scatter_active_forces(self, forces, active_mask, natoms):
+        """
+        Expands forces predicted on the active region back to all natoms atoms.
+        Pruned atoms are beyond the reach of every free atom, they only carry zero forces.
+        """
+        if active_mask is None:
+            return forces
+        all_forces = np.zeros(forces.shape[:-2] + (natoms, 3), dtype=forces.dtype)
+        all_forces[..., active_mask, :] = forces
+        return all_forces
+
+    def scatter_active_embeddings(self, embeddings, active_mask, natoms):
+        """
+        Expands embeddings predicted on the active region back to all natoms atoms, with rows of nan for pruned atoms.
+        """
+        if active_mask is None:
+            return embeddings
+        all_embeddings = np.full((natoms, embeddings.shape[1]), np.nan)
+        all_embeddings[active_mask] = embeddings
+        return all_embeddings
+
+    @contextlib.contextmanager
+    def capture_embeddings(self):
+        """
+        Collects the atom embeddings output by the last interaction block of the model while the context is active.
+        """
+        model = self.get_prediction_module()
+        if not hasattr(model, "int_blocks"):
+            raise ValueError(
+                "model does not have interaction blocks to take atom embeddings from"
+            )
+        embeddings = []
+
+        def hook(module, inputs, outputs):
+            embeddings.append(outputs[0].detach())
+
+        handle = model.int_blocks[-1].register_forward_hook(hook)
+        try:
+            yield embeddings
+        finally:
+            handle.remove()
+
+    def predict_batch(self, batch, return_embeddings=False):
+        """
+        Returns the predicted energies and forces tensors of a collated batch,
+        and the atom embeddings of the last interaction block if requested (otherwise None).
+        """
+        snapshot = self.get_inference_snapshot()
+        if return_embeddings:
+            embedding_context = self.capture_embeddings()
+        else:
+            embedding_context = contextlib.nullcontext([])
+        with self.get_graph_context(), embedding_context as embeddings:
+            if snapshot is not None:
+                energy, forces = snapshot(batch)
+            else:
+                with self.get_inference_context():
+                    predictions = self.predict(
+                        data_loader=batch,
+                        per_image=False,
+                        results_file=None,
+                        disable_tqdm=True,
+                    )
+                energy, forces = predictions["energy"], predictions["forces"]
+        return energy, forces, embeddings[-1] if return_embeddings else None
+
+    def get_atoms_prediction(self, atoms, return_embeddings=False):
+        """
+        Returns the predicted energy and forces of atoms.
+        With return_embeddings, also returns the per-atom embeddings of the last interaction block,
+        with rows of nan for atoms pruned from the active region.
+        """
+        return self.get_batch_predictions([atoms], return_embeddings)[0]
+
+    def get_batch_predictions(self, atoms_list, return_embeddings=False):
+        """
+        Returns the get_atoms_prediction results for every atoms object in atoms_list,
+        evaluating optim.eval_batch_size structures per forward pass.
+        """
+        batch_size = self.config["optim"].get("eval_batch_size", 8)
+        results = []
+        for start in range(0, len(atoms_list), batch_size):
+            chunk = atoms_list[start : start + batch_size]
+            active_masks = [self.get_active_mask(atoms) for atoms in chunk]
+            data_objects = [
+                self.a2g_convert(atoms, False, active_mask)
+                for atoms, active_mask in zip(chunk, active_masks)
+            ]
+            batch = data_list_collater(data_objects, self.otf_graph)
+            energies, forces, embeddings = self.predict_batch(batch, return_embeddings)
+
+            sections = np.cumsum([len(data.atomic_numbers) for data in data_objects])
+            energies = energies.view(-1).cpu().numpy()
+            forces = np.split(forces.cpu().numpy(), sections[:-1])
+            if return_embeddings:
+                embeddings = np.split(embeddings.float().cpu().numpy(), sections[:-1])
+
+            for i, (atoms, active_mask) in enumerate(zip(chunk, active_masks)):
+                result = (
+                    energies[i].item(),
+                    self.scatter_active_forces(forces[i], active_mask, len(atoms)),
+                )
+                if return_embeddings:
+                    result += (
+                        self.scatter_active_embeddings(
+                            embeddings[i], active_mask, len(atoms)
+                        ),
+                    )
+                results.append(result)
+        return results
 
     def save(
         self,
@@ -148,19 +404,88 @@ class Trainer(ForcesTrainer):
         """
         Overwriting save file to make sure that checkpoints that have been trained with finetuner calc retain normalizer dictionary in the right location
         (by default 'Normalizers' was being saved by OCP, but when loading trained checkpoints it also expects the information to be saved in 'Normalizer')
+
+        The checkpoint state (with the normalizer already patched in) is snapshotted to CPU memory and written in one pass by a background thread,
+        so the training loop does not wait on checkpoint I/O. Rapid successive saves to the same file are coalesced,
+        and optim.checkpoint_min_interval (seconds) throttles how often a given file is rewritten.
+        Set optim.async_checkpoint to False to write synchronously instead.
         """
-        checkpoint_path = super().save(
-            metrics=metrics,
-            checkpoint_file=checkpoint_file,
-            training_state=training_state,
+        if self.is_debug or not distutils.is_master():
+            return None
+
+        checkpoint_path = os.path.join(
+            self.config["cmd"]["checkpoint_dir"], checkpoint_file
         )
-        if checkpoint_path is not None:
-            checkpoint = torch.load(checkpoint_path)
-            checkpoint["config"]["normalizer"] = self.normalizer
-            torch.save(checkpoint, checkpoint_path)
+        state = self.get_checkpoint_state(
+            metrics=metrics, training_state=training_state
+        )
+        if self.config["optim"].get("async_checkpoint", True):
+            get_checkpoint_writer().submit(
+                state,
+                checkpoint_path,
+                min_interval=self.config["optim"].get("checkpoint_min_interval", 0.0),
+            )
+        else:
+            write_checkpoint(state, checkpoint_path)
         return checkpoint_path
 
+    def get_checkpoint_state(self, metrics=None, training_state=True):
+        """
+        Builds the same checkpoint dictionary as the OCP trainer, with the normalizer written into the config,
+        and returns a copy of it in CPU memory.
+        """
+        config = dict(self.config)
+        config["normalizer"] = self.normalizer
+        normalizers = {
+            key: value.state_dict() for key, value in self.normalizers.items()
+        }
+
+        if training_state:
+            state = {
+                "epoch": self.epoch,
+                "step": self.step,
+                "state_dict": self.model.state_dict(),
+                "optimizer": self.optimizer.state_dict(),
+                "scheduler": self.scheduler.scheduler.state_dict()
+                if self.scheduler.scheduler_type != "Null"
+                else None,
+                "normalizers": normalizers,
+                "config": config,
+                "val_metrics": metrics,
+                "ema": self.ema.state_dict() if self.ema else None,
+                "amp": self.scaler.state_dict() if self.scaler else None,
+                "best_val_metric": getattr(self, "best_val_metric", None),
+                "primary_metric": self.config["task"].get(
+                    "primary_metric", self.evaluator.task_primary_metric[self.name]
+                ),
+            }
+            return state_to_cpu(state)
+
+        # without training state the ema weights are saved, so snapshot them before restoring
+        if self.ema:
+            self.ema.store()
+            self.ema.copy_to()
+        state = state_to_cpu(
+            {
+                "state_dict": self.model.state_dict(),
+                "normalizers": normalizers,
+                "config": config,
+                "val_metrics": metrics,
+                "amp": self.scaler.state_dict() if self.scaler else None,
+            }
+        )
+        if self.ema:
+            self.ema.restore()
+        return state
+
+    def wait_for_checkpoints(self):
+        """
+        Blocks until all checkpoints queued by save() are on disk.
+        """
+        get_checkpoint_writer().flush()
+
     def train(self, disable_eval_tqdm=False):
+        self.inference_snapshot = None
         eval_every = self.config["optim"].get("eval_every", None)
         if eval_every is None:
             eval_every = len(self.train_loader)
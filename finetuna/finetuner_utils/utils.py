@@ -1,3 +1,4 @@
+import torch
 from torch.utils.data import Dataset
 
 
@@ -22,6 +23,52 @@ class GenericDB:
         pass
 
 
+def share_frozen_parameters(leader, follower, optimizer=None):
+    """
+    Replaces every frozen parameter of the follower model with the matching frozen parameter of the leader model,
+    if both have the same name and hold equal values, so they are kept in memory only once.
+    Parameters with requires_grad stay owned by each model.
+
+    If the optimizer of the follower is given, its parameter groups are pointed at the shared parameters
+    and the optimizer state of the frozen parameters (never used, since they receive no gradients) is dropped.
+
+    Loading a state dict into either model afterwards writes into the shared tensors of both.
+
+    Returns the number of parameter elements that are now shared.
+    """
+    leader_parameters = dict(leader.named_parameters())
+    replaced = {}
+    for module_name, module in follower.named_modules():
+        for name, parameter in list(module._parameters.items()):
+            if parameter is None or parameter.requires_grad:
+                continue
+            full_name = module_name + "." + name if module_name else name
+            leader_parameter = leader_parameters.get(full_name, None)
+            if (
+                leader_parameter is None
+                or leader_parameter is parameter
+                or leader_parameter.requires_grad
+                or leader_parameter.shape != parameter.shape
+                or leader_parameter.dtype != parameter.dtype
+                or leader_parameter.device != parameter.device
+                or not torch.equal(leader_parameter, parameter)
+            ):
+                continue
+            module._parameters[name] = leader_parameter
+            replaced[id(parameter)] = (parameter, leader_parameter)
+
+    if optimizer is not None and replaced:
+        for group in optimizer.param_groups:
+            group["params"] = [
+                replaced[id(parameter)][1] if id(parameter) in replaced else parameter
+                for parameter in group["params"]
+            ]
+        for parameter, _ in replaced.values():
+            optimizer.state.pop(parameter, None)
+
+    return sum(parameter.numel() for parameter, _ in replaced.values())
+
+
 # Add gemnet_t_uncertainty as GemNetT class for loading homoscedastic model checkpoints
 from ocpmodels.common.registry import registry
 from ocpmodels.models.gemnet.gemnet import GemNetT
@@ -26,52 +26,10 @@ def create_job(
         params.get("learner", {}).get("wandb_init", {}).get("name", "default_job_name")
     )  # TODO
 
+    # create the new directory inside the current working directory and write the config to it
     basedir = os.getcwd()
-    subdir = "/"
-    subdir += job_name
-    subdir += "_0"
-
-    # change to new directory created inside the current working directory
-    if not os.path.isdir(basedir + subdir):
-        os.mkdir(basedir + subdir)
-    else:
-        while os.path.isdir(basedir + subdir):
-            i = int(subdir[subdir.rindex("_") + 1 :])
-            subdir = subdir[: subdir.rindex("_") + 1] + str(i + 1)
-        os.mkdir(basedir + subdir)
-    os.chdir(basedir + subdir)
-
-    # if given some images to pretrain on, make an ase_db and save the link in the config
-    if images is not None:
-        images_path = basedir + subdir + "/" + "pretrain_images.db"
-        params["links"]["images_path"] = images_path
-        with connect(images_path) as pretrain_db:
-            for image in images:
-                pretrain_db.write(image)
-
-    # if given incar in links, change the vasp params to match the incar
-    if "incar" in params["links"]:
-        vasp_input = GenerateVaspInput()
-        vasp_input.atoms = None
-        vasp_input.read_incar(params["links"]["incar"])
-        if "kpoints" in params["links"]:
-            vasp_input.read_kpoints(params["links"]["kpoints"])
-        params["vasp"] = vasp_input.todict()
-        if "kpts" in params["vasp"]:
-            kpts = [float(i) for i in params["vasp"]["kpts"]]
-            params["vasp"]["kpts"] = kpts
-        else:
-            params["vasp"].pop("kpts")
-        if "gga" not in params["vasp"]:
-            params["vasp"]["gga"] = "PE"  # defaults to PE for oxide
-        params["vasp"]["nsw"] = 0
-        params["vasp"]["ibrion"] = -1
-        params["vasp"]["lreal"] = "Auto"
-
-    # create the new config in the new directory
-    config_path = basedir + subdir + "/" + job_name + "_config.yml"
-    with open(config_path, "w") as config_file:
-        yaml.dump(params, config_file, default_flow_style=False)
+    job_dir = create_job_dir(basedir, job_name)
+    config_path = write_job_config(params, job_dir, job_name, images=images)
 
     # load the sample_job_spec.yml
     with open(sample_job_spec_path, "r") as sample_job_spec:
@@ -104,14 +62,13 @@ def create_job(
         + " --config-yml "
         + config_path
         + " 2>&1 | tee "
-        + basedir
-        + subdir
+        + job_dir
         + "/run_logs.txt"
     )
     job_spec["spec"]["template"]["spec"]["containers"][0]["args"][0] = args_string
 
     # create the new job_spec.yml from the job_spec dictionary
-    job_spec_path = basedir + subdir + "/" + job_name + "_spec.yml"
+    job_spec_path = job_dir + "/" + job_name + "_spec.yml"
     with open(job_spec_path, "w") as job_spec_file:
         yaml.dump(job_spec, job_spec_file, default_flow_style=False)
 
@@ -122,8 +79,66 @@ def create_job(
             "Executed job " + job_name + " with exit code " + str(run_result.returncode)
         )
 
-    # change back to original working directory
-    os.chdir(basedir)
+    return config_path
+
+
+def create_job_dir(basedir, job_name, unique=True):
+    """
+    Creates the directory basedir/job_name_0 (or the next free job_name_i if unique) and returns its path.
+    Does not change the working directory, so it can be called from several threads.
+    """
+    if not unique:
+        job_dir = basedir + "/" + job_name
+        os.makedirs(job_dir, exist_ok=True)
+        return job_dir
+
+    i = 0
+    while True:
+        job_dir = basedir + "/" + job_name + "_" + str(i)
+        try:
+            os.mkdir(job_dir)
+            return job_dir
+        except FileExistsError:
+            i += 1
+
+
+def write_job_config(params, job_dir, job_name, images=None):
+    """
+    Writes the config of the job to job_dir/job_name_config.yml and returns its path.
+    If images are given they are written to job_dir/pretrain_images.db and linked in the config,
+    if an incar is given in the links the vasp params are replaced by it.
+    """
+    # if given some images to pretrain on, make an ase_db and save the link in the config
+    if images is not None:
+        images_path = job_dir + "/" + "pretrain_images.db"
+        params["links"]["images_path"] = images_path
+        with connect(images_path) as pretrain_db:
+            for image in images:
+                pretrain_db.write(image)
+
+    # if given incar in links, change the vasp params to match the incar
+    if "incar" in params["links"]:
+        vasp_input = GenerateVaspInput()
+        vasp_input.atoms = None
+        vasp_input.read_incar(params["links"]["incar"])
+        if "kpoints" in params["links"]:
+            vasp_input.read_kpoints(params["links"]["kpoints"])
+        params["vasp"] = vasp_input.todict()
+        if "kpts" in params["vasp"]:
+            kpts = [float(i) for i in params["vasp"]["kpts"]]
+            params["vasp"]["kpts"] = kpts
+        else:
+            params["vasp"].pop("kpts")
+        if "gga" not in params["vasp"]:
+            params["vasp"]["gga"] = "PE"  # defaults to PE for oxide
+        params["vasp"]["nsw"] = 0
+        params["vasp"]["ibrion"] = -1
+        params["vasp"]["lreal"] = "Auto"
+
+    # create the new config in the new directory
+    config_path = job_dir + "/" + job_name + "_config.yml"
+    with open(config_path, "w") as config_file:
+        yaml.dump(params, config_file, default_flow_style=False)
 
     return config_path
 
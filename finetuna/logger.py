@@ -3,11 +3,9 @@
 from ase.atoms import Atoms
 from ase.io import Trajectory
 from numpy import ndarray
-from finetuna.mongo import MongoWrapper
 import ase.db
 from ase.calculators.calculator import Calculator
 import random
-import wandb
 from finetuna.utils import compute_with_calc, copy_images
 import math
 import numpy as np
@@ -62,6 +60,8 @@ class Logger:
         # initialize mongo db
         self.mongo_wrapper = None
         if mongo_db_collection is not None:
+            from finetuna.mongo import MongoWrapper
+
             self.mongo_wrapper = MongoWrapper(
                 mongo_db_collection,
                 learner_params,
@@ -74,6 +74,8 @@ class Logger:
         self.wandb_run = None
         wandb_init = learner_params.get("wandb_init", {})
         if wandb_init.get("wandb_log", False) is True:
+            import wandb
+
             wandb_config = {
                 "learner": learner_params,
                 "ml_potential": ml_potential.mlp_params,
@@ -91,6 +93,13 @@ class Logger:
                 config=wandb_config,
             )
 
+        # learners skip diagnostics that are only computed for logging if no sink is enabled
+        self.logging_enabled = (
+            self.asedb_name is not None
+            or self.mongo_wrapper is not None
+            or self.wandb_run is not None
+        )
+
         self.init_extra_info()
 
     def init_extra_info(self):
@@ -121,6 +130,12 @@ class Logger:
                 self.pca_analyzer = TrajPCA(self.parent_traj)
 
     def write(self, atoms: Atoms, info: dict, extra_info: dict = {}):
+        # arrays (e.g. forces) are kept as arrays by the learners and only stringified here
+        info = {
+            key: str(value) if type(value) is ndarray else value
+            for key, value in info.items()
+        }
+
         if self.logger_id is not None:
             info_id = {}
             for key, value in info.items():
@@ -141,8 +156,6 @@ class Logger:
                 dict_to_write[write_key] = value
                 if value is None:
                     dict_to_write[write_key] = "-"
-                elif type(value) is ndarray:
-                    dict_to_write[write_key] = str(value)
             with ase.db.connect(self.asedb_name) as asedb:
                 asedb.write(
                     atoms,
@@ -156,7 +169,7 @@ class Logger:
 
         # write to Weights and Biases
         if self.wandb_run is not None:
-            wandb.log(
+            self.wandb_run.log(
                 {
                     key: value
                     for key, value in {**info, **extra_info}.items()
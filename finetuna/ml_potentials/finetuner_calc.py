@@ -10,6 +10,7 @@ import numpy as np
 from finetuna.ocp_models.adapter_gemnet_t import adapter_gemnet_t
 from finetuna.finetuner_utils.utils import GenericDB, GraphsListDataset
 from finetuna.finetuner_utils.trainer import Trainer
+from finetuna.embedding_index import EmbeddingIndex
 import ocpmodels
 
 
@@ -41,6 +42,19 @@ class FinetunerCalc(MLPCalc):
         dictionary of parameters to be passed to be used for initialization of the model/calculator
         should include a 'tuner' key containing a dict with the config specific to this class
         all other keys simply overwrite dicts in the give model_path yml file
+        setting 'graph_skin' (Angstrom) in the 'tuner' dict caches the GemNet interaction graph between predictions,
+        rebuilding it only once an atom has moved more than half the skin
+        setting 'prune_graph' to True in the 'tuner' dict only passes atoms within 'active_region_radius' (Angstrom,
+        defaults to (num_blocks + 1) * cutoff) of an atom not fixed by FixAtoms to the model, pruned atoms get zero forces
+        and the predicted energy only covers the kept atoms, while training energies refer to the full system,
+        so pruning is for force-only use: it is turned off with 'energy_training' and by the online learners when they use
+        the ML energy (ml_energy_only or the energy uncertainty_metric), see set_prune_graph
+        predictions go through a minimal inference snapshot of the model that is retaken after every retrain,
+        set 'inference_snapshot' to False in the 'tuner' dict to use the OCP predict instead,
+        or 'compile_inference' to True to wrap the snapshot with torch.compile
+        'uncertainty_method' in the 'tuner' dict selects the single model uncertainty: 'counter' (default) ticks up with
+        every prediction since the last training, 'latent_distance' uses the distance of each atom embedding to the
+        training set embeddings of the same element, scaled by 'latent_distance_scale'
     """
 
     implemented_properties = ["energy", "forces", "stds"]
@@ -77,9 +91,25 @@ class FinetunerCalc(MLPCalc):
         self.train_counter = 0
         self.max_neighbors = self.mlp_params["tuner"].get("max_neighbors", 50)
         self.cutoff = self.mlp_params["tuner"].get("cutoff", 6)
+        self.graph_skin = self.mlp_params["tuner"].get("graph_skin", None)
+        self.prune_graph = self.mlp_params["tuner"].get("prune_graph", False)
+        self.active_region_radius = self.mlp_params["tuner"].get(
+            "active_region_radius", None
+        )
+        self.inference_snapshot = self.mlp_params["tuner"].get(
+            "inference_snapshot", True
+        )
+        self.compile_inference = self.mlp_params["tuner"].get(
+            "compile_inference", False
+        )
         self.energy_training = self.mlp_params["tuner"].get("energy_training", False)
         if not self.energy_training:
             self.mlp_params["optim"]["energy_coefficient"] = 0
+        elif self.prune_graph:
+            print(
+                "FinetunerCalc: prune_graph is turned off, pruned predictions do not cover the full system energy"
+            )
+            self.prune_graph = False
         if "num_threads" in self.mlp_params["tuner"]:
             torch.set_num_threads(self.mlp_params["tuner"]["num_threads"])
         self.validation_split = self.mlp_params["tuner"].get("validation_split", None)
@@ -97,6 +127,22 @@ class FinetunerCalc(MLPCalc):
         else:
             raise ValueError("invalid unfreeze_blocks parameter given")
 
+        # init uncertainty estimate
+        self.uncertainty_method = self.mlp_params["tuner"].get(
+            "uncertainty_method", "counter"
+        )
+        self.latent_distance_scale = self.mlp_params["tuner"].get(
+            "latent_distance_scale", 1.0
+        )
+        # whether predictions also keep the atom embeddings in results["descriptors"]
+        self.compute_descriptors = False
+        if self.uncertainty_method == "counter":
+            self.embedding_index = None
+        elif self.uncertainty_method == "latent_distance":
+            self.embedding_index = EmbeddingIndex()
+        else:
+            raise ValueError("invalid uncertainty_method parameter given")
+
         # load the self.trainer
         self.load_trainer()
 
@@ -115,6 +161,11 @@ class FinetunerCalc(MLPCalc):
             checkpoint=self.checkpoint_path,
             cutoff=self.cutoff,
             max_neighbors=self.max_neighbors,
+            graph_skin=self.graph_skin,
+            prune_graph=self.prune_graph,
+            active_region_radius=self.active_region_radius,
+            inference_snapshot=self.inference_snapshot,
+            compile_inference=self.compile_inference,
         )
         sys.stdout = sys.__stdout__
 
@@ -159,7 +210,17 @@ class FinetunerCalc(MLPCalc):
         Returns:
             tuple: (energy, forces, energy_uncertainty, force_uncertainties)
         """
-        e_mean, f_mean = self.trainer.get_atoms_prediction(atoms)
+        if self.uncertainty_method == "latent_distance":
+            return self.calculate_latent_distance(atoms)
+
+        if self.compute_descriptors:
+            (
+                e_mean,
+                f_mean,
+                self.results["descriptors"],
+            ) = self.trainer.get_atoms_prediction(atoms, return_embeddings=True)
+        else:
+            e_mean, f_mean = self.trainer.get_atoms_prediction(atoms)
 
         self.train_counter += 1
         e_std = self.train_counter * 0.01
@@ -167,6 +228,117 @@ class FinetunerCalc(MLPCalc):
 
         return e_mean, f_mean, e_std, f_std
 
+    def calculate_latent_distance(self, atoms) -> tuple:
+        """
+        Single model uncertainty from the distance of each atom embedding to the nearest training embedding of the same element.
+        The force std of each atom is its distance times latent_distance_scale, the energy std is the sum over atoms.
+
+        Returns:
+            tuple: (energy, forces, energy_uncertainty, force_uncertainties)
+        """
+        e_mean, f_mean, embeddings = self.trainer.get_atoms_prediction(
+            atoms, return_embeddings=True
+        )
+        self.results["descriptors"] = embeddings
+        e_std, f_std = self.get_latent_distance_stds(atoms, embeddings)
+        return e_mean, f_mean, e_std, f_std
+
+    def get_latent_distance_stds(self, atoms, embeddings) -> tuple:
+        # atoms pruned from the active region do not contribute to the uncertainty
+        known = np.isfinite(embeddings).all(axis=1)
+        distances = np.zeros(len(atoms))
+        distances[known] = self.embedding_index.query(
+            atoms.get_atomic_numbers()[known], embeddings[known]
+        )
+
+        f_std = np.repeat(self.latent_distance_scale * distances[:, None], 3, axis=1)
+        e_std = self.latent_distance_scale * np.sum(distances)
+        return e_std, f_std
+
+    def calculate_ml_batch(self, images) -> list:
+        """
+        Batched version of calculate_ml for several atoms objects, evaluated in as few forward passes as possible.
+
+        Returns:
+            list: one (energy, forces, energy_uncertainty, force_uncertainties) tuple per image
+        """
+        results = []
+        if self.uncertainty_method == "latent_distance":
+            predictions = self.trainer.get_batch_predictions(
+                images, return_embeddings=True
+            )
+            for atoms, (e_mean, f_mean, embeddings) in zip(images, predictions):
+                e_std, f_std = self.get_latent_distance_stds(atoms, embeddings)
+                results.append((e_mean, f_mean, e_std, f_std))
+            return results
+
+        for e_mean, f_mean in self.trainer.get_batch_predictions(images):
+            self.train_counter += 1
+            e_std = self.train_counter * 0.01
+            f_std = np.zeros_like(f_mean) + (self.train_counter * 0.01)
+            results.append((e_mean, f_mean, e_std, f_std))
+        return results
+
+    def calculate_batch(self, images) -> list:
+        """
+        Calculates energies and forces of several atoms objects in batched forward passes,
+        setting the same uncertainty info on each atoms object as calculate().
+        Used by convert_to_singlepoint as a fast path for lists of images sharing this calculator.
+
+        Returns:
+            list: one (energy, forces) tuple per image
+        """
+        results = []
+        for atoms, (energy, forces, energy_uncertainty, force_uncertainties) in zip(
+            images, self.calculate_ml_batch(images)
+        ):
+            if self.ref_energy_parent is not None:
+                energy += self.ref_energy_parent - self.ref_energy_ml
+            self.set_uncertainty_info(
+                atoms, forces, energy_uncertainty, force_uncertainties
+            )
+            results.append((energy, forces))
+        return results
+
+    def get_descriptors(self, atoms):
+        """
+        Returns the per-atom embeddings of the last interaction block for atoms (nan rows for atoms pruned from the active region).
+        Reuses the embeddings of the last prediction if it was made for the same atoms and compute_descriptors is set.
+        """
+        if (
+            "descriptors" in self.results
+            and self.atoms is not None
+            and not self.check_state(atoms)
+        ):
+            return self.results["descriptors"]
+        _, _, embeddings = self.trainer.get_atoms_prediction(
+            atoms, return_embeddings=True
+        )
+        return embeddings
+
+    def descriptors_trainable(self) -> bool:
+        """
+        Returns whether any parameter outside of the output blocks is trainable, so training changes the descriptors.
+        """
+        return any(
+            param.requires_grad and not name.startswith("out_blocks.")
+            for name, param in self.trainer.get_model_module().named_parameters()
+        )
+
+    def update_embedding_index(self, dataset: "list[Atoms]"):
+        """
+        Rebuilds the embedding index from the atom embeddings of the current model on the dataset.
+        """
+        self.embedding_index.reset()
+        predictions = self.trainer.get_batch_predictions(
+            dataset, return_embeddings=True
+        )
+        for atoms, (_, _, embeddings) in zip(dataset, predictions):
+            known = np.isfinite(embeddings).all(axis=1)
+            self.embedding_index.add(
+                atoms.get_atomic_numbers()[known], embeddings[known]
+            )
+
     def calculate(self, atoms=None, properties=None, system_changes=all_changes):
         """
         Calculate properties including: energy, forces, uncertainties.
@@ -190,7 +362,32 @@ class FinetunerCalc(MLPCalc):
         self.results["stds"] = [energy_uncertainty, force_uncertainties]
         self.results["force_stds"] = force_uncertainties
         self.results["energy_stds"] = energy_uncertainty
-        atoms.info["energy_stds"] = self.results["energy_stds"]
+        self.set_uncertainty_info(
+            atoms, forces, energy_uncertainty, force_uncertainties
+        )
+        return
+
+    def calculate_fast(self, atoms):
+        """
+        Calculate energy and forces with a single forward pass of the model,
+        without the embeddings and the uncertainty estimate.
+
+        Returns:
+            tuple: (energy, forces)
+        """
+        energy, forces = self.trainer.get_atoms_prediction(atoms)
+        if self.ref_energy_parent is not None:
+            energy += self.ref_energy_parent - self.ref_energy_ml
+        return energy, forces
+
+    def set_uncertainty_info(
+        self, atoms, forces, energy_uncertainty, force_uncertainties
+    ):
+        """
+        Records the energy std and the relative force uncertainty (mean force std over mean force of the unconstrained atoms)
+        in atoms.info, where the learners read them from.
+        """
+        atoms.info["energy_stds"] = energy_uncertainty
 
         if atoms.constraints:
             constraints_index = atoms.constraints[0].index
@@ -219,7 +416,6 @@ class FinetunerCalc(MLPCalc):
 
         atoms.info["max_force_stds"] = abs_force_uncertainty / avg_forces
         # atoms.info["max_force_stds"] = np.nanmax(self.results["force_stds"])
-        return
 
     def train(self, parent_dataset: "list[Atoms]", new_dataset: "list[Atoms]" = None):
         """
@@ -255,6 +451,9 @@ class FinetunerCalc(MLPCalc):
         if self.ref_energy_parent is not None:
             self.ref_energy_ml, f = self.trainer.get_atoms_prediction(self.ref_atoms)
 
+        if self.embedding_index is not None:
+            self.update_embedding_index(parent_dataset)
+
     def train_ocp(self, dataset):
         """
         Overwritable if doing ensembling of ocp models
@@ -293,7 +492,10 @@ class FinetunerCalc(MLPCalc):
         get train_loader object to replace for the ocp model trainer to train on
         """
 
-        graphs_list = [self.trainer.a2g_convert(atoms, True) for atoms in dataset]
+        graphs_list = [
+            self.trainer.a2g_convert(atoms, True, self.trainer.get_active_mask(atoms))
+            for atoms in dataset
+        ]
 
         for graph in graphs_list:
             graph.fid = 0
@@ -315,6 +517,18 @@ class FinetunerCalc(MLPCalc):
 
         return data_loader
 
+    def set_prune_graph(self, prune_graph):
+        """
+        Turns graph pruning off (or back on with the active region radius of the config).
+        Pruned predictions only cover the energy of the active region, turn pruning off wherever the ML energy is used.
+        """
+        self.prune_graph = prune_graph
+        self.trainer.active_region_radius = None
+        if prune_graph:
+            self.trainer.active_region_radius = (
+                self.trainer.get_default_active_region_radius(self.active_region_radius)
+            )
+
     def set_lr(self, lr):
         self.trainer.config["optim"]["lr_initial"] = lr
 
@@ -336,3 +550,21 @@ class FinetunerCalc(MLPCalc):
         self.ref_atoms = atoms
         self.ref_energy_parent = self.ref_atoms.get_potential_energy()
         self.ref_energy_ml, f = self.trainer.get_atoms_prediction(self.ref_atoms)
+
+
+class ClonedFinetunerCalc(FinetunerCalc):
+    """
+    FinetunerCalc sharing the trainer (and so the model) of finetuner_calc, e.g. to attach the same model
+    to several images without loading the checkpoint again.
+    """
+
+    def __init__(self, finetuner_calc: FinetunerCalc):
+        self.finetuner_calc = finetuner_calc
+        FinetunerCalc.__init__(
+            self, finetuner_calc.checkpoint_path, finetuner_calc.mlp_params
+        )
+        self.ml_model = True
+        self.embedding_index = finetuner_calc.embedding_index
+
+    def load_trainer(self):
+        self.trainer = self.finetuner_calc.trainer
@@ -1,5 +1,8 @@
 from finetuna.ml_potentials.finetuner_calc import FinetunerCalc
 from finetuna.ml_potentials.ml_potential_calc import MLPCalc
+from finetuna.finetuner_utils.utils import share_frozen_parameters
+from finetuna.finetuner_utils.shared_trunk import SharedTrunkEnsemble
+import torch
 from ase.atoms import Atoms
 import numpy as np
 import copy
@@ -41,6 +44,9 @@ class FinetunerEnsembleCalc(FinetunerCalc):
 
     mlp_params: dict
         dictionary of parameters to be passed to be used for initialization of the model/calculator
+        the 'tuner' dict accepts 'share_frozen_parameters' (default True) to keep frozen weights that are equal
+        across members in memory only once, and 'shared_trunk_inference' (default True) to evaluate the
+        shared interaction blocks once for all members when only their output blocks differ
     """
 
     def __init__(
@@ -74,20 +80,41 @@ class FinetunerEnsembleCalc(FinetunerCalc):
         if "tuner" not in mlp_params_copy:
             mlp_params_copy["tuner"] = {}
         self.ensemble_method = mlp_params_copy["tuner"].get("ensemble_method", "mean")
+        self.share_frozen_parameters = mlp_params_copy["tuner"].get(
+            "share_frozen_parameters", True
+        )
+        self.shared_trunk_inference = mlp_params_copy["tuner"].get(
+            "shared_trunk_inference", True
+        )
+        self.shared_trunk = None
         super().__init__(
             checkpoint_path=checkpoint_paths[0],
             mlp_params=mlp_params_copy,
         )
         MLPCalc.__init__(self, mlp_params=mlp_params_copy)
+        # the ensemble spread is the uncertainty, no single model estimate is needed
+        self.embedding_index = None
 
     def init_model(self):
         self.model_name = "ensemble"
         self.ml_model = True
+        self.shared_trunk = None
 
         for finetuner in self.finetuner_calcs:
             finetuner.init_model()
 
+        # frozen weights loaded from the same checkpoint are kept once, only the unfrozen blocks are per member
+        if self.share_frozen_parameters:
+            leader = self.finetuner_calcs[0].trainer
+            for finetuner in self.finetuner_calcs[1:]:
+                share_frozen_parameters(
+                    leader.get_model_module(),
+                    finetuner.trainer.get_model_module(),
+                    optimizer=finetuner.trainer.optimizer,
+                )
+
     def train_ocp(self, dataset):
+        self.shared_trunk = None
         for finetuner in self.finetuner_calcs:
             start = time.time()
             finetuner.train_ocp(dataset)
@@ -112,13 +139,64 @@ class FinetunerEnsembleCalc(FinetunerCalc):
         Returns:
             tuple: (energy, forces, energy_uncertainty, force_uncertainties)
         """
+        shared_trunk = self.get_shared_trunk()
+        if shared_trunk is not None:
+            return self.calculate_shared_trunk(shared_trunk, atoms)
+
         energy_list = []
         forces_list = []
-        for finetuner in self.finetuner_calcs:
-            energy, forces = finetuner.trainer.get_atoms_prediction(atoms)
+        for i, finetuner in enumerate(self.finetuner_calcs):
+            # the descriptors come from the leader pass, no extra forward pass is needed for them
+            if i == 0 and self.compute_descriptors:
+                (
+                    energy,
+                    forces,
+                    self.results["descriptors"],
+                ) = finetuner.trainer.get_atoms_prediction(
+                    atoms, return_embeddings=True
+                )
+            else:
+                energy, forces = finetuner.trainer.get_atoms_prediction(atoms)
             energy_list.append(energy)
             forces_list.append(forces)
 
+        return self.reduce_ensemble(energy_list, forces_list)
+
+    def calculate_ml_batch(self, images) -> list:
+        """
+        Batched version of calculate_ml, every member evaluates all images in batched forward passes.
+
+        Returns:
+            list: one (energy, forces, energy_uncertainty, force_uncertainties) tuple per image
+        """
+        member_predictions = [
+            finetuner.trainer.get_batch_predictions(images)
+            for finetuner in self.finetuner_calcs
+        ]
+        results = []
+        for i in range(len(images)):
+            energy_list = [predictions[i][0] for predictions in member_predictions]
+            forces_list = [predictions[i][1] for predictions in member_predictions]
+            results.append(self.reduce_ensemble(energy_list, forces_list))
+        return results
+
+    def calculate_fast(self, atoms):
+        """
+        Calculate energy and forces with the leader (first) member only, without the other members and the ensemble spread.
+        Equal to the full prediction with ensemble_method "leader", with "mean" it differs by the deviation of the leader from the mean.
+
+        Returns:
+            tuple: (energy, forces)
+        """
+        energy, forces = self.finetuner_calcs[0].trainer.get_atoms_prediction(atoms)
+        if self.ref_energy_parent is not None:
+            energy += self.ref_energy_parent - self.ref_energy_ml
+        return energy, forces
+
+    def reduce_ensemble(self, energy_list, forces_list) -> tuple:
+        """
+        Combines the member predictions into (energy, forces, energy_uncertainty, force_uncertainties).
+        """
         if self.ensemble_method == "mean":
             e_mean = np.mean(energy_list)
             f_mean = np.mean(forces_list, axis=0)
@@ -134,6 +212,84 @@ class FinetunerEnsembleCalc(FinetunerCalc):
 
         return e_mean, f_mean, e_std, f_stds
 
+    def get_descriptors(self, atoms):
+        """
+        Returns the per-atom embeddings of the leader member for atoms (nan rows for atoms pruned from the active region).
+        Reuses the embeddings of the last prediction if it was made for the same atoms and compute_descriptors is set.
+        """
+        if (
+            "descriptors" in self.results
+            and self.atoms is not None
+            and not self.check_state(atoms)
+        ):
+            return self.results["descriptors"]
+        _, _, embeddings = self.finetuner_calcs[0].trainer.get_atoms_prediction(
+            atoms, return_embeddings=True
+        )
+        return embeddings
+
+    def descriptors_trainable(self) -> bool:
+        return self.finetuner_calcs[0].descriptors_trainable()
+
+    def get_shared_trunk(self):
+        """
+        Returns the shared trunk inference engine for the members, or None if they cannot share their trunk.
+        The check is redone after every retrain, since it depends on which parameters are frozen and shared.
+        """
+        if not self.shared_trunk_inference:
+            return None
+        if self.shared_trunk is None:
+            trainers = [finetuner.trainer for finetuner in self.finetuner_calcs]
+            if SharedTrunkEnsemble.is_supported(trainers):
+                self.shared_trunk = SharedTrunkEnsemble(trainers)
+            else:
+                self.shared_trunk = False
+        return self.shared_trunk if self.shared_trunk else None
+
+    def calculate_shared_trunk(self, shared_trunk, atoms):
+        """
+        Evaluates all members with one pass through the shared trunk,
+        reducing the ensemble statistics on-tensor before a single transfer to the host.
+        """
+        leader = self.finetuner_calcs[0].trainer
+        batch, active_mask = leader.get_atoms_batch(atoms)
+        with leader.get_graph_context():
+            if self.compute_descriptors:
+                energies, forces, embeddings = shared_trunk(
+                    batch, return_embeddings=True
+                )
+                self.results["descriptors"] = leader.scatter_active_embeddings(
+                    embeddings.float().cpu().numpy(), active_mask, len(atoms)
+                )
+            else:
+                energies, forces = shared_trunk(batch)
+        energies = energies.view(-1)
+
+        if self.ensemble_method == "mean":
+            e_mean = energies.mean()
+            f_mean = forces.mean(dim=0)
+        elif self.ensemble_method == "leader":
+            e_mean = energies[0]
+            f_mean = forces[0]
+        else:
+            raise ValueError("invalid ensemble method provided")
+        e_std = energies.std(unbiased=False)
+        f_stds = forces.std(dim=0, unbiased=False)
+
+        results = torch.cat(
+            [e_mean.view(1), e_std.view(1), f_mean.flatten(), f_stds.flatten()]
+        )
+        results = results.cpu().numpy()
+        f_mean, f_stds = results[2:].reshape(2, -1, 3)
+
+        self.train_counter += 1
+        return (
+            results[0],
+            leader.scatter_active_forces(f_mean, active_mask, len(atoms)),
+            results[1],
+            leader.scatter_active_forces(f_stds, active_mask, len(atoms)),
+        )
+
     def save(
         self,
         config_file="saved_config.yml",
@@ -162,9 +318,17 @@ class FinetunerEnsembleCalc(FinetunerCalc):
             save_dict["model_paths"].append(calc.model_path)
             save_dict["checkpoint_paths"].append(checkpoint_path)
             save_dict["finetuner"].append(calc.mlp_params)
+        # make sure the checkpoints referenced by the saved config are on disk
+        for calc in self.finetuner_calcs:
+            calc.trainer.wait_for_checkpoints()
         with open(config_file, "w") as file:
             yaml.dump(save_dict, file)
 
+    def set_prune_graph(self, prune_graph):
+        FinetunerCalc.set_prune_graph(self, prune_graph)
+        for finetuner in self.finetuner_calcs:
+            finetuner.set_prune_graph(prune_graph)
+
     def set_lr(self, lr):
         for finetuner in self.finetuner_calcs:
             finetuner.set_lr(lr)
@@ -40,6 +40,22 @@ class MLPCalc(Calculator):
         if properties is None:
             properties = self.implemented_properties
 
+    def calculate_fast(self, atoms):
+        """
+        Calculate energy and forces without the uncertainty estimate, for the steps of learners that skip
+        their uncertainty checks (see MDLearner).
+        Designed to be overwritten by children with a cheaper prediction, by default the regular calculate is used.
+
+        Args:
+            atoms: ase Atoms object
+
+        Returns:
+            tuple: (energy, forces)
+        """
+        atoms = atoms.copy()
+        atoms.calc = self
+        return atoms.get_potential_energy(), atoms.get_forces(apply_constraint=False)
+
     def train(self, parent_dataset: "list[Atoms]", new_dataset: "list[Atoms]" = None):
         """
         Train the ml model by fitting a new model on the parent dataset,
@@ -13,6 +13,7 @@ __email__ = "ktran@andrew.cmu.edu"
 
 import os
 from collections import OrderedDict
+from functools import lru_cache
 import datetime
 import json
 import spglib
@@ -255,29 +256,34 @@ def make_atoms_from_doc(doc):
     return atoms
 
 
+@lru_cache(maxsize=None)
+def get_commit_id():
+    """
+    Returns the git commit of the working directory (or of /home/finetuna), or None.
+    Looked up once per process, instead of starting git for every logger.
+    """
+    try:
+        return subprocess.check_output(["git", "describe", "--always"]).strip().decode()
+    except Exception:
+        try:
+            return (
+                subprocess.check_output(
+                    ["git", "describe", "--always"], cwd="/home/finetuna"
+                )
+                .strip()
+                .decode()
+            )
+        except Exception:
+            return None
+
+
 class MongoWrapper:
     def __init__(
         self, mongo_collection, learner_params, ml_potential, parent_calc, base_calc
     ):
         self.first = True
         self.mongo_collection = mongo_collection
-        try:
-            self.commit_id = (
-                subprocess.check_output(["git", "describe", "--always"])
-                .strip()
-                .decode()
-            )
-        except Exception:
-            try:
-                self.commit_id = (
-                    subprocess.check_output(
-                        ["git", "describe", "--always"], cwd="/home/finetuna"
-                    )
-                    .strip()
-                    .decode()
-                )
-            except Exception:
-                self.commit_id = None
+        self.commit_id = get_commit_id()
         self.run_id = uuid4()
         self.params = {
             "learner": learner_params,
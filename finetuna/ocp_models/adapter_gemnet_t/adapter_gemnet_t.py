@@ -186,19 +186,22 @@ class AdapterGemNetT(GemNetT):
                 )  # (nAtoms, num_targets, 3)
                 F_t = F_t.squeeze(1)  # (nAtoms, 3)
             else:
+                # the force graph is only kept to backpropagate force losses during training
                 if self.num_targets > 1:
                     forces = []
                     for i in range(self.num_targets):
                         # maybe this can be solved differently
                         forces += [
                             -torch.autograd.grad(
-                                E_t[:, i].sum(), pos, create_graph=True
+                                E_t[:, i].sum(), pos, create_graph=self.training
                             )[0]
                         ]
                     F_t = torch.stack(forces, dim=1)
                     # (nAtoms, num_targets, 3)
                 else:
-                    F_t = -torch.autograd.grad(E_t.sum(), pos, create_graph=True)[0]
+                    F_t = -torch.autograd.grad(
+                        E_t.sum(), pos, create_graph=self.training
+                    )[0]
                     # (nAtoms, 3)
 
             return E_t, F_t  # (nMolecules, num_targets), (nAtoms, 3)
@@ -2,11 +2,9 @@ from ocpmodels.models.gemnet.gemnet import GemNetT
 from ocpmodels.common.registry import registry
 import torch
 import torch_geometric
-from ocpmodels.common.utils import conditional_grad
 from ocpmodels.models.gemnet.utils import (
     inner_product_normalized,
 )
-from torch_scatter import scatter
 from ocpmodels.datasets.lmdb_dataset import data_list_collater
 from tqdm import tqdm
 from ocpmodels.common import distutils
@@ -76,30 +74,29 @@ class IntDescriptorGemNetT(GemNetT):
 
         descriptor = []
 
-        for i, batch_list in tqdm(
-            enumerate(data_loader),
-            total=len(data_loader),
-            position=rank,
-            desc="device {}".format(rank),
-            disable=True,
-        ):
-            for batch in batch_list:
-                out = self.forward(batch)
-                descriptor.append(out)
+        with torch.inference_mode():
+            for i, batch_list in tqdm(
+                enumerate(data_loader),
+                total=len(data_loader),
+                position=rank,
+                desc="device {}".format(rank),
+                disable=True,
+            ):
+                for batch in batch_list:
+                    out = self.forward(batch)
+                    descriptor.append(out)
 
         out_h = descriptor[0][0].detach().numpy()
         out_m = descriptor[0][1].detach().numpy()
         return out_h, out_m
 
-    @conditional_grad(torch.enable_grad())
     def forward(self, data):
-        pos = data.pos
-        batch = data.batch
+        """
+        Returns the atom and edge embeddings after the last interaction block,
+        no energies or forces are computed so no gradients are needed.
+        """
         atomic_numbers = data.atomic_numbers.long()
 
-        if self.regress_forces and not self.direct_forces:
-            pos.requires_grad_(True)
-
         (
             edge_index,
             neighbors,
@@ -154,47 +151,3 @@ class IntDescriptorGemNetT(GemNetT):
             E_t += E
 
         return h, m
-        # No need to do any of the force and energry calculations after this
-
-        nMolecules = torch.max(batch) + 1
-        if self.extensive:
-            E_t = scatter(
-                E_t, batch, dim=0, dim_size=nMolecules, reduce="add"
-            )  # (nMolecules, num_targets)
-        else:
-            E_t = scatter(
-                E_t, batch, dim=0, dim_size=nMolecules, reduce="mean"
-            )  # (nMolecules, num_targets)
-
-        if self.regress_forces:
-            if self.direct_forces:
-                # map forces in edge directions
-                F_st_vec = F_st[:, :, None] * V_st[:, None, :]
-                # (nEdges, num_targets, 3)
-                F_t = scatter(
-                    F_st_vec,
-                    idx_t,
-                    dim=0,
-                    dim_size=data.atomic_numbers.size(0),
-                    reduce="add",
-                )  # (nAtoms, num_targets, 3)
-                F_t = F_t.squeeze(1)  # (nAtoms, 3)
-            else:
-                if self.num_targets > 1:
-                    forces = []
-                    for i in range(self.num_targets):
-                        # maybe this can be solved differently
-                        forces += [
-                            -torch.autograd.grad(
-                                E_t[:, i].sum(), pos, create_graph=True
-                            )[0]
-                        ]
-                    F_t = torch.stack(forces, dim=1)
-                    # (nAtoms, num_targets, 3)
-                else:
-                    F_t = -torch.autograd.grad(E_t.sum(), pos, create_graph=True)[0]
-                    # (nAtoms, 3)
-
-            return E_t, F_t  # (nMolecules, num_targets), (nAtoms, 3)
-        else:
-            return E_t
@@ -4,8 +4,9 @@ from ase.io.trajectory import Trajectory
 from ase.optimize.bfgs import BFGS
 from finetuna.atomistic_methods import Relaxation
 from finetuna.calcs import Dummy
-from finetuna.calcs import DeltaCalc
-from finetuna.utils import compute_with_calc
+from finetuna.calcs import DeltaCalc, ResultCache
+from finetuna.utils import compute_with_calc, copy_images
+from finetuna.coreset import farthest_point_selection, get_structure_descriptor
 import numpy as np
 from ase.calculators.calculator import Calculator
 from finetuna.logger import Logger
@@ -55,6 +56,8 @@ class OfflineActiveLearner:
         self.parent_calc = parent_calc
         self.base_calc = base_calc
         self.calcs = [parent_calc, base_calc]
+        # base calc results by geometry, shared by all delta calcs so queried images are evaluated by the base calc only once
+        self.base_cache = ResultCache(learner_params.get("base_cache_size", 16))
 
         if mongo_db is None:
             mongo_db = {"offline_learner": None}
@@ -103,10 +106,24 @@ class OfflineActiveLearner:
 
         self.max_iterations = self.learner_params.get("max_iterations", 20)
         self.samples_to_retrain = self.learner_params.get("samples_to_retrain", 1)
+        # "random", "max_uncertainty" or "kcenter", see query_func
+        self.query_method = self.learner_params.get("query_method", "random")
+        if self.query_method not in ["random", "max_uncertainty", "kcenter"]:
+            raise ValueError(
+                "invalid query method given (" + str(self.query_method) + ")"
+            )
         self.filename = self.learner_params.get("filename", "relax_example")
         self.file_dir = self.learner_params.get("file_dir", "./")
         self.seed = self.learner_params.get("seed", random.randint(0, 100000))
 
+        # continue every relaxation from the last frame checked with the parent with the previous hessian,
+        # instead of relaxing from the initial geometry again, keeping the sampled frames in memory
+        self.warm_start = self.learner_params.get("warm_start", False)
+        self.sample_candidates = []
+
+        # executor ("thread", "process" or a concurrent.futures.Executor) to run parent calls of a query concurrently
+        self.parent_executor = self.learner_params.get("parent_executor", None)
+
         random.seed(self.seed)
         self.query_seeds = random.sample(range(100000), self.max_iterations)
 
@@ -118,7 +135,9 @@ class OfflineActiveLearner:
         parent_ref_image = self.atomistic_method.initial_geometry
         base_ref_image = compute_with_calc([parent_ref_image], self.base_calc)[0]
         self.refs = [parent_ref_image, base_ref_image]
-        self.delta_sub_calc = DeltaCalc(self.calcs, "sub", self.refs)
+        self.delta_sub_calc = DeltaCalc(
+            self.calcs, "sub", self.refs, base_cache=self.base_cache
+        )
 
         # move training data into raw data for computing with delta calc
         raw_data = []
@@ -168,13 +187,29 @@ class OfflineActiveLearner:
         Executes after training the ml_potential in every active learning loop.
         """
         ml_potential = self.make_trainer_calc()
-        self.trained_calc = DeltaCalc([ml_potential, self.base_calc], "add", self.refs)
-
-        self.atomistic_method.run(calc=self.trained_calc, filename=self.fn_label)
-        self.sample_candidates = list(
-            self.atomistic_method.get_trajectory(filename=self.fn_label)
+        self.sampling_calc = ml_potential
+        self.trained_calc = DeltaCalc(
+            [ml_potential, self.base_calc], "add", self.refs, base_cache=self.base_cache
         )
 
+        if self.warm_start:
+            initial_structure = None
+            if self.sample_candidates:
+                initial_structure = self.sample_candidates[-1]
+            self.atomistic_method.run(
+                calc=self.trained_calc,
+                filename=self.fn_label,
+                initial_structure=initial_structure,
+                hessian=self.atomistic_method.hessian,
+                store_images=True,
+            )
+            self.sample_candidates = self.atomistic_method.images
+        else:
+            self.atomistic_method.run(calc=self.trained_calc, filename=self.fn_label)
+            self.sample_candidates = list(
+                self.atomistic_method.get_trajectory(filename=self.fn_label)
+            )
+
         substep = 0
         for image in self.sample_candidates:
             energy = image.get_potential_energy(apply_constraint=False)
@@ -225,13 +260,20 @@ class OfflineActiveLearner:
         self.add_data(queried_images, query_idx)
 
     def add_data(self, queried_images, query_idx):
-        self.new_dataset = compute_with_calc(queried_images, self.delta_sub_calc)
+        self.new_dataset = compute_with_calc(
+            queried_images, self.delta_sub_calc, executor=self.parent_executor
+        )
         self.training_data += self.new_dataset
         self.parent_calls += len(self.new_dataset)
 
         un_delta_new_dataset = []
         for image in self.new_dataset:
-            add_delta_calc = DeltaCalc([image.calc, self.base_calc], "add", self.refs)
+            add_delta_calc = DeltaCalc(
+                [image.calc, self.base_calc],
+                "add",
+                self.refs,
+                base_cache=self.base_cache,
+            )
             [un_delta_image] = compute_with_calc([image], add_delta_calc)
             un_delta_new_dataset.append(un_delta_image)
 
@@ -294,21 +336,74 @@ class OfflineActiveLearner:
 
     def query_func(self):
         """
-        Default random query strategy.
+        Default query strategy, selects samples_to_retrain candidates with the query_method learner param:
+
+        "random": uniformly at random
+
+        "max_uncertainty": the candidates with the largest force uncertainty of the ml potential
+
+        "kcenter": k-center greedy in the descriptor space of the ml potential, each candidate is the one farthest
+        from the training data and the candidates already selected, so the batch is both informative and diverse
+
+        The uncertainty based methods fall back to random before the ml potential has been trained.
+        The selected batch is calculated with the parent concurrently if parent_executor is given.
         """
+        if self.query_method != "random" and not isinstance(self.sampling_calc, Dummy):
+            if self.query_method == "max_uncertainty":
+                query_idx = self.query_max_uncertainty()
+            else:
+                query_idx = self.query_kcenter()
+            queried_images = [self.sample_candidates[idx] for idx in query_idx]
+            return queried_images, query_idx
+
+        # with warm_start the candidates are only the images of the latest run,
+        # which can be fewer than the samples requested
+        num_candidates = len(self.sample_candidates) - 1
+        if num_candidates < 1:
+            return [], []
         if self.samples_to_retrain < 2 and self.training_data == 0:
-            query_idx = random.sample(
-                range(1, len(self.sample_candidates)),
-                2,
-            )
+            num_samples = 2
         else:
-            query_idx = random.sample(
-                range(1, len(self.sample_candidates)),
-                self.samples_to_retrain,
-            )
+            num_samples = self.samples_to_retrain
+        query_idx = random.sample(
+            range(1, len(self.sample_candidates)),
+            min(num_samples, num_candidates),
+        )
         queried_images = [self.sample_candidates[idx] for idx in query_idx]
         return queried_images, query_idx
 
+    def query_max_uncertainty(self):
+        # uncertainties the candidates carry over from sampling are not the ones of the sampling calc
+        candidates = copy_images(self.sample_candidates[1:])
+        for image in candidates:
+            image.info.pop("max_force_stds", None)
+        candidates = compute_with_calc(candidates, self.sampling_calc, inplace=True)
+        if any("max_force_stds" not in image.info for image in candidates):
+            raise ValueError(
+                "max_uncertainty query method requires an ml_potential setting max_force_stds in atoms.info, "
+                + type(self.sampling_calc).__name__
+                + " does not"
+            )
+        uncertainties = [image.info["max_force_stds"] for image in candidates]
+        order = np.argsort(uncertainties)[::-1][: self.samples_to_retrain]
+        return [int(i) + 1 for i in order]
+
+    def query_kcenter(self):
+        if not hasattr(self.sampling_calc, "get_descriptors"):
+            raise ValueError(
+                "kcenter query method requires an ml_potential implementing get_descriptors()"
+            )
+        images = self.training_data + self.sample_candidates[1:]
+        descriptors = np.array(
+            [get_structure_descriptor(self.sampling_calc, image) for image in images]
+        )
+        selected = farthest_point_selection(
+            descriptors,
+            min(self.samples_to_retrain, len(self.sample_candidates) - 1),
+            list(range(len(self.training_data))),
+        )
+        return [i - len(self.training_data) + 1 for i in selected]
+
     def make_trainer_calc(self, ml_potential=None):
         """
         Default ml_potential calc after train. Assumes ml_potential has a 'get_calc'
@@ -1,5 +1,5 @@
 from finetuna.online_learner.online_learner import OnlineLearner
-from finetuna.calcs import DeltaCalc
+from finetuna.calcs import DeltaCalc, ResultCache
 from finetuna.utils import convert_to_singlepoint, subtract_deltas
 from finetuna.logger import Logger
 from finetuna.utils import compute_with_calc
@@ -22,6 +22,8 @@ class DeltaLearner(OnlineLearner):
     ):
         self.base_calc = base_calc
         self.refs = None
+        # base calc results by geometry, shared by the delta add (predictions) and delta sub (training data) calcs
+        self.base_cache = ResultCache(learner_params.get("base_cache_size", 16))
 
         OnlineLearner.__init__(
             self,
@@ -47,7 +49,9 @@ class DeltaLearner(OnlineLearner):
         self.parent_ref = initial_structure.copy()
         self.parent_ref.calc = deepcopy(initial_structure.calc)
 
-        self.base_ref = compute_with_calc([initial_structure.copy()], self.base_calc)[0]
+        self.base_ref = compute_with_calc(
+            [initial_structure.copy()], self.base_calc, inplace=True
+        )[0]
 
         self.refs = [self.parent_ref, self.base_ref]
 
@@ -55,6 +59,7 @@ class DeltaLearner(OnlineLearner):
             [self.ml_potential, self.base_calc],
             "add",
             self.refs,
+            base_cache=self.base_cache,
         )
 
     def get_ml_calc(self):
@@ -64,19 +69,17 @@ class DeltaLearner(OnlineLearner):
 
     def get_ml_prediction(self, atoms):
         """
-        Helper function which takes an atoms object with no calc attached.
+        Helper function which takes an atoms object with no calc attached (see get_prediction_atoms).
         Makes an Ml prediction.
         Performs a delta add operation since the ML model was trained on delta sub data.
-        Returns it with a delta ML potential predicted singlepoint.
-        Designed to be overwritten by DeltaLearner which needs to modify ML predictions.
+        Returns it with a delta ML potential predicted singlepoint, the atoms object is modified in place.
+        The ML model and the base calc each run once: the delta add reuses the results the ML model
+        keeps for this geometry, and the uncertainty info it set stays on the atoms object.
         """
-        atoms_copy = atoms.copy()
-        atoms_copy.set_calculator(self.ml_potential)
-        (atoms_with_info,) = convert_to_singlepoint([atoms_copy])
-        atoms_copy.set_calculator(self.add_delta_calc)
-        (atoms_ML,) = convert_to_singlepoint([atoms_copy])
-        for key, value in atoms_with_info.info.items():
-            atoms_ML.info[key] = value
+        atoms.set_calculator(self.ml_potential)
+        convert_to_singlepoint([atoms], inplace=True)
+        atoms.set_calculator(self.add_delta_calc)
+        (atoms_ML,) = convert_to_singlepoint([atoms], inplace=True)
         return atoms_ML
 
     def add_to_dataset(self, new_data):
@@ -90,7 +93,9 @@ class DeltaLearner(OnlineLearner):
         if self.refs is None:
             self.init_refs(new_data)
 
-        (delta_sub_data,) = subtract_deltas([new_data], self.base_calc, self.refs)
+        (delta_sub_data,) = subtract_deltas(
+            [new_data], self.base_calc, self.refs, base_cache=self.base_cache
+        )
         partial_dataset = [delta_sub_data]
         self.parent_dataset += partial_dataset
         return partial_dataset
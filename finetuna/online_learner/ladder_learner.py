@@ -0,0 +1,140 @@
+import numpy as np
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.utils import convert_to_singlepoint, attach_singlepoint
+
+__author__ = "Joseph Musielewicz"
+__email__ = "al.mlp.package@gmail.com"
+
+
+class LadderLearner(OnlineLearner):
+    """
+    Online learner with a ladder of parent calculators of increasing fidelity (and cost),
+    e.g. EMT -> DFT with loose kpoints -> production DFT (the parent_calc, top of the ladder).
+
+    Uncertainty queries (static, dynamic, novelty, nsteps and position) start at the cheapest rung and escalate
+    to the next rung as long as the rung forces differ from the ML prediction by more than escalation_tolerance
+    (mean absolute force error, in the learner params). The first rung agreeing with the model answers the query.
+    Pretraining, fmax_verify_threshold and final point queries always go to the top of the ladder.
+
+    Data from a lower rung is trained on with a fidelity offset: its energy is shifted by the energy difference
+    between the top and that rung, calibrated on the first structure calculated with the top of the ladder
+    (so lower rungs are only used once a top calculation was made). The offset is a constant energy shift only,
+    the forces of a lower rung are trained on unchanged, so every rung admitted to the ladder must have forces
+    close enough to the top to train on (escalation_tolerance only compares them to the ML prediction).
+    The fidelity (rung index, top = len(ladder_calcs)) of every training point is kept in its info.
+
+    Parameters
+    ----------
+    ladder_calcs: list[Calculator]
+        rungs below the parent_calc, from cheapest to most expensive
+    """
+
+    def __init__(
+        self,
+        learner_params,
+        parent_dataset,
+        ml_potential,
+        parent_calc,
+        ladder_calcs,
+        mongo_db=None,
+        optional_config=None,
+    ):
+        self.ladder_calcs = list(ladder_calcs)
+        self.rung_offsets = [None] * len(self.ladder_calcs)
+        self.rung_calls = [0] * len(self.ladder_calcs)
+
+        OnlineLearner.__init__(
+            self,
+            learner_params,
+            parent_dataset,
+            ml_potential,
+            parent_calc,
+            mongo_db=mongo_db,
+            optional_config=optional_config,
+        )
+
+    def init_learner_params(self):
+        OnlineLearner.init_learner_params(self)
+        self.escalation_tolerance = self.learner_params.get("escalation_tolerance", 0.1)
+
+    def init_info(self):
+        OnlineLearner.init_info(self)
+        self.info["fidelity"] = None
+        self.info["rung_calls"] = np.array(self.rung_calls)
+
+    def query_parent(self, atoms):
+        # pretrain, final point and fmax_verify_threshold queries always need the top of the ladder
+        if self.info["query"] not in [-2, -1, 1] and self.info["ml_forces"] is not None:
+            for level in range(len(self.ladder_calcs)):
+                if self.rung_offsets[level] is None:
+                    continue
+                new_data = self.query_rung(atoms, level)
+                error = np.mean(
+                    np.abs(
+                        new_data.get_forces(apply_constraint=self.constraint)
+                        - self.info["ml_forces"]
+                    )
+                )
+                if error <= self.escalation_tolerance:
+                    print(
+                        "LadderLearner: rung "
+                        + str(level)
+                        + " agrees with the model (force error "
+                        + str(error)
+                        + ")"
+                    )
+                    self.steps_since_last_query = 0
+                    if self.store_complete_dataset:
+                        self.complete_dataset.append(new_data)
+                    else:
+                        self.complete_dataset = [new_data]
+                    return new_data
+                print(
+                    "LadderLearner: rung "
+                    + str(level)
+                    + " disagrees with the model (force error "
+                    + str(error)
+                    + "), escalating"
+                )
+
+        new_data = OnlineLearner.query_parent(self, atoms)
+        new_data.info["fidelity"] = len(self.ladder_calcs)
+        self.info["fidelity"] = len(self.ladder_calcs)
+        self.calibrate_rungs(new_data)
+        return new_data
+
+    def query_rung(self, atoms, level):
+        """
+        Returns a copy of atoms with the singlepoint of the ladder rung level attached, shifted by the rung offset.
+        """
+        rung_atoms = atoms.copy()
+        rung_atoms.set_calculator(self.ladder_calcs[level])
+        convert_to_singlepoint([rung_atoms], inplace=True)
+        self.rung_calls[level] += 1
+        attach_singlepoint(
+            rung_atoms,
+            rung_atoms.get_potential_energy(apply_constraint=False)
+            + self.rung_offsets[level],
+            rung_atoms.get_forces(apply_constraint=False),
+        )
+        rung_atoms.info["check"] = True
+        rung_atoms.info["fidelity"] = level
+        self.info["fidelity"] = level
+        self.info["rung_calls"] = np.array(self.rung_calls)
+        return rung_atoms
+
+    def calibrate_rungs(self, top_data):
+        """
+        Sets the offsets of the uncalibrated rungs to the energy difference between the top and the rung on top_data.
+        """
+        for level, offset in enumerate(self.rung_offsets):
+            if offset is not None:
+                continue
+            rung_atoms = top_data.copy()
+            rung_atoms.set_calculator(self.ladder_calcs[level])
+            convert_to_singlepoint([rung_atoms], inplace=True)
+            self.rung_calls[level] += 1
+            self.rung_offsets[level] = top_data.get_potential_energy(
+                apply_constraint=False
+            ) - rung_atoms.get_potential_energy(apply_constraint=False)
+        self.info["rung_calls"] = np.array(self.rung_calls)
@@ -0,0 +1,197 @@
+import numpy as np
+from collections import deque
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.utils import attach_singlepoint
+
+__author__ = "Joseph Musielewicz"
+__email__ = "al.mlp.package@gmail.com"
+
+
+class MDLearner(OnlineLearner):
+    """
+    Online learner for molecular dynamics (e.g. with MDsimulate), where thousands of steps make the per step overhead matter.
+
+    In addition to the OnlineLearner learner params:
+
+    uncertainty_interval: the full uncertainty check (unsafe_prediction and parent_verify) runs every uncertainty_interval steps,
+    in between the prediction is made by get_fast_ml_prediction (without evaluating the uncertainty, see MLPCalc.calculate_fast) and the uncertainty is linearly extrapolated from the last two checks.
+    An extrapolated uncertainty above the last tolerance, or a retrain, triggers the full check on the next step.
+
+    query_batch_size: frames flagged by the check are buffered until query_batch_size frames are collected,
+    then they are calculated with the parent (concurrently if parent_executor is given) and trained on at once.
+    Buffered frames continue with the ML prediction, the frame completing the batch uses its parent result,
+    so flagged frames keep driving the dynamics with a prediction that was deemed unsafe until the batch is complete.
+    Frames still buffered at the end of the run are queried by MDsimulate.run, call flush_queries when driving the learner otherwise.
+
+    log_interval: steps are only logged (including the PCA) every log_interval steps and on parent calls.
+
+    history_length: length of the uncertainty history ring buffer, if dyn_avg_steps is not given.
+    """
+
+    def init_learner_params(self):
+        OnlineLearner.init_learner_params(self)
+        self.uncertainty_interval = self.learner_params.get("uncertainty_interval", 1)
+        self.query_batch_size = self.learner_params.get("query_batch_size", 1)
+        self.log_interval = self.learner_params.get("log_interval", 100)
+        if self.dyn_avg_steps is None:
+            self.uncertainty_history_length = self.learner_params.get(
+                "history_length", 1000
+            )
+
+        self.query_buffer = []
+        self.checked_uncertainties = deque(maxlen=2)
+        self.last_tolerance = None
+        self.steps_since_check = 0
+        self.check_next_step = True
+        self.log_step = True
+
+    def calculate(self, atoms, properties, system_changes):
+        print_uncertainty = self.print_uncertainty
+        # the uncertainty is only printed on the steps that are logged
+        self.print_uncertainty = print_uncertainty and self.log_step
+        try:
+            OnlineLearner.calculate(self, atoms, properties, system_changes)
+        finally:
+            self.print_uncertainty = print_uncertainty
+
+    def get_energy_and_forces(self, atoms, precalculated=False):
+        if precalculated or len(self.parent_dataset) < self.num_initial_points:
+            self.log_step = True
+            return OnlineLearner.get_energy_and_forces(self, atoms, precalculated)
+
+        self.init_info()
+        self.steps_since_check += 1
+
+        estimate = self.extrapolate_uncertainty()
+        check = (
+            self.check_next_step
+            or self.steps_since_check >= self.uncertainty_interval
+            or (estimate is not None and estimate > self.last_tolerance)
+        )
+
+        if check:
+            atoms_ML = self.get_ml_prediction(self.get_prediction_atoms(atoms))
+        else:
+            atoms_ML = self.get_fast_ml_prediction(self.get_prediction_atoms(atoms))
+
+        energy = atoms_ML.get_potential_energy(apply_constraint=self.constraint)
+        forces = atoms_ML.get_forces(apply_constraint=self.constraint)
+        if self.constraint:
+            constrained_forces = forces
+        else:
+            constrained_forces = atoms_ML.get_forces()
+        fmax = np.sqrt((constrained_forces**2).sum(axis=1).max())
+        self.info["ml_energy"] = energy
+        self.info["ml_forces"] = forces
+        self.info["ml_fmax"] = fmax
+        self.info["check"] = False
+        self.set_query_reason("noquery")
+
+        queried = False
+        if check:
+            self.steps_since_check = 0
+            self.check_next_step = False
+            unsafe_bool = self.unsafe_prediction(atoms_ML, fmax=fmax)
+            verify_bool = self.parent_verify(atoms_ML, fmax=fmax)
+
+            self.checked_uncertainties.append(
+                (self.curr_step, atoms_ML.info["max_force_stds"])
+            )
+            self.last_tolerance = atoms_ML.info["uncertain_tol"]
+            self.info["force_uncertainty"] = atoms_ML.info["max_force_stds"]
+            self.info["energy_uncertainty"] = atoms_ML.info.get("energy_stds", None)
+            self.info["novelty"] = atoms_ML.info.get("novelty", None)
+            self.info["dyn_uncertainty_tol"] = atoms_ML.info["dyn_uncertain_tol"]
+            self.info["stat_uncertain_tol"] = atoms_ML.info["stat_uncertain_tol"]
+            self.info["tolerance"] = self.last_tolerance
+
+            if unsafe_bool or verify_bool:
+                queried = True
+                self.query_buffer.append(self.get_query_atoms(atoms))
+                self.steps_since_last_query = 0
+        else:
+            self.info["force_uncertainty"] = estimate
+            self.info["tolerance"] = self.last_tolerance
+        self.info["buffered_queries"] = len(self.query_buffer)
+
+        if len(self.query_buffer) >= self.query_batch_size:
+            new_data = self.flush_queries()
+            self.info["check"] = True
+            if queried:
+                energy = new_data[-1].get_potential_energy(
+                    apply_constraint=self.constraint
+                )
+                forces = new_data[-1].get_forces(apply_constraint=self.constraint)
+                constrained_forces = new_data[-1].get_forces()
+                fmax = np.sqrt((constrained_forces**2).sum(axis=1).max())
+                self.info["parent_energy"] = energy
+                self.info["parent_forces"] = forces
+                self.info["parent_fmax"] = fmax
+        else:
+            self.add_to_complete_dataset(atoms_ML)
+
+        if self.ml_energy_only:
+            energy = self.info["ml_energy"]
+
+        self.info["parent_calls"] = self.parent_calls
+        self.info["current_step"] = self.curr_step
+        self.info["steps_since_last_query"] = self.steps_since_last_query
+        self.info["energy"] = energy
+        self.info["forces"] = forces
+        self.info["fmax"] = fmax
+
+        self.log_step = self.info["check"] or self.curr_step % self.log_interval == 0
+        if self.logger.logging_enabled and self.log_step:
+            extra_info = {}
+            extra_info.update(self.logger.get_pca(atoms))
+            if self.trained_at_least_once:
+                extra_info.update(
+                    self.logger.get_uncertainty(self.get_ml_calc(), self.info["check"])
+                )
+            self.logger.write(atoms, self.info, extra_info=extra_info)
+        else:
+            self.logger.step += 1
+
+        return energy, forces, fmax
+
+    def get_fast_ml_prediction(self, atoms):
+        """
+        ML prediction used on the steps between uncertainty checks, same contract as get_ml_prediction but without uncertainty info.
+        Uses the calculate_fast prediction of the ml potential (e.g. only the leader member of a FinetunerEnsembleCalc),
+        ml potentials without calculate_fast make the regular ML prediction.
+        """
+        if not hasattr(self.ml_potential, "calculate_fast"):
+            return self.get_ml_prediction(atoms)
+        energy, forces = self.ml_potential.calculate_fast(atoms)
+        attach_singlepoint(atoms, energy, forces)
+        return atoms
+
+    def extrapolate_uncertainty(self):
+        """
+        Returns the uncertainty at the current step linearly extrapolated from the last two checks,
+        the last checked uncertainty after a single check, or None before the first check.
+        """
+        if not self.checked_uncertainties:
+            return None
+        step, uncertainty = self.checked_uncertainties[-1]
+        if len(self.checked_uncertainties) == 1:
+            return uncertainty
+        previous_step, previous_uncertainty = self.checked_uncertainties[0]
+        slope = (uncertainty - previous_uncertainty) / (step - previous_step)
+        return max(0.0, uncertainty + slope * (self.curr_step - step))
+
+    def flush_queries(self):
+        """
+        Calculates the buffered frames with the parent and retrains once, returns the parent data.
+        """
+        if not self.query_buffer:
+            return []
+        new_data = self.query_parents(self.query_buffer)
+        self.query_buffer = []
+        partial_dataset = self.add_training_data(new_data)
+        self.retrain(partial_dataset)
+
+        # the uncertainties of the retrained model are not comparable to the previous checks
+        self.checked_uncertainties.clear()
+        self.check_next_step = True
+        return new_data
@@ -0,0 +1,136 @@
+import numpy as np
+from ase.calculators.singlepoint import SinglePointCalculator
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.utils import convert_to_singlepoint, attach_singlepoint
+
+__author__ = "Joseph Musielewicz"
+__email__ = "al.mlp.package@gmail.com"
+
+
+class NEBLearner(OnlineLearner):
+    """
+    Online learner for nudged elastic bands, evaluating all interior images of the band at once (see NEBcalc).
+
+    Every band update predicts all images with one batched ml potential call, checks every image for a parent query
+    with the usual online learner criteria, calculates the queried images with the parent (concurrently if
+    parent_executor is given in the learner params) and retrains the ml potential once.
+    A single log entry is written per band update, with the per image energies, uncertainties and query reasons as arrays.
+
+    Can still be used as a regular OnlineLearner calculator for single structures, e.g. to relax the endpoints.
+    """
+
+    def init_learner_params(self):
+        OnlineLearner.init_learner_params(self)
+        if self.no_position_change_steps is not None:
+            raise ValueError("no_position_change_steps is not supported by NEBLearner")
+
+    def calculate_band(self, images):
+        """
+        Attaches singlepoint results to every image of images (the interior images of a band),
+        images which already have results for their current positions are skipped.
+        """
+        stale = [
+            image
+            for image in images
+            if not isinstance(image.calc, SinglePointCalculator)
+            or image.calc.check_state(image)
+        ]
+        if not stale:
+            return
+
+        self.curr_step += 1
+        self.steps_since_last_query += 1
+        self.init_info()
+
+        # predict the band and decide which images to query
+        predictions = None
+        if len(self.parent_dataset) < self.num_initial_points:
+            queried = list(range(len(stale)))
+            reasons = [-1] * len(stale)
+        else:
+            predictions = self.get_ml_predictions([image.copy() for image in stale])
+            queried = []
+            reasons = []
+            for i, atoms_ML in enumerate(predictions):
+                constrained_forces = atoms_ML.get_forces()
+                fmax = np.sqrt((constrained_forces**2).sum(axis=1).max())
+                self.set_query_reason("noquery")
+                unsafe_bool = self.unsafe_prediction(atoms_ML, fmax=fmax)
+                verify_bool = self.parent_verify(atoms_ML, fmax=fmax)
+                if unsafe_bool or verify_bool:
+                    queried.append(i)
+                reasons.append(self.info["query"])
+
+        # calculate the queried images with the parent and retrain once
+        new_data = []
+        if queried:
+            new_data = self.query_parents([stale[i].copy() for i in queried])
+            partial_dataset = self.add_training_data(new_data)
+            self.retrain(partial_dataset)
+
+        results = {}
+        if predictions is not None:
+            for i, atoms_ML in enumerate(predictions):
+                results[i] = (
+                    atoms_ML.get_potential_energy(),
+                    atoms_ML.get_forces(apply_constraint=False),
+                )
+        for i, data in zip(queried, new_data):
+            energy = data.get_potential_energy()
+            if self.ml_energy_only and predictions is not None:
+                energy = results[i][0]
+            results[i] = (energy, data.get_forces(apply_constraint=False))
+
+        for i, image in enumerate(stale):
+            attach_singlepoint(image, *results[i])
+
+        self.log_band(stale, predictions, queried, reasons)
+
+    def get_ml_predictions(self, images):
+        """
+        Returns images (with no calc attached) with ML potential predicted singlepoints, predicted in one batch.
+        Designed to be overwritten by subclasses that modify ML predictions.
+        """
+        for image in images:
+            image.set_calculator(self.ml_potential)
+        return convert_to_singlepoint(images, inplace=True)
+
+    def log_band(self, images, predictions, queried, reasons):
+        energies = np.array([image.get_potential_energy() for image in images])
+        fmaxs = np.array(
+            [np.sqrt((image.get_forces() ** 2).sum(axis=1).max()) for image in images]
+        )
+
+        self.info["check"] = len(queried) > 0
+        self.info["query"] = np.array(reasons)
+        self.info["queried_images"] = np.array(queried)
+        self.info["energy"] = energies
+        self.info["fmax"] = np.max(fmaxs)
+        self.info["image_fmax"] = fmaxs
+        if predictions is not None:
+            self.info["ml_energy"] = np.array(
+                [atoms_ML.get_potential_energy() for atoms_ML in predictions]
+            )
+            self.info["force_uncertainty"] = np.array(
+                [atoms_ML.info["max_force_stds"] for atoms_ML in predictions]
+            )
+            self.info["tolerance"] = np.array(
+                [atoms_ML.info["uncertain_tol"] for atoms_ML in predictions]
+            )
+        self.info["parent_calls"] = self.parent_calls
+        self.info["current_step"] = self.curr_step
+        self.info["steps_since_last_query"] = self.steps_since_last_query
+
+        if self.print_uncertainty:
+            print(
+                "band uncertainty: "
+                + str(self.info["force_uncertainty"])
+                + ", tolerance: "
+                + str(self.info["tolerance"])
+            )
+
+        # one entry per band update, with the highest energy image as the structure
+        if self.logger.logging_enabled:
+            self.logger.write(images[int(np.argmax(energies))], self.info)
+        else:
+            self.logger.step += 1
@@ -3,12 +3,17 @@ import numpy as np
 from ase.calculators.calculator import Calculator
 from ase.calculators.singlepoint import SinglePointCalculator, SinglePointDFTCalculator
 from finetuna.logger import Logger
+from finetuna.embedding_index import EmbeddingIndex
+from finetuna.compact_dataset import CompactDataset
+from finetuna.coreset import select_coreset, get_structure_key
+from finetuna.parent_store import ParentDataStore, get_calc_key
 from finetuna.utils import convert_to_singlepoint, convert_to_top_k_forces
 import time
 import math
 import ase.db
 import queue
 import os
+from collections import deque
 
 __author__ = "Joseph Musielewicz"
 __email__ = "al.mlp.package@gmail.com"
@@ -31,12 +36,35 @@ class OnlineLearner(Calculator):
         self.ml_potential = ml_potential
         self.learner_params = learner_params
         self.init_learner_params()
-        self.parent_dataset = []
-        self.complete_dataset = []
+        self.parent_dataset = self.new_dataset()
+        self.complete_dataset = self.new_dataset(complete=True)
         self.queried_db = ase.db.connect(self.db_name, append=False)
         self.trained_at_least_once = False
         self.check_final_point = False
-        self.uncertainty_history = []
+        self.uncertainty_history = deque(maxlen=self.uncertainty_history_length)
+        self.scratch_atoms = None
+        self.last_frame_atoms = None
+        self.retrain_count = 0
+        self.coreset_descriptors = {}
+
+        # nearest neighbor index over the atom embeddings of the training data
+        self.novelty_index = None
+        if self.novelty_threshold is not None:
+            if not hasattr(self.ml_potential, "get_descriptors"):
+                raise ValueError(
+                    "novelty_threshold requires an ml_potential implementing get_descriptors()"
+                )
+            self.novelty_index = EmbeddingIndex(backend=self.novelty_index_backend)
+            self.ml_potential.compute_descriptors = True
+
+        # pruned graphs only predict the energy of the active region
+        if getattr(self.ml_potential, "prune_graph", False) and (
+            self.ml_energy_only or self.uncertainty_metric == "energy"
+        ):
+            warn(
+                "Graph pruning of the ml potential is turned off, the ML energy is used by the learner"
+            )
+            self.ml_potential.set_prune_graph(False)
 
         print("Parent calc is :", self.parent_calc)
         self.parent_calc_pausable = False
@@ -52,6 +80,18 @@ class OnlineLearner(Calculator):
         self.curr_step = 0
         self.steps_since_last_query = 0
 
+        # persistent store of parent data shared between runs
+        self.parent_store = None
+        self.parent_store_seeded = False
+        if self.parent_store_params is not None:
+            calc_key = self.parent_store_params.get("calc_key", None)
+            if calc_key is None:
+                calc_key = get_calc_key(self.parent_calc)
+            self.parent_store = ParentDataStore(
+                db_path=self.parent_store_params.get("db_path", "parent_store.db"),
+                calc_key=calc_key,
+            )
+
         for image in parent_dataset:
             self.get_energy_and_forces(image, precalculated=True)
 
@@ -76,6 +116,8 @@ class OnlineLearner(Calculator):
             "dyn_uncertain_tol", 1000000000
         )
         self.dyn_avg_steps = self.learner_params.get("dyn_avg_steps", None)
+        # only the last dyn_avg_steps uncertainties are used for the dynamic tolerance
+        self.uncertainty_history_length = self.dyn_avg_steps
 
         self.suppress_warnings = self.learner_params.get("suppress_warnings", False)
         self.print_uncertainty = self.learner_params.get("print_uncertainty", True)
@@ -87,6 +129,14 @@ class OnlineLearner(Calculator):
             "train_on_recent_points", None
         )
         self.num_initial_points = self.learner_params.get("num_initial_points", 2)
+        self.coreset = self.learner_params.get("coreset", None)
+        if self.coreset is not None and (
+            self.coreset.get("size", None) is None
+            or self.coreset["size"] <= self.num_initial_points
+        ):
+            raise ValueError(
+                "coreset size must be given and larger than num_initial_points"
+            )
         self.initial_points_to_keep = self.learner_params.get(
             "initial_points_to_keep", [i for i in range(self.num_initial_points)]
         )
@@ -111,6 +161,9 @@ class OnlineLearner(Calculator):
 
         self.rolling_opt_window = self.learner_params.get("rolling_opt_window", None)
 
+        self.novelty_threshold = self.learner_params.get("novelty_threshold", None)
+        self.novelty_index_backend = self.learner_params.get("novelty_index", "flat")
+
         self.constraint = self.learner_params.get("train_on_constraint", False)
 
         self.query_every_n_steps = self.learner_params.get("query_every_n_steps", None)
@@ -124,11 +177,24 @@ class OnlineLearner(Calculator):
         self.store_complete_dataset = self.learner_params.get(
             "store_complete_dataset", False
         )
+        self.compact_dataset = self.learner_params.get("compact_dataset", None)
 
         self.ml_energy_only = self.learner_params.get("ml_energy_only", False)
+        # the prediction of the retrained model after every query (retrained_energy, retrained_forces, ...)
+        # is only logged if requested, it costs an extra ML prediction per query
+        self.log_retrained_prediction = self.learner_params.get("logger", {}).get(
+            "retrained_prediction", False
+        )
+
+        # executor ("thread", "process" or a concurrent.futures.Executor) to run batches of parent calls concurrently
+        self.parent_executor = self.learner_params.get("parent_executor", None)
 
         self.db_name = self.learner_params.get("asedb_name", "oal_queried_images.db")
 
+        # dict with the db_path of a ParentDataStore, the number of stored points k to seed the training set with,
+        # the calc_key (defaults to a hash of the parent calc settings) and whether to write new parent data to it
+        self.parent_store_params = self.learner_params.get("parent_store", None)
+
         self.wandb_init = self.learner_params.get("wandb_init", {})
         self.wandb_log = self.wandb_init.get("wandb_log", False)
 
@@ -149,6 +215,8 @@ class OnlineLearner(Calculator):
             self.info["query"] = 4  # Set to 4 if querying b/c positions not changed
         elif reason == "nsteps":
             self.info["query"] = 5  # Set to 5 if querying b/c it has been n steps
+        elif reason == "novelty":
+            self.info["query"] = 6  # Set to 6 if querying b/c of a novel environment
         else:
             raise ValueError("invalid query reason given (" + str(reason) + ")")
 
@@ -166,6 +234,7 @@ class OnlineLearner(Calculator):
             "parent_fmax": None,
             "force_uncertainty": None,
             "energy_uncertainty": None,
+            "novelty": None,
             "dyn_uncertainty_tol": None,
             "stat_uncertain_tol": None,
             "tolerance": None,
@@ -187,6 +256,9 @@ class OnlineLearner(Calculator):
         self.curr_step += 1
         self.steps_since_last_query += 1
 
+        if self.parent_store is not None and not self.parent_store_seeded:
+            self.seed_from_parent_store(atoms)
+
         energy, forces, fmax = self.get_energy_and_forces(atoms)
         self.results["energy"] = energy
         self.results["forces"] = forces
@@ -202,57 +274,60 @@ class OnlineLearner(Calculator):
             print(uncertainty_statement)
 
     def get_energy_and_forces(self, atoms, precalculated=False):
-        # copy the atoms object (original only used to obtain indices of constraints and for precalculated images)
-        atoms_copy = atoms.copy()
+        # the original atoms are only used to obtain indices of constraints, for precalculated images and for logging,
+        # they are copied only when the copy is kept (parent queries and stored ML predictions)
 
         # initialize info dict before doing anything else, such as setting a query reason
         self.init_info()
 
         # if adding precalculated atoms to parent dataset and trajectory
         if precalculated:
-            atoms_copy.calc = atoms.calc
             self.set_query_reason("pretrain")
 
         # If we have less than two data points, uncertainty is not
         # well calibrated so just use DFT
         if len(self.parent_dataset) < self.num_initial_points:
-            atoms_copy.info["check"] = True
+            atoms_copy = self.get_query_atoms(atoms, precalculated)
 
             energy, forces, constrained_forces = self.add_data_and_retrain(atoms_copy)
             fmax = np.sqrt((constrained_forces**2).sum(axis=1).max())
 
             self.info["check"] = True
             self.info["parent_energy"] = energy
-            self.info["parent_forces"] = str(forces)
+            self.info["parent_forces"] = forces
             self.info["parent_fmax"] = fmax
             self.set_query_reason("pretrain")
 
         else:
-            atoms_ML = self.get_ml_prediction(atoms_copy)
+            atoms_ML = self.get_ml_prediction(self.get_prediction_atoms(atoms))
 
             # Get ML potential predicted energies and forces
             energy = atoms_ML.get_potential_energy(apply_constraint=self.constraint)
             forces = atoms_ML.get_forces(apply_constraint=self.constraint)
-            constrained_forces = atoms_ML.get_forces()
+            if self.constraint:
+                constrained_forces = forces
+            else:
+                constrained_forces = atoms_ML.get_forces()
             fmax = np.sqrt((constrained_forces**2).sum(axis=1).max())
             self.info["ml_energy"] = energy
-            self.info["ml_forces"] = str(forces)
+            self.info["ml_forces"] = forces
             self.info["ml_fmax"] = fmax
 
             # Check if we are extrapolating too far
-            unsafe_bool = self.unsafe_prediction(atoms_ML)
-            verify_bool = self.parent_verify(atoms_ML)
+            unsafe_bool = self.unsafe_prediction(atoms_ML, fmax=fmax)
+            verify_bool = self.parent_verify(atoms_ML, fmax=fmax)
             need_to_retrain = unsafe_bool or verify_bool or precalculated
 
             self.info["force_uncertainty"] = atoms_ML.info["max_force_stds"]
             self.info["energy_uncertainty"] = atoms_ML.info.get("energy_stds", None)
+            self.info["novelty"] = atoms_ML.info.get("novelty", None)
             self.info["dyn_uncertainty_tol"] = atoms_ML.info["dyn_uncertain_tol"]
             self.info["stat_uncertain_tol"] = atoms_ML.info["stat_uncertain_tol"]
             self.info["tolerance"] = atoms_ML.info["uncertain_tol"]
 
             # If we are extrapolating too far add/retrain
             if need_to_retrain:
-                atoms_copy.info["check"] = True
+                atoms_copy = self.get_query_atoms(atoms, precalculated)
 
                 energy_ML = energy
                 constrained_forces_ML = constrained_forces
@@ -264,73 +339,31 @@ class OnlineLearner(Calculator):
 
                 self.info["check"] = True
                 self.info["parent_energy"] = energy
-                self.info["parent_forces"] = str(forces)
+                self.info["parent_forces"] = forces
                 self.info["parent_fmax"] = fmax
-                self.info["energy_error"] = energy - energy_ML
-                self.info["relative_energy_error"] = (energy - energy_ML) / energy
-                self.info["forces_error"] = np.sum(
-                    np.abs(constrained_forces - constrained_forces_ML)
-                )
-                self.info["forces_mae"] = np.mean(
-                    np.abs(constrained_forces - constrained_forces_ML)
-                )
 
-                if atoms.constraints:
-                    constraints_index = atoms.constraints[0].index
-                else:
-                    constraints_index = []
-                self.info["relative_forces_error"] = np.divide(
-                    np.sum(
-                        np.abs(
-                            np.delete(
-                                constrained_forces - constrained_forces_ML,
-                                constraints_index,
-                                axis=0,
-                            )
-                        )
-                    ),
-                    np.sum(
-                        np.abs(
-                            np.delete(
-                                constrained_forces,
-                                constraints_index,
-                                axis=0,
-                            )
-                        )
-                    ),
-                ).item()
-
-                # Using retrained ML potential, get new predicted energies and forces
-                retrained_atoms_ML = self.get_ml_prediction(atoms_copy)
-                retrained_energy = retrained_atoms_ML.get_potential_energy(
-                    apply_constraint=self.constraint
-                )
-                retrained_forces = retrained_atoms_ML.get_forces(
-                    apply_constraint=self.constraint
-                )
-                retrained_constrained_forces = retrained_atoms_ML.get_forces()
-                retrained_fmax = np.sqrt(
-                    (retrained_constrained_forces**2).sum(axis=1).max()
-                )
-                self.info["retrained_energy"] = retrained_energy
-                self.info["retrained_forces"] = str(retrained_forces)
-                self.info["retrained_fmax"] = retrained_fmax
-                self.info["retrained_force_error"] = np.sum(
-                    np.abs(constrained_forces - retrained_constrained_forces)
-                )
+                # the errors are cheap and written by every logging sink,
+                # the retrained prediction costs an extra ML call per query and is opt-in (log_retrained_prediction)
+                if self.logger.logging_enabled or self.query_n_fmae_coefficient:
+                    self.set_error_info(
+                        atoms,
+                        energy,
+                        constrained_forces,
+                        energy_ML,
+                        constrained_forces_ML,
+                    )
+                if (
+                    self.logger.logging_enabled and self.log_retrained_prediction
+                ) or self.ml_energy_only:
+                    self.set_retrained_info(atoms, constrained_forces)
 
             else:
                 # Otherwise use the ML predicted energies and forces
-                if self.store_complete_dataset:
-                    self.complete_dataset.append(atoms_ML)
-                else:
-                    self.complete_dataset = [atoms_ML]
+                self.add_to_complete_dataset(atoms_ML)
 
                 self.info["check"] = False
                 self.set_query_reason("noquery")
 
-                atoms_copy.info["check"] = False
-
         if self.ml_energy_only:
             if self.info.get("retrained_energy", None) is not None:
                 energy = self.info["retrained_energy"]
@@ -344,27 +377,148 @@ class OnlineLearner(Calculator):
 
         # Return the energy/force
         self.info["energy"] = energy
-        self.info["forces"] = str(forces)
+        self.info["forces"] = forces
         self.info["fmax"] = fmax
 
-        extra_info = {}
-        extra_info.update(self.logger.get_pca(atoms))
-        if self.trained_at_least_once:
-            extra_info.update(
-                self.logger.get_uncertainty(self.get_ml_calc(), self.info["check"])
-            )
-        self.logger.write(atoms, self.info, extra_info=extra_info)
+        if self.logger.logging_enabled:
+            extra_info = {}
+            extra_info.update(self.logger.get_pca(atoms))
+            if self.trained_at_least_once:
+                extra_info.update(
+                    self.logger.get_uncertainty(self.get_ml_calc(), self.info["check"])
+                )
+            self.logger.write(atoms, self.info, extra_info=extra_info)
+        else:
+            self.logger.step += 1
 
         return energy, forces, fmax
 
-    def unsafe_prediction(self, atoms):
+    def new_dataset(self, images=(), complete=False):
+        """
+        Returns a dataset holding images, a list unless compact_dataset is given in the learner params.
+        The retention policy (max_frames, evict) of compact_dataset only applies to the complete dataset,
+        the parent dataset keeps all of the training data.
+        """
+        if not self.compact_dataset:
+            return list(images)
+        if complete and isinstance(self.compact_dataset, dict):
+            return CompactDataset(
+                images,
+                max_frames=self.compact_dataset.get("max_frames", None),
+                evict=self.compact_dataset.get("evict", "ml_first"),
+            )
+        return CompactDataset(images)
+
+    def add_to_complete_dataset(self, atoms_ML):
+        """
+        Adds the ML prediction of the current step to the complete dataset (or replaces the last frame).
+        When only the last frame is kept, the scratch atoms (see get_prediction_atoms) are swapped with the
+        previous last frame: the stored frame is not overwritten by the next prediction,
+        and the replaced frame is reused as scratch atoms instead of copying atoms on every step.
+        """
+        if self.store_complete_dataset:
+            # the prediction atoms are already copies (or copied by the compact dataset)
+            self.complete_dataset.append(atoms_ML)
+            return
+        if atoms_ML is self.scratch_atoms:
+            self.scratch_atoms, self.last_frame_atoms = self.last_frame_atoms, atoms_ML
+        self.complete_dataset = [atoms_ML]
+
+    def get_query_atoms(self, atoms, precalculated=False):
+        """
+        Returns the copy of atoms that is sent to the parent calc and added to the dataset.
+        """
+        atoms_copy = atoms.copy()
+        if precalculated:
+            atoms_copy.calc = atoms.calc
+        atoms_copy.info["check"] = True
+        return atoms_copy
+
+    def get_prediction_atoms(self, atoms):
+        """
+        Returns an atoms object with the structure of atoms and no calc attached, for the ML prediction.
+        Unless every ML prediction is stored in the complete dataset, a scratch atoms object is reused
+        and its arrays are overwritten in place, instead of copying atoms; it alternates with the last frame
+        of the complete dataset (see add_to_complete_dataset).
+        """
+        if self.store_complete_dataset and not isinstance(
+            self.complete_dataset, CompactDataset
+        ):
+            return atoms.copy()
+
+        scratch = self.scratch_atoms
+        if (
+            scratch is None
+            or scratch.arrays.keys() != atoms.arrays.keys()
+            or any(
+                scratch.arrays[name].shape != array.shape
+                or scratch.arrays[name].dtype != array.dtype
+                for name, array in atoms.arrays.items()
+            )
+        ):
+            self.scratch_atoms = atoms.copy()
+            return self.scratch_atoms
+
+        scratch.calc = None
+        for name, array in atoms.arrays.items():
+            np.copyto(scratch.arrays[name], array)
+        scratch.cell.array[:] = atoms.cell.array
+        scratch.pbc[:] = atoms.pbc
+        scratch.set_constraint(list(atoms.constraints))
+        scratch.info = dict(atoms.info)
+        return scratch
+
+    def set_error_info(self, atoms, energy, constrained_forces, energy_ML, forces_ML):
+        """
+        Records the errors of the ML prediction with respect to the parent result in the info dict.
+        """
+        forces_difference = np.abs(constrained_forces - forces_ML)
+        self.info["energy_error"] = energy - energy_ML
+        self.info["relative_energy_error"] = (energy - energy_ML) / energy
+        self.info["forces_error"] = np.sum(forces_difference)
+        self.info["forces_mae"] = np.mean(forces_difference)
+
+        free = np.ones(len(atoms), dtype=bool)
+        if atoms.constraints:
+            free[atoms.constraints[0].index] = False
+        self.info["relative_forces_error"] = np.divide(
+            np.sum(forces_difference[free]),
+            np.sum(np.abs(constrained_forces[free])),
+        ).item()
+
+    def set_retrained_info(self, atoms, constrained_forces):
+        """
+        Records the prediction of the retrained ML potential in the info dict.
+        """
+        retrained_atoms_ML = self.get_ml_prediction(self.get_prediction_atoms(atoms))
+        retrained_energy = retrained_atoms_ML.get_potential_energy(
+            apply_constraint=self.constraint
+        )
+        retrained_forces = retrained_atoms_ML.get_forces(
+            apply_constraint=self.constraint
+        )
+        if self.constraint:
+            retrained_constrained_forces = retrained_forces
+        else:
+            retrained_constrained_forces = retrained_atoms_ML.get_forces()
+        retrained_fmax = np.sqrt((retrained_constrained_forces**2).sum(axis=1).max())
+        self.info["retrained_energy"] = retrained_energy
+        self.info["retrained_forces"] = retrained_forces
+        self.info["retrained_fmax"] = retrained_fmax
+        self.info["retrained_force_error"] = np.sum(
+            np.abs(constrained_forces - retrained_constrained_forces)
+        )
+
+    def unsafe_prediction(self, atoms, fmax=None):
         # Set the desired tolerance based on the current max predicted force or energy
         if self.uncertainty_metric == "forces":
             uncertainty = atoms.info["max_force_stds"]
             if math.isnan(uncertainty):
                 raise ValueError("NaN uncertainty")
-            forces = atoms.get_forces()
-            base_tolerance = np.sqrt((forces**2).sum(axis=1).max())
+            if fmax is None:
+                forces = atoms.get_forces()
+                fmax = np.sqrt((forces**2).sum(axis=1).max())
+            base_tolerance = fmax
         elif self.uncertainty_metric == "energy":
             uncertainty = atoms.info["energy_stds"]
             energy = atoms.get_potential_energy()
@@ -377,11 +531,7 @@ class OnlineLearner(Calculator):
         # if we are taking the dynamic uncertainty tolerance to be the average of the past n uncertainties,
         # then calculate that everage and set it as the base tolerance (to be modified by dyn modifier)
         if self.dyn_avg_steps is not None:
-            base_tolerance = np.mean(
-                self.uncertainty_history[
-                    max(0, len(self.uncertainty_history) - self.dyn_avg_steps) :
-                ]
-            )
+            base_tolerance = np.mean(self.uncertainty_history)
 
         if self.tolerance_selection == "min":
             uncertainty_tol = min(
@@ -424,6 +574,21 @@ class OnlineLearner(Calculator):
                     self.set_query_reason("position")
             self.positions_queue.put(new_positions)
 
+        # check if any atomic environment is too far from all training environments
+        if self.novelty_index is not None:
+            novelty = self.get_novelty(atoms)
+            atoms.info["novelty"] = novelty
+            if novelty > self.novelty_threshold:
+                print(
+                    "Atomic environment novelty "
+                    + str(novelty)
+                    + " above threshold "
+                    + str(self.novelty_threshold)
+                    + ", check with parent"
+                )
+                prediction_unsafe = True
+                self.set_query_reason("novelty")
+
         if self.query_n_fmae_coefficient is not None:
             forces_mae = 0.1
             if hasattr(self, "info") and self.info.get("forces_mae", None) is not None:
@@ -443,9 +608,10 @@ class OnlineLearner(Calculator):
 
         return prediction_unsafe
 
-    def parent_verify(self, atoms):
-        forces = atoms.get_forces()
-        fmax = np.sqrt((forces**2).sum(axis=1).max())
+    def parent_verify(self, atoms, fmax=None):
+        if fmax is None:
+            forces = atoms.get_forces()
+            fmax = np.sqrt((forces**2).sum(axis=1).max())
 
         verify = False
         if fmax <= self.fmax_verify_threshold or atoms.info.get(
@@ -461,6 +627,20 @@ class OnlineLearner(Calculator):
         return verify
 
     def add_data_and_retrain(self, atoms):
+        new_data = self.query_parent(atoms)
+        partial_dataset = self.add_training_data([new_data])
+        self.retrain(partial_dataset)
+
+        # set the energy and force results of the parent calculator and return them
+        energy_actual = new_data.get_potential_energy(apply_constraint=self.constraint)
+        force_actual = new_data.get_forces(apply_constraint=self.constraint)
+        force_cons = new_data.get_forces()
+        return energy_actual, force_actual, force_cons
+
+    def query_parent(self, atoms):
+        """
+        Returns atoms with a parent singlepoint attached, and adds it to the complete dataset.
+        """
         self.steps_since_last_query = 0
 
         # don't redo singlepoints if not instructed to reverify and atoms have proper vasp singlepoints attached
@@ -500,6 +680,7 @@ class OnlineLearner(Calculator):
                 + str(end - start)
             )
             self.info["parent_time"] = end - start
+            self.store_parent_data([new_data])
 
         # add to complete dataset (for atomistic methods optimizer replay)
         if self.store_complete_dataset:
@@ -507,20 +688,127 @@ class OnlineLearner(Calculator):
         else:
             self.complete_dataset = [new_data]
 
-        # before adding to parent (training) dataset, convert to top k forces if applicable
-        if self.train_on_top_k_forces is not None:
-            [training_data] = convert_to_top_k_forces(
-                [new_data], self.train_on_top_k_forces
-            )
+        return new_data
+
+    def query_parents(self, images):
+        """
+        Returns images with parent singlepoints attached, calculated concurrently if parent_executor is given,
+        and adds them to the complete dataset.
+        """
+        self.steps_since_last_query = 0
+        print("OnlineLearner: Parent calculations required for " + str(len(images)))
+        self.parent_calls += len(images)
+        start = time.time()
+        if self.parent_calc_pausable:
+            self.parent_calc._resume_calc()
+        for image in images:
+            image.info["check"] = True
+            image.set_calculator(self.parent_calc)
+        new_data = convert_to_singlepoint(
+            images, executor=self.parent_executor, inplace=True
+        )
+        if self.parent_calc_pausable:
+            self.parent_calc._pause_calc()
+        end = time.time()
+
+        print(
+            "Time to call parent (calls #"
+            + str(self.parent_calls - len(images) + 1)
+            + "-"
+            + str(self.parent_calls)
+            + "): "
+            + str(end - start)
+        )
+        self.info["parent_time"] = end - start
+        self.store_parent_data(new_data)
+
+        if self.store_complete_dataset:
+            self.complete_dataset += new_data
         else:
-            training_data = new_data
+            self.complete_dataset = [new_data[-1]]
+        return new_data
+
+    def seed_from_parent_store(self, atoms):
+        """
+        Adds the k stored parent points most relevant to atoms to the training set and trains on them,
+        so the first steps of the run don't need fresh parent calls if enough relevant data was stored.
+        """
+        self.parent_store_seeded = True
+        k = self.parent_store_params.get("k", self.num_initial_points)
+        if k <= 0:
+            return
+        stored_data = self.parent_store.select(atoms, k)
+        self.init_info()
+        print(
+            "OnlineLearner: "
+            + str(len(stored_data))
+            + " training points seeded from the parent store"
+        )
+        if not stored_data:
+            return
+        partial_dataset = self.add_training_data(stored_data)
+        self.retrain(partial_dataset)
+
+    def store_parent_data(self, new_data):
+        """
+        Writes the new parent data to the parent store (if given and writing to it is enabled).
+        The store is only a cache for other runs, failing to write to it only warns.
+        """
+        if self.parent_store is not None and self.parent_store_params.get(
+            "write", True
+        ):
+            try:
+                self.parent_store.put(new_data)
+            except Exception as error:
+                warn("Could not write to the parent store (" + repr(error) + ")")
 
-        # add to parent dataset (for training) and return partial dataset (for partial fit)
-        partial_dataset = self.add_to_dataset(training_data)
+    def add_training_data(self, new_data):
+        """
+        Adds the parent data to the training set, returns the partial dataset just added (for partial fit).
+        """
+        partial_dataset = []
+        for data in new_data:
+            # before adding to parent (training) dataset, convert to top k forces if applicable
+            if self.train_on_top_k_forces is not None:
+                [training_data] = convert_to_top_k_forces(
+                    [data], self.train_on_top_k_forces
+                )
+            else:
+                training_data = data
+
+            # add to parent dataset (for training) and return partial dataset (for partial fit)
+            partial_dataset += self.add_to_dataset(training_data)
 
+        if self.novelty_index is not None:
+            self.update_novelty_index(partial_dataset)
+        return partial_dataset
+
+    def retrain(self, partial_dataset):
+        """
+        Retrains the ml potential after partial_dataset was added to the parent dataset.
+        """
         start = time.time()
+        # if the data requirement has just been met: train for the first time on only the initial points to keep
+        # (and on the points added after the initial points in the same batch)
+        if (
+            not self.trained_at_least_once
+            and len(self.parent_dataset) >= self.num_initial_points
+            and len(self.parent_dataset) > 0
+        ):
+            new_parent_dataset = [
+                self.parent_dataset[i] for i in self.initial_points_to_keep
+            ]
+            new_parent_dataset += self.parent_dataset[self.num_initial_points :]
+            self.num_initial_points = len(self.initial_points_to_keep)
+            self.parent_dataset = self.new_dataset(new_parent_dataset)
+            if self.novelty_index is not None:
+                self.rebuild_novelty_index()
+
+            self.ml_potential.train(self.parent_dataset)
+            self.trained_at_least_once = True
+
         # retrain the ml potential only if there is more than enough data that the ml potential may be used
-        if len(self.parent_dataset) > self.num_initial_points:
+        elif len(self.parent_dataset) > self.num_initial_points:
             # if training only on recent points, and have trained before, then check if dataset has become long enough to train on subset
             if (
                 self.trained_at_least_once
@@ -531,35 +819,111 @@ class OnlineLearner(Calculator):
                     self.parent_dataset[-self.train_on_recent_points :]
                 )
             # otherwise, if partial fitting, partial fit if not training for the first time
+            # (unless it is time for a refit on the curated coreset)
             elif (
                 self.trained_at_least_once
                 and (self.train_on_recent_points is None)
                 and (self.partial_fit)
+                and not self.coreset_refit_due()
             ):
                 self.ml_potential.train(self.parent_dataset, partial_dataset)
             # otherwise just train as normal
             else:
+                # curate the training set down to the coreset before a full refit, once the ml potential can score it
+                if self.coreset is not None and self.trained_at_least_once:
+                    self.curate_dataset()
                 self.ml_potential.train(self.parent_dataset)
                 self.trained_at_least_once = True
+            self.retrain_count += 1
 
-        # if the data requirement has just been met: train for the first time on only the initial points to keep
-        elif len(self.parent_dataset) == self.num_initial_points:
-            new_parent_dataset = [
-                self.parent_dataset[i] for i in self.initial_points_to_keep
-            ]
-            self.parent_dataset = new_parent_dataset
-            self.num_initial_points = len(self.parent_dataset)
-
-            self.ml_potential.train(self.parent_dataset)
-            self.trained_at_least_once = True
+        # embeddings from trained interaction blocks moved with the retrain, the old entries are stale
+        if self.novelty_index is not None and self.descriptors_trainable():
+            self.rebuild_novelty_index()
         end = time.time()
         self.info["training_time"] = end - start
 
-        # set the energy and force results of the parent calculator and return them
-        energy_actual = new_data.get_potential_energy(apply_constraint=self.constraint)
-        force_actual = new_data.get_forces(apply_constraint=self.constraint)
-        force_cons = new_data.get_forces()
-        return energy_actual, force_actual, force_cons
+    def coreset_refit_due(self):
+        """
+        Returns whether the partial fit of this retrain is replaced by a full refit on the curated coreset.
+        Partial fits only train on the new data, so the coreset only bounds the cost of full refits,
+        which happen every coreset["interval"] retrains (by default the coreset size).
+        """
+        if self.coreset is None:
+            return False
+        interval = self.coreset.get("interval", self.coreset["size"])
+        return self.retrain_count % interval == interval - 1
+
+    def curate_dataset(self):
+        """
+        Reduces the parent dataset to at most coreset["size"] structures, see finetuna.coreset.select_coreset.
+        The descriptors of the structures are cached while they stay in the parent dataset,
+        so they are computed with the model that first scored them.
+        """
+        indices = select_coreset(
+            self.parent_dataset,
+            self.coreset["size"],
+            self.ml_potential,
+            method=self.coreset.get("method", "diversity"),
+            keep_recent=self.coreset.get("keep_recent", 1),
+            descriptor_cache=self.coreset_descriptors,
+        )
+        if len(indices) < len(self.parent_dataset):
+            print(
+                "Curated parent dataset from "
+                + str(len(self.parent_dataset))
+                + " to "
+                + str(len(indices))
+                + " points"
+            )
+            self.parent_dataset = self.new_dataset(
+                [self.parent_dataset[i] for i in indices]
+            )
+            kept = set(get_structure_key(atoms) for atoms in self.parent_dataset)
+            for key in list(self.coreset_descriptors):
+                if key not in kept:
+                    del self.coreset_descriptors[key]
+
+    def get_novelty(self, atoms):
+        """
+        Returns the largest distance of any atom embedding of atoms to the training embeddings of the same element.
+        """
+        descriptors = self.ml_potential.get_descriptors(atoms)
+        known = np.isfinite(descriptors).all(axis=1)
+        if not known.any():
+            return 0.0
+        distances = self.novelty_index.query(
+            atoms.get_atomic_numbers()[known], descriptors[known]
+        )
+        return float(np.max(distances))
+
+    def descriptors_trainable(self):
+        """
+        Returns whether training the ml potential changes its descriptors, i.e. any block before the output blocks is trainable.
+        """
+        return (
+            hasattr(self.ml_potential, "descriptors_trainable")
+            and self.ml_potential.descriptors_trainable()
+        )
+
+    def rebuild_novelty_index(self):
+        """
+        Rebuilds the novelty index from the embeddings of the current model on the parent dataset.
+        """
+        self.novelty_index.reset()
+        self.update_novelty_index(self.parent_dataset)
+
+    def update_novelty_index(self, dataset):
+        """
+        Adds the atom embeddings of newly added training data to the novelty index.
+        The embeddings come from the interaction blocks, which stay frozen when fine-tuning only the output blocks,
+        so entries added before a retrain remain valid, otherwise the index is rebuilt after every retrain.
+        """
+        for image in dataset:
+            descriptors = self.ml_potential.get_descriptors(image)
+            known = np.isfinite(descriptors).all(axis=1)
+            self.novelty_index.add(
+                image.get_atomic_numbers()[known], descriptors[known]
+            )
 
     def get_ml_calc(self):
         self.ml_potential.reset()
@@ -567,13 +931,12 @@ class OnlineLearner(Calculator):
 
     def get_ml_prediction(self, atoms):
         """
-        Helper function which takes an atoms object with no calc attached.
-        Returns it with an ML potential predicted singlepoint.
+        Helper function which takes an atoms object with no calc attached (see get_prediction_atoms).
+        Returns it with an ML potential predicted singlepoint, the atoms object is modified in place.
         Designed to be overwritten by subclasses (DeltaLearner) that modify ML predictions.
         """
-        atoms_copy = atoms.copy()
-        atoms_copy.set_calculator(self.ml_potential)
-        (atoms_ML,) = convert_to_singlepoint([atoms_copy])
+        atoms.set_calculator(self.ml_potential)
+        (atoms_ML,) = convert_to_singlepoint([atoms], inplace=True)
         return atoms_ML
 
     def add_to_dataset(self, new_data):
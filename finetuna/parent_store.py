@@ -0,0 +1,151 @@
+import hashlib
+import json
+import numpy as np
+import ase.db
+from ase.calculators.singlepoint import SinglePointCalculator
+from finetuna.utils import get_structure_hash, write_unique_row
+
+
+def get_calc_key(calc):
+    """
+    Returns a short hash identifying the calculator name and its parameters,
+    so parent data is only reused between runs with the same parent settings.
+    """
+    # use the calculator wrapped by e.g. a SocketIOCalculator
+    calc = getattr(calc, "calc", calc)
+    parameters = getattr(calc, "parameters", {})
+    description = json.dumps(
+        [getattr(calc, "name", type(calc).__name__), dict(parameters)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+class ParentDataStore:
+    """
+    Persistent store of parent singlepoints in an ase db, shared between runs to warm-start the training set.
+
+    Every entry is indexed by its composition (the formula), its surface (formula of the atoms not tagged as adsorbate,
+    i.e. tag 2 as in OCP) and adsorbate (formula of the atoms tagged 2), and the calc_key of the parent calculator, see get_calc_key.
+    Structures are only stored once per calc_key (identified by a hash of the structure, see get_structure_hash),
+    also when several runs write the same structure to the store at once.
+
+    Parameters
+    ----------
+    db_path: str
+        path of the ase db file
+
+    calc_key: str
+        identifier of the parent calculator settings, stored with and required to match every entry
+
+    decimals: int
+        number of decimals the positions are rounded to before hashing
+    """
+
+    def __init__(self, db_path="parent_store.db", calc_key="", decimals=4):
+        self.db_path = db_path
+        self.calc_key = calc_key
+        self.decimals = decimals
+
+    def get_hash(self, atoms):
+        return get_structure_hash(atoms, self.calc_key, self.decimals)
+
+    def get_keys(self, atoms):
+        """
+        Returns the surface and adsorbate keys of atoms.
+        """
+        adsorbate = atoms.get_tags() == 2
+        return {
+            "surface": atoms[~adsorbate].get_chemical_formula(),
+            "adsorbate": atoms[adsorbate].get_chemical_formula() or "none",
+        }
+
+    def put(self, images):
+        """
+        Stores the images (with parent energy and forces available) that are not stored yet, returns the number stored.
+        """
+        stored = 0
+        with ase.db.connect(self.db_path) as db:
+            for image in images:
+                image_sp = image.copy()
+                image_sp.calc = SinglePointCalculator(
+                    image_sp,
+                    energy=image.get_potential_energy(apply_constraint=False),
+                    forces=image.get_forces(apply_constraint=False),
+                )
+                structure_hash = self.get_hash(image)
+                if write_unique_row(
+                    db,
+                    image_sp,
+                    structure_hash,
+                    structure_hash=structure_hash,
+                    calc_key=self.calc_key,
+                    **self.get_keys(image),
+                ):
+                    stored += 1
+        return stored
+
+    def select(self, atoms, k):
+        """
+        Returns up to k stored images (with singlepoint calculators) most relevant to atoms.
+        Images with the same composition come first, closest in positions to atoms first,
+        followed by the most recent images of the same surface with other adsorbates.
+        """
+        formula = atoms.get_chemical_formula()
+        keys = self.get_keys(atoms)
+        with ase.db.connect(self.db_path) as db:
+            same_formula = list(db.select(formula, calc_key=self.calc_key))
+            numbers = atoms.get_atomic_numbers()
+            same_formula = [
+                row
+                for row in same_formula
+                if np.array_equal(row.numbers, numbers)
+                and np.allclose(row.cell, atoms.cell.array)
+            ]
+            same_formula.sort(
+                key=lambda row: np.sqrt(
+                    ((row.positions - atoms.positions) ** 2).sum(axis=1).mean()
+                )
+            )
+            rows = same_formula[:k]
+
+            if len(rows) < k:
+                same_surface = db.select(
+                    calc_key=self.calc_key,
+                    surface=keys["surface"],
+                    sort="-id",
+                )
+                selected_ids = set(row.id for row in rows)
+                for row in same_surface:
+                    if len(rows) >= k:
+                        break
+                    if row.id not in selected_ids and row.formula != formula:
+                        rows.append(row)
+
+        images = []
+        for row in rows:
+            image = row.toatoms()
+            sp_calc = SinglePointCalculator(
+                image,
+                energy=row.energy,
+                forces=row.forces,
+            )
+            sp_calc.implemented_properties = ["energy", "forces"]
+            image.calc = sp_calc
+            image.info["check"] = True
+            image.info["parent_store_id"] = row.id
+            images.append(image)
+        return images
+
+    def import_db(self, db_path):
+        """
+        Stores the rows with energy and forces of an ase db computed with the parent settings of calc_key
+        (e.g. the pretrain images of earlier runs). Returns the number of images stored.
+        Note the oal_queried_images.db logged by the learners holds no parent forces and can't be imported.
+        """
+        images = []
+        with ase.db.connect(db_path) as db:
+            for row in db.select("energy,forces"):
+                images.append(row.toatoms())
+        return self.put(images)
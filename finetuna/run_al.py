@@ -1,23 +1,16 @@
 import os
-from pymongo import MongoClient
+import copy
 
 from ase.io import Trajectory
 from ase.optimize.bfgs import BFGS
-from ase.optimize.sciopt import SciPyFminCG
-from ase.calculators.vasp import Vasp
-from ase.calculators.emt import EMT
-from vasp_interactive import VaspInteractive
 from ase.db import connect
-from ase.calculators.socketio import SocketIOCalculator
-from ase.calculators.espresso import Espresso
 
 from finetuna.atomistic_methods import Relaxation
 from finetuna.offline_learner.offline_learner import OfflineActiveLearner
 from finetuna.utils import calculate_surface_k_points
 from finetuna.online_learner.online_learner import OnlineLearner
 from finetuna.online_learner.delta_learner import DeltaLearner
-
-from ocpmodels.common.relaxation.ase_utils import OCPCalculator
+from finetuna.online_learner.ladder_learner import LadderLearner
 
 
 def do_between_learner_and_run(learner, mongo_db):
@@ -49,6 +42,8 @@ def run_relaxation(
         replay_method = config["relaxation"]["replay_method"]
         maxstep = config["relaxation"]["maxstep"]
     elif optimizer_str == "CG":
+        from ase.optimize.sciopt import SciPyFminCG
+
         optimizer_alg = SciPyFminCG
         replay_method = False
         maxstep = None
@@ -75,51 +70,33 @@ def run_relaxation(
     return oal_relaxation
 
 
-def active_learning(config):
-    initial_traj = Trajectory(config["links"]["traj"])
-    initial_index = config["links"].get("initial_index", 0)
-    initial_structure = initial_traj[initial_index]
-    images = []
-
-    if "images_path" in config["links"] and config["links"]["images_path"] is not None:
-        with connect(config["links"]["images_path"]) as pretrain_db:
-            for row in pretrain_db.select():
-                image = row.toatoms(attach_calculator=False)
-                image.calc.implemented_properties.append("energy")
-                image.calc.implemented_properties.append("forces")
-                images.append(image)
-
-    mongo_db = None
-    if "MONGOC" in os.environ:
-        mongo_string = os.environ["MONGOC"]
-        mongo_db = MongoClient(mongo_string)["al_db"]
-    else:
-        print("no recording to mongo db")
-
-    dbname = (
-        str(config["links"]["ml_potential"])
-        + "_"
-        + str(initial_structure.get_chemical_formula())
-        + "_oal"
-    )
-    oal_initial_structure = initial_structure
-
-    # begin setting up parent calc
-    parent_str = config["links"].get("parent_calc", "vasp")
-    # calculate kpts
-    kpts = calculate_surface_k_points(initial_structure)
-    # declare parent calc
+def get_parent_calc(parent_str, config, kpts, initial_traj):
+    """
+    Returns the parent calc named parent_str ("vasp", "vasp_interactive", "emt" or "espresso"),
+    with the settings in config (the "vasp", "espresso" and "socket" entries).
+    Only the calculator module of the chosen parent calc is imported.
+    """
     if parent_str == "vasp":
+        from ase.calculators.vasp import Vasp
+
         if "kpts" not in config["vasp"]:
             config["vasp"]["kpts"] = kpts
-        parent_calc = Vasp(**config["vasp"])
+        return Vasp(**config["vasp"])
     elif parent_str == "vasp_interactive":
+        from vasp_interactive import VaspInteractive
+
         parent_calc = VaspInteractive(**config["vasp"])
         if "kpts" not in config["vasp"]:
             config["vasp"]["kpts"] = kpts
+        return parent_calc
     elif parent_str == "emt":
-        parent_calc = EMT()
+        from ase.calculators.emt import EMT
+
+        return EMT()
     elif parent_str == "espresso":
+        from ase.calculators.espresso import Espresso
+        from ase.calculators.socketio import SocketIOCalculator
+
         espresso_config = {
             "command": f"mpirun -np 4 /opt/qe-7.0/bin/pw.x -in espresso.pwi --ipi unix:UNIX > espresso.pwo",
             "pseudopotentials": {
@@ -154,7 +131,7 @@ def active_learning(config):
             espresso_config[key] = value
         os.environ["ESPRESSO_PSEUDO"] = espresso_config.pop("pseudo_path")
         espresso = Espresso(**espresso_config)
-        parent_calc = SocketIOCalculator(
+        return SocketIOCalculator(
             espresso,
             **config.get(
                 "socket",
@@ -164,8 +141,68 @@ def active_learning(config):
             ),
         )
 
+    raise ValueError("invalid parent calc given (" + str(parent_str) + ")")
+
+
+def active_learning(config):
+    initial_traj = Trajectory(config["links"]["traj"])
+    initial_index = config["links"].get("initial_index", 0)
+    initial_structure = initial_traj[initial_index]
+    images = []
+
+    if "images_path" in config["links"] and config["links"]["images_path"] is not None:
+        with connect(config["links"]["images_path"]) as pretrain_db:
+            for row in pretrain_db.select():
+                image = row.toatoms(attach_calculator=False)
+                image.calc.implemented_properties.append("energy")
+                image.calc.implemented_properties.append("forces")
+                images.append(image)
+
+    mongo_db = None
+    if "MONGOC" in os.environ:
+        from pymongo import MongoClient
+
+        mongo_string = os.environ["MONGOC"]
+        mongo_db = MongoClient(mongo_string)["al_db"]
+    else:
+        print("no recording to mongo db")
+
+    dbname = (
+        str(config["links"]["ml_potential"])
+        + "_"
+        + str(initial_structure.get_chemical_formula())
+        + "_oal"
+    )
+    oal_initial_structure = initial_structure
+
+    # begin setting up parent calc
+    parent_str = config["links"].get("parent_calc", "vasp")
+    # calculate kpts
+    kpts = calculate_surface_k_points(initial_structure)
+    # declare parent calc
+    parent_calc = get_parent_calc(parent_str, config, kpts, initial_traj)
+
+    # declare the cheaper parent calcs of the ladder (if given), each rung is merged into a copy of the parent settings
+    # and runs in its own directory (the rung "directory", by default rung_<index>)
+    ladder_calcs = []
+    for i, rung in enumerate(config.get("parent_ladder", [])):
+        # job_creator pulls in the vasp input generation, only import it for ladders
+        from finetuna.job_creator import merge_dict
+
+        rung_config = merge_dict(copy.deepcopy(config), copy.deepcopy(rung))
+        rung_calc = get_parent_calc(
+            rung.get("parent_calc", parent_str), rung_config, kpts, initial_traj
+        )
+        # socket calcs run in the directory of the calculator they wrap
+        getattr(rung_calc, "calc", rung_calc).directory = rung.get(
+            "directory", "rung_" + str(i)
+        )
+        ladder_calcs.append(rung_calc)
+
     # declare base calc (if path is given)
     if "base_calc" in config:
+        from ocpmodels.common.relaxation.ase_utils import OCPCalculator
+
         if (
             "model_path" in config["base_calc"]
             and "checkpoint_path" in config["base_calc"]
@@ -238,6 +275,26 @@ def active_learning(config):
             mongo_db,
         )
 
+    elif learner_class == "ladder":
+        # declare online learner with a ladder of parent calcs
+        learner = LadderLearner(
+            config["learner"],
+            images,
+            ml_potential,
+            parent_calc,
+            ladder_calcs=ladder_calcs,
+            mongo_db=mongo_db,
+            optional_config=config,
+        )
+
+        run_relaxation(
+            oal_initial_structure,
+            config,
+            learner,
+            dbname,
+            mongo_db,
+        )
+
     elif learner_class == "warmstart":
         # declare warmstart online learner
         learner = WarmStartLearner(
@@ -288,8 +345,9 @@ def active_learning(config):
     else:
         print("No valid learner class given")
 
-    # close parent_calc (if it needs to be closed, i.e. VaspInteractive)
-    if hasattr(parent_calc, "close"):
-        parent_calc.close()
+    # close parent_calc and ladder calcs (if they need to be closed, i.e. VaspInteractive)
+    for calc in [parent_calc] + ladder_calcs:
+        if hasattr(calc, "close"):
+            calc.close()
 
     return learner.info
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import yaml
+from finetuna.campaign import Campaign
+
+
+def get_base_config():
+    return {
+        "links": {"traj": "initial.traj", "parent_calc": "emt"},
+        "learner": {"wandb_init": {"wandb_log": False}},
+    }
+
+
+def get_overrides(names):
+    return [{"learner": {"wandb_init": {"name": name}}} for name in names]
+
+
+def fail_jobs(failed_names):
+    """Returns a subprocess.call stand-in failing the jobs in failed_names"""
+
+    def call(command, cwd=None, **kwargs):
+        return 1 if os.path.basename(cwd) in failed_names else 0
+
+    return call
+
+
+class campaign(unittest.TestCase):
+    def test_ledger_and_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            campaign_dir = os.path.join(directory, "campaign")
+            names = ["a", "b", "c"]
+            with mock.patch(
+                "finetuna.campaign.subprocess.call", side_effect=fail_jobs(["b"])
+            ) as call:
+                ledger = Campaign(
+                    get_base_config(), get_overrides(names), campaign_dir=campaign_dir
+                ).run()
+                assert call.call_count == 3
+            assert [ledger[name]["status"] for name in names] == [
+                "done",
+                "failed",
+                "done",
+            ]
+            assert ledger["b"]["returncode"] == 1
+            with open(os.path.join(campaign_dir, "campaign_ledger.json")) as file:
+                assert json.load(file) == ledger
+
+            # running the campaign again only reruns the failed job
+            with mock.patch(
+                "finetuna.campaign.subprocess.call", side_effect=fail_jobs([])
+            ) as call:
+                ledger = Campaign(
+                    get_base_config(), get_overrides(names), campaign_dir=campaign_dir
+                ).run()
+                assert call.call_count == 1
+                assert os.path.basename(call.call_args[1]["cwd"]) == "b"
+            assert all(ledger[name]["status"] == "done" for name in names)
+
+    def test_job_setup_errors_are_recorded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # an object that can't be written as a structure
+            structures = [object()]
+            with mock.patch("finetuna.campaign.subprocess.call", return_value=0):
+                test_campaign = Campaign(
+                    get_base_config(),
+                    get_overrides(["a", "b"]),
+                    structures=structures,
+                    campaign_dir=os.path.join(directory, "campaign"),
+                    total_cores=2,
+                )
+                ledger = test_campaign.run()
+            assert ledger["a"]["status"] == "failed"
+            assert ledger["b"]["status"] == "failed"
+            assert "error" in ledger["a"]
+            assert test_campaign.free_cores == 2
+
+    def test_relative_paths_resolve_against_config_dir(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.yml")
+            with open(config_path, "w") as file:
+                yaml.dump(get_base_config(), file)
+            test_campaign = Campaign(
+                config_path,
+                get_overrides(["a"]) + [{"links": {"traj": "/data/other.traj"}}],
+                campaign_dir=os.path.join(directory, "campaign"),
+            )
+            assert test_campaign.jobs["a"]["params"]["links"]["traj"] == os.path.join(
+                directory, "initial.traj"
+            )
+            assert (
+                test_campaign.jobs["job_1"]["params"]["links"]["traj"]
+                == "/data/other.traj"
+            )
@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+from ase.build import fcc111, molecule
+from ase.calculators.emt import EMT
+from ase.constraints import FixAtoms
+from finetuna.compact_dataset import CompactDataset
+from finetuna.utils import convert_to_singlepoint
+
+
+def get_frames(n, seed=0):
+    frames = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+        slab.set_constraint(FixAtoms(indices=[0, 1, 2, 3]))
+        slab.rattle(0.05, seed=seed + i)
+        slab.info["check"] = i % 2 == 0
+        slab.calc = EMT()
+        frames.append(slab)
+    return convert_to_singlepoint(frames)
+
+
+class compact_dataset(unittest.TestCase):
+    def assert_same_frame(self, frame, stored):
+        assert np.array_equal(frame.numbers, stored.numbers)
+        assert np.allclose(frame.positions, stored.positions)
+        assert np.allclose(frame.cell, stored.cell)
+        assert np.array_equal(frame.pbc, stored.pbc)
+        assert np.isclose(frame.get_potential_energy(), stored.get_potential_energy())
+        assert np.allclose(
+            frame.get_forces(apply_constraint=False),
+            stored.get_forces(apply_constraint=False),
+        )
+        assert frame.info == stored.info
+        assert ("tags" in frame.arrays) == ("tags" in stored.arrays)
+        if "tags" in frame.arrays:
+            assert np.array_equal(frame.get_tags(), stored.get_tags())
+
+    def test_roundtrip_with_tags(self):
+        frames = get_frames(3)
+        assert "tags" in frames[0].arrays
+        dataset = CompactDataset(frames)
+        assert len(dataset) == 3
+        for frame, stored in zip(frames, dataset):
+            self.assert_same_frame(frame, stored)
+            assert [c.get_indices().tolist() for c in stored.constraints] == [
+                [0, 1, 2, 3]
+            ]
+        assert len(dataset.templates) == 1
+
+    def test_roundtrip_without_tags(self):
+        water = molecule("H2O")
+        water.center(vacuum=5.0)
+        water.calc = EMT()
+        (water,) = convert_to_singlepoint([water])
+        assert "tags" not in water.arrays
+
+        tagged = water.copy()
+        tagged.set_tags([0, 0, 0])
+        tagged.calc = EMT()
+        (tagged,) = convert_to_singlepoint([tagged])
+
+        dataset = CompactDataset([water, tagged])
+        self.assert_same_frame(water, dataset[0])
+        self.assert_same_frame(tagged, dataset[1])
+        assert len(dataset.templates) == 2
+
+    def test_slices_and_append(self):
+        frames = get_frames(4)
+        dataset = CompactDataset(frames[:2])
+        dataset += frames[2:]
+        for frame, stored in zip(frames[1:3], dataset[1:3]):
+            self.assert_same_frame(frame, stored)
+        self.assert_same_frame(frames[-1], dataset[-1])
+        with self.assertRaises(IndexError):
+            dataset[4]
+
+    def test_evicts_unchecked_frames_first(self):
+        frames = get_frames(6)
+        dataset = CompactDataset(frames, max_frames=4, evict="ml_first")
+        # frames 1 and 3 were not checked with the parent
+        kept = [0, 2, 4, 5]
+        assert len(dataset) == 4
+        for i, stored in zip(kept, dataset):
+            self.assert_same_frame(frames[i], stored)
+
+        dataset = CompactDataset(frames, max_frames=2, evict="oldest")
+        for frame, stored in zip(frames[4:], dataset):
+            self.assert_same_frame(frame, stored)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from ase.calculators.socketio import SocketIOCalculator
+from finetuna.calcs import DeltaCalc
+from finetuna.utils import compute_with_calc, convert_to_singlepoint
+
+
+class DirectoryEMT(EMT):
+    """EMT recording the directory every calculation ran in"""
+
+    directories = []
+
+    def calculate(self, *args, **kwargs):
+        DirectoryEMT.directories.append(self.directory)
+        EMT.calculate(self, *args, **kwargs)
+
+
+class PausableCalc(EMT):
+    """Stand-in for an interactive calculator like VaspInteractive"""
+
+    def _pause_calc(self):
+        pass
+
+
+def get_images(calc, n=3):
+    images = []
+    for i in range(n):
+        image = fcc111("Cu", (2, 2, 2), vacuum=5.0)
+        image.rattle(0.05, seed=i)
+        image.calc = calc
+        images.append(image)
+    return images
+
+
+class convert_to_singlepoint_executor(unittest.TestCase):
+    def test_thread_executor_matches_serial(self):
+        serial = convert_to_singlepoint(get_images(EMT()))
+        threaded = convert_to_singlepoint(get_images(EMT()), executor="thread")
+        for serial_image, threaded_image in zip(serial, threaded):
+            assert np.isclose(
+                serial_image.get_potential_energy(),
+                threaded_image.get_potential_energy(),
+            )
+            assert np.allclose(serial_image.get_forces(), threaded_image.get_forces())
+
+    def test_shared_calc_copies_use_separate_directories(self):
+        with tempfile.TemporaryDirectory() as directory:
+            DirectoryEMT.directories = []
+            calc = DirectoryEMT()
+            calc.directory = directory
+            convert_to_singlepoint(get_images(calc), executor="thread")
+            assert len(set(DirectoryEMT.directories)) == 3
+            for calc_directory in DirectoryEMT.directories:
+                assert os.path.dirname(calc_directory) == directory
+
+    def test_separate_calcs_are_not_copied(self):
+        DirectoryEMT.directories = []
+        images = get_images(None)
+        for image in images:
+            image.calc = DirectoryEMT()
+        convert_to_singlepoint(images, executor="thread")
+        assert DirectoryEMT.directories == ["."] * 3
+
+    def test_delta_calc_copies_use_separate_directories(self):
+        parent_ref, base_ref = compute_with_calc(get_images(None, 1) * 2, EMT())
+        with tempfile.TemporaryDirectory() as directory:
+            delta_calcs = []
+            for _ in range(2):
+                calcs = [DirectoryEMT(), DirectoryEMT()]
+                for calc in calcs:
+                    calc.directory = directory
+                delta_calcs.append(DeltaCalc(calcs, "sub", [parent_ref, base_ref]))
+            serial = compute_with_calc(get_images(delta_calcs[0]), delta_calcs[0])
+
+            DirectoryEMT.directories = []
+            threaded = compute_with_calc(
+                get_images(delta_calcs[1]), delta_calcs[1], executor="thread"
+            )
+            # every wrapped calculator of every image copy runs in its own directory
+            assert len(set(DirectoryEMT.directories)) == 6
+            for calc_directory in DirectoryEMT.directories:
+                image_directory, calc_name = os.path.split(calc_directory)
+                assert calc_name in ["calc_0", "calc_1"]
+                assert os.path.dirname(image_directory) == directory
+        for serial_image, threaded_image in zip(serial, threaded):
+            assert np.isclose(
+                serial_image.get_potential_energy(),
+                threaded_image.get_potential_energy(),
+            )
+            assert np.allclose(serial_image.get_forces(), threaded_image.get_forces())
+
+    def test_interactive_calcs_are_not_copied(self):
+        with self.assertRaises(ValueError):
+            convert_to_singlepoint(get_images(PausableCalc()), executor="thread")
+        with self.assertRaises(ValueError):
+            convert_to_singlepoint(
+                get_images(SocketIOCalculator(EMT(), unixsocket="finetuna_test")),
+                executor="thread",
+            )
+        parent_ref, base_ref = compute_with_calc(get_images(None, 1) * 2, EMT())
+        delta_calc = DeltaCalc([PausableCalc(), EMT()], "sub", [parent_ref, base_ref])
+        with self.assertRaises(ValueError):
+            convert_to_singlepoint(get_images(delta_calc), executor="thread")
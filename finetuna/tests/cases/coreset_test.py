@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.coreset import farthest_point_selection, select_coreset
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.utils import convert_to_singlepoint
+
+
+def get_dataset(n):
+    dataset = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+        slab.rattle(0.02 * (i + 1), seed=i)
+        slab.calc = EMT()
+        dataset.append(slab)
+    return convert_to_singlepoint(dataset)
+
+
+class coreset(unittest.TestCase):
+    def test_farthest_point_selection(self):
+        descriptors = np.array([[0.0], [0.1], [5.0], [10.0], [9.9]])
+        assert farthest_point_selection(descriptors, 2, [0]) == [3, 2]
+        assert farthest_point_selection(descriptors, 0, [0]) == []
+
+    def test_select_coreset_keeps_recent_and_size(self):
+        dataset = get_dataset(8)
+        ml_potential = EMTPotential()
+        for method in ["diversity", "error", "uncertainty"]:
+            indices = select_coreset(
+                dataset, 5, ml_potential, method=method, keep_recent=2
+            )
+            assert len(indices) == 5
+            assert indices == sorted(set(indices))
+            assert 6 in indices and 7 in indices
+        assert select_coreset(dataset, 10, ml_potential) == list(range(8))
+        with self.assertRaises(ValueError):
+            select_coreset(dataset, 5, ml_potential, method="random")
+
+    def test_descriptor_cache(self):
+        dataset = get_dataset(6)
+        ml_potential = EMTPotential()
+        cache = {}
+        first = select_coreset(dataset, 3, ml_potential, descriptor_cache=cache)
+        assert ml_potential.descriptor_calls == 6
+        second = select_coreset(dataset, 3, ml_potential, descriptor_cache=cache)
+        assert ml_potential.descriptor_calls == 6
+        assert first == second
+
+    def test_learner_curates_only_for_full_refits(self):
+        ml_potential = EMTPotential()
+        learner = OnlineLearner(
+            get_learner_params(
+                fmax_verify_threshold=100.0,
+                partial_fit=True,
+                coreset={"size": 3, "interval": 4},
+            ),
+            [],
+            ml_potential,
+            EMT(),
+        )
+        for i in range(9):
+            slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+            slab.rattle(0.05, seed=i)
+            learner.get_energy_and_forces(slab)
+
+        partial = [is_partial for _, is_partial in ml_potential.trainings]
+        # the initial fit, then every fourth retrain is a full refit on the curated coreset
+        assert partial == [False, True, True, True, False, True, True, True, False]
+        full_sizes = [
+            size for size, is_partial in ml_potential.trainings[1:] if not is_partial
+        ]
+        assert full_sizes == [3, 3]
+        assert len(learner.coreset_descriptors) <= 3
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.embedding_index import EmbeddingIndex
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+
+
+class TrainedTrunkEMTPotential(EMTPotential):
+    """EMTPotential whose descriptors shift with every training, like a model with trainable interaction blocks"""
+
+    def descriptors_trainable(self):
+        return True
+
+    def get_descriptors(self, atoms):
+        return super().get_descriptors(atoms) + 10.0 * len(self.trainings)
+
+
+class embedding_index(unittest.TestCase):
+    def test_query_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        numbers = rng.choice([1, 8, 29], 50)
+        embeddings = rng.normal(size=(50, 4))
+        queries = rng.normal(size=(20, 4))
+        query_numbers = rng.choice([1, 8, 29], 20)
+
+        # a small chunk size to compare against the stored embeddings in several chunks
+        index = EmbeddingIndex(chunk_size=7)
+        index.add(numbers[:30], embeddings[:30])
+        index.add(numbers[30:], embeddings[30:])
+        assert len(index) == 50
+
+        distances = index.query(query_numbers, queries)
+        for number, query, distance in zip(query_numbers, queries, distances):
+            stored = embeddings[numbers == number]
+            expected = np.sqrt(((stored - query) ** 2).sum(axis=1)).min()
+            assert np.isclose(distance, expected, atol=1e-3)
+
+    def test_unknown_elements_and_reset(self):
+        index = EmbeddingIndex()
+        index.add([1, 1], [[0.0, 0.0], [1.0, 0.0]])
+        distances = index.query([1, 8], [[1.0, 1.0], [0.0, 0.0]])
+        assert np.isclose(distances[0], 1.0)
+        assert distances[1] == np.inf
+        index.reset()
+        assert len(index) == 0
+        assert np.all(index.query([1], [[0.0, 0.0]]) == np.inf)
+        with self.assertRaises(ValueError):
+            EmbeddingIndex(backend="annoy")
+
+    def test_learner_queries_novel_environments(self):
+        # the descriptors of EMTPotential are the atom positions
+        learner = OnlineLearner(
+            get_learner_params(fmax_verify_threshold=0.0, novelty_threshold=0.5),
+            [],
+            EMTPotential(),
+            EMT(),
+        )
+        slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+        learner.get_energy_and_forces(slab)
+        assert learner.parent_calls == 1
+
+        moved = slab.copy()
+        moved.rattle(0.01, seed=0)
+        learner.get_energy_and_forces(moved)
+        assert learner.info["query"] == 0
+        assert learner.info["novelty"] < 0.5
+
+        moved.positions[-1] += [0.0, 0.0, 1.0]
+        learner.get_energy_and_forces(moved)
+        assert learner.info["query"] == 6
+        assert learner.parent_calls == 2
+
+    def test_learner_rebuilds_index_for_trainable_descriptors(self):
+        ml_potential = TrainedTrunkEMTPotential()
+        learner = OnlineLearner(
+            get_learner_params(fmax_verify_threshold=0.0, novelty_threshold=0.5),
+            [],
+            ml_potential,
+            EMT(),
+        )
+        slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+        learner.get_energy_and_forces(slab)
+        assert learner.parent_calls == 1
+        assert len(ml_potential.trainings) == 1
+
+        # the index holds the descriptors of the retrained model, so the training structure is not novel
+        learner.get_energy_and_forces(slab.copy())
+        assert learner.parent_calls == 1
+        assert learner.info["novelty"] < 1e-6
+        assert len(learner.novelty_index) == len(slab)
@@ -0,0 +1,48 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+import ase.db
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.endpoint_cache import EndpointCache
+
+
+def get_endpoint(seed):
+    slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+    slab.rattle(0.05, seed=seed)
+    relaxed = slab.copy()
+    relaxed.rattle(0.01, seed=seed)
+    relaxed.calc = EMT()
+    return slab, relaxed
+
+
+class endpoint_cache(unittest.TestCase):
+    def test_put_and_get(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = EndpointCache(os.path.join(directory, "endpoints.db"), key="emt")
+            atoms, relaxed = get_endpoint(0)
+            assert cache.get(atoms) is None
+            assert cache.put(atoms, relaxed) is True
+            cached = cache.get(atoms)
+            assert np.allclose(cached.positions, relaxed.positions)
+            assert np.isclose(
+                cached.get_potential_energy(), relaxed.get_potential_energy()
+            )
+            assert np.allclose(cached.get_forces(), relaxed.get_forces())
+            other_key = EndpointCache(cache.db_path, key="vasp")
+            assert other_key.get(atoms) is None
+
+    def test_put_skips_stored_endpoints(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = EndpointCache(os.path.join(directory, "endpoints.db"))
+            atoms, relaxed = get_endpoint(0)
+            assert cache.put(atoms, relaxed) is True
+            assert cache.put(atoms, relaxed) is False
+            # the logger reseeds random, entries must not rely on random unique ids
+            for seed in [1, 2]:
+                random.seed(0)
+                assert cache.put(*get_endpoint(seed)) is True
+            with ase.db.connect(cache.db_path) as db:
+                assert db.count() == 3
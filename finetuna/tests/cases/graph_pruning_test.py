@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from ase.constraints import FixAtoms
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.tests.setup.ocp_checkpoints import (
+    GEMNET_T_CHECKPOINT,
+    get_finetuner_params,
+    ocp_available,
+)
+
+
+class PrunedEMTPotential(EMTPotential):
+    """EMTPotential claiming to prune its graph, recording set_prune_graph calls"""
+
+    prune_graph = True
+
+    def set_prune_graph(self, prune_graph):
+        self.prune_graph = prune_graph
+
+
+def get_strip():
+    # a long non periodic strip, only the first atoms are free, so the far end is beyond their receptive field
+    strip = fcc111("Cu", (20, 2, 2), vacuum=6.0)
+    strip.pbc = False
+    free = np.arange(len(strip)) % 20 < 2
+    strip.set_constraint(FixAtoms(mask=~free))
+    return strip, free
+
+
+class graph_pruning(unittest.TestCase):
+    def test_learner_turns_pruning_off_for_energies(self):
+        for learner_params, prune_graph in [
+            ({}, True),
+            ({"ml_energy_only": True}, False),
+            ({"uncertainty_metric": "energy"}, False),
+        ]:
+            ml_potential = PrunedEMTPotential()
+            OnlineLearner(get_learner_params(**learner_params), [], ml_potential, EMT())
+            assert ml_potential.prune_graph is prune_graph
+
+    @unittest.skipUnless(ocp_available(), "requires ocpmodels and the OCP checkpoints")
+    def test_pruned_forces_match_on_free_atoms(self):
+        from finetuna.ml_potentials.finetuner_calc import FinetunerCalc
+
+        strip, free = get_strip()
+        calc = FinetunerCalc(
+            GEMNET_T_CHECKPOINT, get_finetuner_params(prune_graph=True)
+        )
+        active_mask = calc.trainer.get_active_mask(strip)
+        assert active_mask is not None and not active_mask.all()
+        pruned_energy, pruned_forces = calc.trainer.get_atoms_prediction(strip)
+
+        calc.set_prune_graph(False)
+        assert calc.trainer.get_active_mask(strip) is None
+        energy, forces = calc.trainer.get_atoms_prediction(strip)
+
+        assert np.allclose(pruned_forces[free], forces[free], atol=1e-4)
+        assert np.all(pruned_forces[~active_mask] == 0.0)
+        # the pruned energy only covers the active region
+        assert not np.isclose(pruned_energy, energy)
+
+        calc.set_prune_graph(True)
+        assert np.array_equal(calc.trainer.get_active_mask(strip), active_mask)
+
+    @unittest.skipUnless(ocp_available(), "requires ocpmodels and the OCP checkpoints")
+    def test_energy_training_turns_pruning_off(self):
+        from finetuna.ml_potentials.finetuner_calc import FinetunerCalc
+
+        calc = FinetunerCalc(
+            GEMNET_T_CHECKPOINT,
+            get_finetuner_params(prune_graph=True, energy_training=True),
+        )
+        assert calc.prune_graph is False
+        assert calc.trainer.get_active_mask(get_strip()[0]) is None
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from ase.build import add_adsorbate, fcc111
+from ase.calculators.emt import EMT
+from ase.constraints import FixAtoms
+from finetuna.tests.setup.ocp_checkpoints import (
+    GEMNET_T_CHECKPOINT,
+    get_finetuner_params,
+    ocp_available,
+)
+
+
+def get_dataset(n=3):
+    dataset = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+        add_adsorbate(slab, "O", 1.5 + 0.1 * i, "fcc")
+        slab.set_constraint(FixAtoms(indices=range(4)))
+        slab.calc = EMT()
+        slab.get_forces()
+        dataset.append(slab)
+    return dataset
+
+
+class inference_snapshot(unittest.TestCase):
+    @unittest.skipUnless(ocp_available(), "requires ocpmodels and the OCP checkpoints")
+    def test_snapshot_uses_ema_weights(self):
+        from finetuna.ml_potentials.finetuner_calc import FinetunerCalc
+
+        params = get_finetuner_params(unfreeze_blocks=["out_blocks.3"])
+        params["optim"]["ema_decay"] = 0.999
+        calc = FinetunerCalc(GEMNET_T_CHECKPOINT, params)
+        dataset = get_dataset()
+        calc.train(dataset)
+        trainer = calc.trainer
+        assert trainer.ema
+
+        snapshot = trainer.get_inference_snapshot()
+        assert snapshot is not None
+        # the snapshot copy holds the ema weights, the live model keeps training on its own weights
+        assert snapshot.module is not trainer.get_model_module()
+        snapshot_energy, snapshot_forces = trainer.get_atoms_prediction(dataset[0])
+
+        trainer.use_inference_snapshot = False
+        energy, forces = trainer.get_atoms_prediction(dataset[0])
+        assert np.isclose(snapshot_energy, energy, atol=1e-4)
+        assert np.allclose(snapshot_forces, forces, atol=1e-4)
+
+        # retraining discards the snapshot, the next one holds the new ema weights
+        trainer.use_inference_snapshot = True
+        calc.train(dataset)
+        assert trainer.inference_snapshot is None
+        assert trainer.get_inference_snapshot() is not snapshot
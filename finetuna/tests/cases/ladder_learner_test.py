@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.online_learner.ladder_learner import LadderLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+
+
+class ShiftedEMT(EMT):
+    """EMT with an energy shift and gaussian force noise, a cheaper rung of lower fidelity"""
+
+    def __init__(self, shift=0.0, force_noise=0.0, seed=0):
+        EMT.__init__(self)
+        self.shift = shift
+        self.force_noise = force_noise
+        self.rng = np.random.default_rng(seed)
+
+    def calculate(self, *args, **kwargs):
+        EMT.calculate(self, *args, **kwargs)
+        self.results["energy"] += self.shift
+        self.results["forces"] = self.results["forces"] + self.rng.normal(
+            0.0, self.force_noise, self.results["forces"].shape
+        )
+
+
+def get_slab(seed):
+    slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+    slab.rattle(0.05, seed=seed)
+    return slab
+
+
+def get_learner(ladder_calcs):
+    # the uncertainty is always above stat_uncertain_tol, so every step after the first is an uncertainty query
+    return LadderLearner(
+        get_learner_params(
+            fmax_verify_threshold=0.0,
+            stat_uncertain_tol=0.1,
+            tolerance_selection="min",
+            escalation_tolerance=0.1,
+        ),
+        [],
+        EMTPotential(uncertainty=1.0),
+        EMT(),
+        ladder_calcs,
+    )
+
+
+class ladder_learner(unittest.TestCase):
+    def test_calibration_on_top_data(self):
+        learner = get_learner([ShiftedEMT(shift=5.0)])
+        learner.get_energy_and_forces(get_slab(0))
+        # the pretrain query goes to the top and calibrates the rung
+        assert learner.info["fidelity"] == 1
+        assert np.isclose(learner.rung_offsets[0], -5.0)
+
+        slab = get_slab(1)
+        energy, forces, fmax = learner.get_energy_and_forces(slab)
+        assert learner.info["fidelity"] == 0
+        reference = slab.copy()
+        reference.calc = EMT()
+        assert np.isclose(energy, reference.get_potential_energy())
+        assert np.isclose(
+            learner.parent_dataset[-1].get_potential_energy(),
+            reference.get_potential_energy(),
+        )
+        assert learner.parent_dataset[-1].info["fidelity"] == 0
+        assert learner.rung_calls == [2]
+        assert learner.parent_calls == 1
+
+    def test_escalation_past_disagreeing_rungs(self):
+        learner = get_learner(
+            [ShiftedEMT(shift=5.0, force_noise=1.0), ShiftedEMT(force_noise=0.001)]
+        )
+        learner.get_energy_and_forces(get_slab(0))
+        assert learner.rung_calls == [1, 1]
+
+        # the noisy rung disagrees with the model, the next rung answers
+        learner.get_energy_and_forces(get_slab(1))
+        assert learner.info["fidelity"] == 1
+        assert learner.rung_calls == [2, 2]
+        assert learner.parent_calls == 1
+
+        # without an agreeing rung the query goes to the top
+        learner.ladder_calcs[1].force_noise = 1.0
+        learner.get_energy_and_forces(get_slab(2))
+        assert learner.info["fidelity"] == 2
+        assert learner.rung_calls == [3, 3]
+        assert learner.parent_calls == 2
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.atomistic_methods import MDsimulate
+from finetuna.online_learner.md_learner import MDLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+
+
+def get_frames(n):
+    frames = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+        slab.rattle(0.02, seed=i)
+        frames.append(slab)
+    return frames
+
+
+class md_learner(unittest.TestCase):
+    def test_fast_prediction_between_checks(self):
+        ml_potential = EMTPotential(uncertainty=0.1)
+        learner = MDLearner(
+            get_learner_params(uncertainty_interval=3, fmax_verify_threshold=0.0),
+            [],
+            ml_potential,
+            EMT(),
+        )
+        frames = get_frames(8)
+        frames[0].calc = learner
+        frames[0].get_forces()  # initial parent query
+        checks = []
+        for frame in frames[1:]:
+            calls = ml_potential.calls
+            frame.calc = learner
+            energy = frame.get_potential_energy()
+            forces = frame.get_forces()
+            checks.append(ml_potential.calls > calls)
+            assert learner.info["check"] is False
+
+            reference = frame.copy()
+            reference.calc = EMT()
+            assert np.isclose(energy, reference.get_potential_energy())
+            assert np.allclose(forces, reference.get_forces())
+
+        # the uncertainty stays below the tolerance, so only every third step is checked
+        assert checks == [True, False, False, True, False, False, True]
+        assert ml_potential.fast_calls == 4
+
+    def test_partial_query_batch_is_flushed_at_the_end_of_the_run(self):
+        ml_potential = EMTPotential(uncertainty=100.0)
+        learner = MDLearner(
+            get_learner_params(query_batch_size=3), [], ml_potential, EMT()
+        )
+        md = MDsimulate("NVE", 1.0, 300, 4, initial_geometry=get_frames(1)[0])
+        md.print_interval = None
+        with tempfile.TemporaryDirectory() as directory:
+            md.run(learner, os.path.join(directory, "md"))
+        # every step after the initial query is flagged, the last frames do not fill a batch
+        assert learner.curr_step % 3 != 1
+        assert learner.query_buffer == []
+        assert learner.parent_calls == learner.curr_step
+        assert len(learner.parent_dataset) == learner.curr_step
@@ -0,0 +1,195 @@
+import os
+import tempfile
+import unittest
+import ase.db
+import numpy as np
+from ase.build import add_adsorbate, fcc100, fcc111
+from ase.calculators.calculator import all_changes
+from ase.calculators.emt import EMT
+from ase.calculators.singlepoint import SinglePointCalculator
+from ase.constraints import FixAtoms
+from ase.neb import NEB
+from finetuna.atomistic_methods import BatchedNEB, relax_endpoints_batched
+from finetuna.online_learner.neb_learner import NEBLearner
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.utils import attach_singlepoint
+
+
+class FlaggedEMTPotential(EMTPotential):
+    """EMTPotential reporting a large uncertainty for images with info["flagged"] set"""
+
+    def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+        EMTPotential.calculate(self, atoms, properties, system_changes)
+        if atoms.info.get("flagged", False):
+            atoms.info["max_force_stds"] = 1000.0
+
+
+class EMTBandCalc:
+    """Band calculator attaching EMT singlepoints, recording the number of images of every calculate_band call"""
+
+    def __init__(self):
+        self.bands = []
+
+    def calculate_band(self, images):
+        self.bands.append(len(images))
+        for image in images:
+            emt_image = image.copy()
+            emt_image.calc = EMT()
+            attach_singlepoint(
+                image,
+                emt_image.get_potential_energy(),
+                emt_image.get_forces(apply_constraint=False),
+            )
+
+
+def get_slab(seed=0):
+    slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+    slab.rattle(0.05, seed=seed)
+    return slab
+
+
+def get_band(seed=0, n=3):
+    return [get_slab(seed + i) for i in range(n)]
+
+
+def get_endpoints():
+    # Au adatom hopping between neighboring hollow sites of Al(100)
+    initial = fcc100("Al", size=(2, 2, 3))
+    add_adsorbate(initial, "Au", 1.7, "hollow")
+    initial.center(axis=2, vacuum=4.0)
+    initial.set_constraint(FixAtoms(mask=[atom.tag > 1 for atom in initial]))
+    final = initial.copy()
+    final.positions[-1, 0] += initial.get_cell()[0, 0] / 2
+    return initial, final
+
+
+def get_emt_results(image):
+    emt_image = image.copy()
+    emt_image.calc = EMT()
+    return emt_image.get_potential_energy(), emt_image.get_forces(
+        apply_constraint=False
+    )
+
+
+class neb_learner(unittest.TestCase):
+    def test_band_update_queries_uncertain_images(self):
+        with tempfile.TemporaryDirectory() as directory:
+            asedb_name = os.path.join(directory, "oal.db")
+            ml_potential = FlaggedEMTPotential(force_noise=0.05)
+            learner = NEBLearner(
+                get_learner_params(asedb_name=asedb_name), [], ml_potential, EMT()
+            )
+
+            # every image of the first band is queried to meet the initial points, with one training
+            learner.calculate_band(get_band(seed=0))
+            assert learner.parent_calls == 3
+            assert len(ml_potential.trainings) == 1
+            assert ase.db.connect(asedb_name).count() == 1
+
+            band = get_band(seed=10)
+            band[1].info["flagged"] = True
+            learner.calculate_band(band)
+            assert list(learner.info["queried_images"]) == [1]
+            assert learner.parent_calls == 4
+            assert len(ml_potential.trainings) == 2
+            assert len(learner.info["query"]) == 3
+
+            # the queried image has parent results, the others keep the noisy predictions
+            for i, image in enumerate(band):
+                energy, forces = get_emt_results(image)
+                assert np.isclose(image.get_potential_energy(), energy)
+                assert np.allclose(
+                    image.get_forces(apply_constraint=False), forces
+                ) is (i == 1)
+
+            # one log entry per band update, images with current results are not evaluated again
+            assert ase.db.connect(asedb_name).count() == 2
+            calls = ml_potential.calls
+            learner.calculate_band(band)
+            assert ml_potential.calls == calls
+            assert ase.db.connect(asedb_name).count() == 2
+
+    def test_first_training_on_a_batch(self):
+        ml_potential = EMTPotential()
+        learner = NEBLearner(
+            get_learner_params(num_initial_points=2, initial_points_to_keep=[0]),
+            [],
+            ml_potential,
+            EMT(),
+        )
+        band = get_band()
+        learner.calculate_band(band)
+        # the initial points to keep plus the points added after the initial points in the same batch
+        assert ml_potential.trainings == [(2, False)]
+        assert learner.num_initial_points == 1
+        assert np.allclose(learner.parent_dataset[0].positions, band[0].positions)
+        assert np.allclose(learner.parent_dataset[1].positions, band[2].positions)
+
+    def test_first_training_on_single_steps(self):
+        ml_potential = EMTPotential(uncertainty=100.0)
+        learner = OnlineLearner(
+            get_learner_params(num_initial_points=3, initial_points_to_keep=[0, 2]),
+            [],
+            ml_potential,
+            EMT(),
+        )
+        slabs = get_band(n=4)
+        for slab in slabs[:2]:
+            learner.get_energy_and_forces(slab)
+        assert ml_potential.trainings == []
+
+        learner.get_energy_and_forces(slabs[2])
+        assert ml_potential.trainings == [(2, False)]
+        assert learner.num_initial_points == 2
+        assert np.allclose(learner.parent_dataset[0].positions, slabs[0].positions)
+        assert np.allclose(learner.parent_dataset[1].positions, slabs[2].positions)
+
+        # the uncertain prediction is queried and the potential partially fit on the new point
+        learner.get_energy_and_forces(slabs[3])
+        assert learner.parent_calls == 4
+        assert ml_potential.trainings == [(2, False), (3, True)]
+
+    def test_relax_endpoints_batched(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                initial, final = get_endpoints()
+                initial.rattle(0.05, seed=0)
+                final.rattle(0.05, seed=1)
+                band_calc = EMTBandCalc()
+                relaxed = relax_endpoints_batched(
+                    [initial, final],
+                    band_calc,
+                    ["initial", "final"],
+                    fmax=0.05,
+                    steps=50,
+                )
+            finally:
+                os.chdir(cwd)
+        # both endpoints are calculated together until the first one converges
+        assert band_calc.bands[0] == 2
+        assert band_calc.bands == sorted(band_calc.bands, reverse=True)
+        for image in relaxed:
+            assert np.sqrt((image.get_forces() ** 2).sum(axis=1).max()) < 0.05
+
+    def test_batched_neb_matches_neb(self):
+        initial, final = get_endpoints()
+        images = [initial]
+        images += [initial.copy() for _ in range(3)]
+        images.append(final)
+        NEB(images).interpolate()
+
+        emt_images = [image.copy() for image in images]
+        for image in emt_images:
+            image.calc = EMT()
+        for image in [images[0], images[-1]]:
+            energy, forces = get_emt_results(image)
+            image.calc = SinglePointCalculator(image, energy=energy, forces=forces)
+
+        band_calc = EMTBandCalc()
+        batched_forces = BatchedNEB(images, band_calc).get_forces()
+        # the interior images are calculated with one call
+        assert band_calc.bands == [3]
+        assert np.allclose(batched_forces, NEB(emt_images).get_forces())
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.calculator import all_changes
+from ase.calculators.emt import EMT
+from ase.optimize import BFGS
+from finetuna.atomistic_methods import Relaxation
+from finetuna.offline_learner.offline_learner import OfflineActiveLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.utils import convert_to_singlepoint
+
+
+class FmaxUncertaintyEMTPotential(EMTPotential):
+    """EMTPotential reporting the largest force of each image as its uncertainty"""
+
+    def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+        EMTPotential.calculate(self, atoms, properties, system_changes)
+        atoms.info["max_force_stds"] = np.max(np.abs(self.results["forces"]))
+
+
+def get_learner(directory, **learner_params):
+    slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+    slab.rattle(0.05, seed=0)
+    slab.calc = EMT()
+    (slab,) = convert_to_singlepoint([slab])
+    relaxation = Relaxation(slab, BFGS, fmax=0.05, steps=5)
+    return OfflineActiveLearner(
+        get_learner_params(
+            atomistic_method=relaxation,
+            file_dir=directory + os.sep,
+            seed=0,
+            **learner_params
+        ),
+        [],
+        EMTPotential(),
+        EMT(),
+        EMT(),
+    )
+
+
+class offline_query(unittest.TestCase):
+    def test_random_query_is_clamped_to_candidates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(directory, warm_start=True, samples_to_retrain=5)
+            # a warm started run can sample fewer images than samples_to_retrain
+            learner.sample_candidates = learner.sample_candidates[:3]
+            queried_images, query_idx = learner.query_func()
+            assert sorted(query_idx) == [1, 2]
+            assert len(queried_images) == 2
+
+    def test_random_query_without_candidates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(directory, warm_start=True, samples_to_retrain=2)
+            learner.sample_candidates = learner.sample_candidates[:1]
+            assert learner.query_func() == ([], [])
+            parent_calls = learner.parent_calls
+            learner.query_data()
+            assert learner.parent_calls == parent_calls
+
+    def test_max_uncertainty_query(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(
+                directory, query_method="max_uncertainty", samples_to_retrain=2
+            )
+            learner.sampling_calc = FmaxUncertaintyEMTPotential()
+            num_candidates = len(learner.sample_candidates) - 1
+            assert num_candidates > 2
+            fmaxes = []
+            for image in learner.sample_candidates[1:]:
+                emt_image = image.copy()
+                emt_image.calc = EMT()
+                fmaxes.append(np.max(np.abs(emt_image.get_forces())))
+            expected = [int(i) + 1 for i in np.argsort(fmaxes)[::-1]]
+
+            queried_images, query_idx = learner.query_func()
+            assert query_idx == expected[:2]
+            assert queried_images[0] is learner.sample_candidates[expected[0]]
+
+            # more samples requested than there are candidates
+            learner.samples_to_retrain = num_candidates + 3
+            queried_images, query_idx = learner.query_func()
+            assert query_idx == expected
+            assert len(queried_images) == num_candidates
+
+    def test_max_uncertainty_query_requires_uncertainty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(directory, query_method="max_uncertainty")
+            learner.sampling_calc = EMT()
+            with self.assertRaises(ValueError):
+                learner.query_func()
+
+    def test_kcenter_query(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(directory, query_method="kcenter")
+            learner.sampling_calc = EMTPotential()
+            num_candidates = len(learner.sample_candidates) - 1
+
+            learner.samples_to_retrain = 2
+            queried_images, query_idx = learner.query_func()
+            assert len(set(query_idx)) == 2
+            assert all(1 <= idx <= num_candidates for idx in query_idx)
+
+            # more samples requested than there are candidates, every candidate is selected once
+            learner.samples_to_retrain = num_candidates + 3
+            queried_images, query_idx = learner.query_func()
+            assert sorted(query_idx) == list(range(1, num_candidates + 1))
+            assert len(queried_images) == num_candidates
+
+            learner.sampling_calc = EMT()
+            with self.assertRaises(ValueError):
+                learner.query_func()
+
+    def test_warm_start_continues_from_last_candidate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = get_learner(directory, warm_start=True, samples_to_retrain=2)
+            relaxation = learner.atomistic_method
+            runs = []
+            run = relaxation.run
+
+            def record_run(**kwargs):
+                runs.append(kwargs)
+                run(**kwargs)
+
+            relaxation.run = record_run
+            queries = []
+            add_data = learner.add_data
+
+            def record_add_data(queried_images, query_idx):
+                queries.append(query_idx)
+                return add_data(queried_images, query_idx)
+
+            learner.add_data = record_add_data
+
+            for _ in range(2):
+                last_candidate = learner.sample_candidates[-1]
+                hessian = relaxation.hessian
+                assert hessian is not None
+                learner.do_before_train()
+                learner.do_train()
+                learner.do_after_train()
+
+                # the next run starts where the last one stopped, with the hessian it left
+                assert runs[-1]["initial_structure"] is last_candidate
+                assert runs[-1]["hessian"] is hessian
+                assert runs[-1]["store_images"] is True
+                assert np.allclose(
+                    learner.sample_candidates[0].positions, last_candidate.positions
+                )
+                assert relaxation.hessian is not hessian
+
+            # the first candidate of a warm started run was sampled before, it is never queried again
+            assert all(0 not in query_idx for query_idx in queries)
+            assert all(len(query_idx) > 0 for query_idx in queries)
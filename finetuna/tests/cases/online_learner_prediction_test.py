@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+import ase.db
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.utils import asedb_row_to_atoms
+
+
+def get_slab(seed=0):
+    slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+    slab.rattle(0.05, seed=seed)
+    return slab
+
+
+class online_learner_prediction(unittest.TestCase):
+    def test_complete_dataset_frame_is_not_overwritten(self):
+        learner = OnlineLearner(get_learner_params(), [], EMTPotential(), EMT())
+        slab = get_slab()
+        learner.get_energy_and_forces(slab)  # initial parent query
+        learner.get_energy_and_forces(slab)
+        assert learner.info["check"] is False
+        stored = learner.complete_dataset[-1]
+        positions = stored.positions.copy()
+        energy = stored.get_potential_energy()
+
+        moved = get_slab(seed=1)
+        learner.get_energy_and_forces(moved)
+        assert learner.info["check"] is False
+        assert learner.complete_dataset[-1] is not stored
+        assert np.allclose(stored.positions, positions)
+        assert stored.get_potential_energy() == energy
+
+    def test_prediction_atoms_are_not_copied_every_step(self):
+        learner = OnlineLearner(get_learner_params(), [], EMTPotential(), EMT())
+        learner.get_energy_and_forces(get_slab())  # initial parent query
+        frames = []
+        for seed in range(1, 7):
+            learner.get_energy_and_forces(get_slab(seed=seed))
+            assert learner.info["check"] is False
+            frames.append(learner.complete_dataset[-1])
+        # the scratch atoms and the last frame swap places, after the first two predictions no atoms are copied
+        assert len(set(id(frame) for frame in frames)) == 2
+        assert frames[-1] is not frames[-2]
+        assert np.allclose(frames[-1].positions, get_slab(seed=6).positions)
+
+    def test_retrained_prediction_is_opt_in(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for retrained_prediction, extra_calls in [(False, 0), (True, 1)]:
+                ml_potential = EMTPotential()
+                learner = OnlineLearner(
+                    get_learner_params(
+                        asedb_name=os.path.join(directory, "queried.db"),
+                        fmax_verify_threshold=100.0,
+                        logger={"retrained_prediction": retrained_prediction},
+                    ),
+                    [],
+                    ml_potential,
+                    EMT(),
+                )
+                slab = get_slab()
+                learner.get_energy_and_forces(slab)
+                calls = ml_potential.calls
+                # the prediction is below fmax_verify_threshold, so the parent is queried
+                learner.get_energy_and_forces(get_slab(seed=1))
+                assert learner.info["check"] is True
+                assert learner.info["forces_mae"] is not None
+                assert ml_potential.calls - calls == 1 + extra_calls
+                assert ("retrained_energy" in learner.info) is retrained_prediction
+
+                row = list(
+                    ase.db.connect(os.path.join(directory, "queried.db")).select()
+                )[-1]
+                if retrained_prediction:
+                    retrained = asedb_row_to_atoms(row, "retrained")
+                    assert np.isclose(
+                        retrained.get_potential_energy(),
+                        learner.info["retrained_energy"],
+                    )
+                else:
+                    with self.assertRaises(ValueError):
+                        asedb_row_to_atoms(row, "retrained")
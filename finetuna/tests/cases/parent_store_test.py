@@ -0,0 +1,115 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from ase.build import add_adsorbate, fcc111
+from ase.calculators.emt import EMT
+from ase.db.sqlite import SQLite3Database
+from finetuna.online_learner.online_learner import OnlineLearner
+from finetuna.parent_store import ParentDataStore
+from finetuna.tests.setup.emt_potential import EMTPotential, get_learner_params
+from finetuna.utils import convert_to_singlepoint
+
+
+def get_slab(rattle=0.05, seed=0, adsorbate=None):
+    slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+    if adsorbate is not None:
+        add_adsorbate(slab, adsorbate, 2.0, "ontop")
+        # adsorbate atoms are tagged 2, as in OCP
+        tags = slab.get_tags()
+        tags[-len(adsorbate) :] = 2
+        slab.set_tags(tags)
+    slab.rattle(rattle, seed=seed)
+    return slab
+
+
+def get_parent_data(slabs):
+    for slab in slabs:
+        slab.calc = EMT()
+    return convert_to_singlepoint(slabs)
+
+
+class parent_store(unittest.TestCase):
+    def test_put_stores_every_structure_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ParentDataStore(os.path.join(directory, "store.db"), "emt")
+            images = get_parent_data([get_slab(seed=i) for i in range(3)])
+            # the logger reseeds random, entries must not rely on random unique ids
+            random.seed(0)
+            assert store.put(images[:2]) == 2
+            random.seed(0)
+            assert store.put(images) == 1
+            assert store.put(images) == 0
+
+    def test_concurrent_put_is_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ParentDataStore(os.path.join(directory, "store.db"), "emt")
+            images = get_parent_data([get_slab()])
+            assert store.put(images) == 1
+            # another run wrote the structure between the check and the write
+            with mock.patch.object(SQLite3Database, "count", return_value=0):
+                assert store.put(images) == 0
+
+    def test_select(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ParentDataStore(os.path.join(directory, "store.db"), "emt")
+            images = get_parent_data(
+                [get_slab(rattle=0.01 * (i + 1), seed=i) for i in range(3)]
+                + [get_slab(seed=3, adsorbate="O")]
+            )
+            store.put(images)
+            ParentDataStore(store.db_path, "vasp").put(
+                get_parent_data([get_slab(seed=4)])
+            )
+
+            selected = store.select(get_slab(rattle=0.0), 4)
+            # the same composition closest first, then the same surface with other adsorbates
+            assert [image.info["parent_store_id"] for image in selected] == [1, 2, 3, 4]
+            for image, stored in zip(selected, images):
+                assert np.allclose(image.positions, stored.positions)
+                assert np.isclose(
+                    image.get_potential_energy(), stored.get_potential_energy()
+                )
+                assert image.info["check"] is True
+            assert len(store.select(get_slab(), 2)) == 2
+
+    def test_learner_seeds_from_and_writes_to_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "store.db")
+            learner_params = get_learner_params(
+                parent_store={"db_path": db_path, "k": 2}
+            )
+            learner = OnlineLearner(learner_params, [], EMTPotential(), EMT())
+            slab = get_slab()
+            slab.calc = learner
+            slab.get_forces()
+            assert learner.parent_calls == 1
+            store = ParentDataStore(db_path, learner.parent_store.calc_key)
+            assert len(store.select(slab, 2)) == 1
+
+            # a second run starts from the stored data
+            ml_potential = EMTPotential()
+            learner = OnlineLearner(learner_params, [], ml_potential, EMT())
+            slab = get_slab(seed=1)
+            slab.calc = learner
+            slab.get_forces()
+            assert ml_potential.trainings[0] == (1, False)
+            assert learner.parent_calls == 0
+
+    def test_store_write_failure_only_warns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            learner = OnlineLearner(
+                get_learner_params(
+                    parent_store={"db_path": os.path.join(directory, "store.db")}
+                ),
+                [],
+                EMTPotential(),
+                EMT(),
+            )
+            with mock.patch.object(
+                learner.parent_store, "put", side_effect=OSError("disk full")
+            ):
+                with self.assertLogs(level="WARNING"):
+                    learner.store_parent_data(get_parent_data([get_slab()]))
@@ -0,0 +1,89 @@
+import copy
+import pickle
+import unittest
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from finetuna.calcs import DeltaCalc, ResultCache
+from finetuna.utils import compute_with_calc
+
+
+class CountingEMT(EMT):
+    """EMT counting its calculations"""
+
+    def __init__(self):
+        EMT.__init__(self)
+        self.calls = 0
+
+    def calculate(self, *args, **kwargs):
+        self.calls += 1
+        EMT.calculate(self, *args, **kwargs)
+
+
+def get_slab(seed):
+    slab = fcc111("Cu", (2, 2, 2), vacuum=6.0)
+    slab.rattle(0.05, seed=seed)
+    return slab
+
+
+class result_cache(unittest.TestCase):
+    def test_least_recently_used_eviction(self):
+        cache = ResultCache(max_size=2)
+        slabs = [get_slab(i) for i in range(3)]
+        for i, slab in enumerate(slabs[:2]):
+            cache.put(slab, {"energy": float(i)})
+        assert cache.get(slabs[0])["energy"] == 0.0
+        cache.put(slabs[2], {"energy": 2.0})
+        assert len(cache) == 2
+        # the second slab was used least recently
+        assert cache.get(slabs[1]) is None
+        assert cache.get(slabs[0]) is not None
+        assert cache.get(slabs[2]) is not None
+
+        moved = slabs[0].copy()
+        moved.positions[0, 0] += 1e-8
+        assert cache.get(moved) is None
+
+    def test_stored_results_are_copies(self):
+        cache = ResultCache()
+        slab = get_slab(0)
+        forces = np.zeros((len(slab), 3))
+        cache.put(slab, {"forces": forces})
+        forces += 1.0
+        assert np.all(cache.get(slab)["forces"] == 0.0)
+
+    def test_copies_share_entries(self):
+        cache = ResultCache()
+        slab = get_slab(0)
+        copied = copy.deepcopy(cache)
+        copied.put(slab, {"energy": 1.0})
+        assert cache.get(slab)["energy"] == 1.0
+
+        unpickled = pickle.loads(pickle.dumps(cache))
+        assert unpickled.get(slab)["energy"] == 1.0
+        # the lock is recreated after unpickling
+        unpickled.put(get_slab(1), {"energy": 2.0})
+        assert len(unpickled) == 2
+
+    def test_delta_calcs_evaluate_base_once(self):
+        (parent_ref,) = compute_with_calc([get_slab(10)], EMT())
+        (base_ref,) = compute_with_calc([parent_ref], EMT())
+        base_calc = CountingEMT()
+        refs = [parent_ref, base_ref]
+        cache = ResultCache()
+
+        slabs = [get_slab(i) for i in range(3)]
+        sub_calc = DeltaCalc([EMT(), base_calc], "sub", refs, base_cache=cache)
+        deltas = compute_with_calc(slabs, sub_calc)
+        assert base_calc.calls == 3
+
+        add_calc = DeltaCalc([deltas[0].calc, base_calc], "add", refs, base_cache=cache)
+        (added,) = compute_with_calc([slabs[0]], add_calc)
+        assert base_calc.calls == 3
+
+        reference = slabs[0].copy()
+        reference.calc = EMT()
+        assert np.isclose(
+            added.get_potential_energy(), reference.get_potential_energy()
+        )
+        assert np.allclose(added.get_forces(), reference.get_forces())
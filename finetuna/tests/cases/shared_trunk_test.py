@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+from ase.build import add_adsorbate, fcc111
+from ase.calculators.emt import EMT
+from ase.constraints import FixAtoms
+from finetuna.tests.setup.ocp_checkpoints import (
+    GEMNET_T_CHECKPOINT,
+    get_finetuner_params,
+    ocp_available,
+)
+
+
+def get_dataset(n=3):
+    dataset = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+        add_adsorbate(slab, "O", 1.5 + 0.1 * i, "fcc")
+        slab.set_constraint(FixAtoms(indices=range(4)))
+        slab.calc = EMT()
+        slab.get_forces()
+        dataset.append(slab)
+    return dataset
+
+
+class shared_trunk(unittest.TestCase):
+    @unittest.skipUnless(ocp_available(), "requires ocpmodels and the OCP checkpoints")
+    def test_shared_trunk_matches_members_with_ema(self):
+        from finetuna.ml_potentials.finetuner_ensemble_calc import (
+            FinetunerEnsembleCalc,
+        )
+
+        params = get_finetuner_params(unfreeze_blocks=["out_blocks.3"])
+        params["optim"]["ema_decay"] = 0.999
+        calc = FinetunerEnsembleCalc([GEMNET_T_CHECKPOINT] * 2, params)
+        dataset = get_dataset()
+        calc.train(dataset)
+        assert all(finetuner.trainer.ema for finetuner in calc.finetuner_calcs)
+
+        shared_trunk = calc.get_shared_trunk()
+        assert shared_trunk is not None
+        shared_results = calc.calculate_shared_trunk(shared_trunk, dataset[0])
+
+        # per member OCP predict path, which swaps in the EMA weights itself
+        for finetuner in calc.finetuner_calcs:
+            finetuner.trainer.use_inference_snapshot = False
+        calc.shared_trunk = None
+        assert calc.get_shared_trunk() is None
+        member_results = calc.calculate_ml(dataset[0], ["energy", "forces"], [])
+
+        for shared_result, member_result in zip(shared_results, member_results):
+            assert np.allclose(shared_result, member_result, atol=1e-4)
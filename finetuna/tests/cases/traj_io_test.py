@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from ase.build import fcc111
+from ase.calculators.emt import EMT
+from ase.constraints import FixAtoms
+from finetuna.traj_io import (
+    ChunkedTrajectory,
+    ChunkedTrajectoryWriter,
+    open_trajectory,
+)
+
+
+def get_frames(n):
+    frames = []
+    for i in range(n):
+        slab = fcc111("Cu", (2, 2, 3), vacuum=6.0)
+        slab.set_constraint(FixAtoms(indices=[0, 1, 2, 3]))
+        slab.rattle(0.05, seed=i)
+        slab.set_momenta(np.full((len(slab), 3), 0.1 * i))
+        slab.calc = EMT()
+        frames.append(slab)
+    return frames
+
+
+class traj_io(unittest.TestCase):
+    def assert_roundtrip(self, compress):
+        frames = get_frames(7)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "md")
+            with ChunkedTrajectoryWriter(
+                filename + ".chunks", chunk_size=3, compress=compress
+            ) as writer:
+                for frame in frames:
+                    writer.write(frame)
+
+            traj = open_trajectory(filename, traj_format="chunked")
+            assert len(traj) == 7
+            assert len(traj.index["chunks"]) == 3
+            for frame, stored in zip(frames, traj):
+                assert np.allclose(frame.positions, stored.positions)
+                assert np.allclose(frame.cell, stored.cell)
+                assert np.array_equal(frame.get_tags(), stored.get_tags())
+                assert np.allclose(frame.get_momenta(), stored.get_momenta())
+                assert np.isclose(
+                    frame.get_potential_energy(), stored.get_potential_energy()
+                )
+                assert np.allclose(
+                    frame.get_forces(apply_constraint=False),
+                    stored.get_forces(apply_constraint=False),
+                )
+                assert stored.constraints[0].get_indices().tolist() == [0, 1, 2, 3]
+            assert np.allclose(traj[-1].positions, frames[-1].positions)
+            assert len(traj[2:5]) == 3
+            assert np.allclose(
+                traj.get_array("energy"),
+                [frame.get_potential_energy() for frame in frames],
+            )
+            with self.assertRaises(IndexError):
+                traj[7]
+
+    def test_roundtrip_compressed(self):
+        self.assert_roundtrip(compress=True)
+
+    def test_roundtrip_memory_mapped(self):
+        self.assert_roundtrip(compress=False)
+
+    def test_frames_without_calc(self):
+        frame = get_frames(1)[0]
+        frame.calc = None
+        with tempfile.TemporaryDirectory() as directory:
+            with ChunkedTrajectoryWriter(directory, atoms=frame) as writer:
+                writer.write()
+            (stored,) = ChunkedTrajectory(directory)
+            assert stored.calc is None
+            assert np.allclose(frame.positions, stored.positions)
+
+    def test_write_errors_are_raised(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ChunkedTrajectoryWriter(directory, chunk_size=1)
+            with mock.patch(
+                "finetuna.traj_io.np.savez_compressed", side_effect=OSError("disk full")
+            ):
+                writer.write(get_frames(1)[0])
+                with self.assertRaises(RuntimeError):
+                    writer.close()
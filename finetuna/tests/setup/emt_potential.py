@@ -0,0 +1,68 @@
+import numpy as np
+from ase.calculators.calculator import all_changes
+from ase.calculators.emt import EMT
+from finetuna.ml_potentials.ml_potential_calc import MLPCalc
+
+
+class EMTPotential(MLPCalc):
+    """
+    Stand-in ML potential for learner tests without OCP models: predicts EMT energies and forces
+    (plus optional gaussian force noise) and reports a fixed force uncertainty.
+    The atom descriptors are the atom positions, to test descriptor based selections.
+    Counts its predictions, fast predictions (without uncertainty) and descriptor calls, and records the size of every training set and whether it was a partial fit.
+    """
+
+    def __init__(self, uncertainty=0.0, force_noise=0.0, seed=0):
+        MLPCalc.__init__(self, mlp_params={})
+        self.uncertainty = uncertainty
+        self.force_noise = force_noise
+        self.rng = np.random.default_rng(seed)
+        self.emt = EMT()
+        self.calls = 0
+        self.fast_calls = 0
+        self.descriptor_calls = 0
+        self.trainings = []
+
+    def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+        MLPCalc.calculate(self, atoms, properties, system_changes)
+        self.calls += 1
+        emt_atoms = atoms.copy()
+        emt_atoms.calc = self.emt
+        forces = emt_atoms.get_forces(apply_constraint=False)
+        if self.force_noise:
+            forces = forces + self.rng.normal(0.0, self.force_noise, forces.shape)
+        self.results["energy"] = emt_atoms.get_potential_energy(apply_constraint=False)
+        self.results["forces"] = forces
+        atoms.info["max_force_stds"] = self.uncertainty
+
+    def calculate_fast(self, atoms):
+        self.fast_calls += 1
+        emt_atoms = atoms.copy()
+        emt_atoms.calc = self.emt
+        return emt_atoms.get_potential_energy(), emt_atoms.get_forces(
+            apply_constraint=False
+        )
+
+    def train(self, parent_dataset, new_dataset=None):
+        # like a retrained model, results cached for the last geometry are invalid after training
+        self.reset()
+        self.trainings.append((len(parent_dataset), bool(new_dataset)))
+
+    def get_descriptors(self, atoms):
+        self.descriptor_calls += 1
+        return atoms.positions.copy()
+
+
+def get_learner_params(**learner_params):
+    """Returns online learner params without logging sinks, updated with learner_params"""
+    params = {
+        "num_initial_points": 1,
+        "fmax_verify_threshold": 0.03,
+        "stat_uncertain_tol": 1.0,
+        "dyn_uncertain_tol": 10.0,
+        "asedb_name": None,
+        "print_uncertainty": False,
+        "wandb_init": {"wandb_log": False},
+    }
+    params.update(learner_params)
+    return params
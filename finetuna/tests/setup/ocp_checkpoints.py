@@ -0,0 +1,29 @@
+import importlib.util
+import os
+
+# checkpoints on the shared scratch of the test runners, as in the online_ft test cases
+GEMNET_T_CHECKPOINT = "/home/jovyan/shared-scratch/ocp_checkpoints/for_finetuna/public_checkpoints/scaling_attached/gemnet_t_direct_h512_all_attscale.pt"
+GEMNET_ENSEMBLE_CHECKPOINTS = [
+    "/home/jovyan/shared-scratch/joe/optim_cleaned_checkpoints/gemnet_s2re_bagging_results/gem_homo_run0.pt",
+    "/home/jovyan/shared-scratch/joe/optim_cleaned_checkpoints/gemnet_s2re_bagging_results/gem_homo_run1.pt",
+]
+
+
+def ocp_available(checkpoint_paths=(GEMNET_T_CHECKPOINT,)):
+    """Returns whether ocpmodels is installed and the checkpoints are on disk"""
+    return importlib.util.find_spec("ocpmodels") is not None and all(
+        os.path.exists(path) for path in checkpoint_paths
+    )
+
+
+def get_finetuner_params(**tuner):
+    """Returns FinetunerCalc mlp_params for small single-threaded test runs, updated with the tuner params"""
+    return {
+        "tuner": dict({"num_threads": 1}, **tuner),
+        "optim": {
+            "batch_size": 1,
+            "num_workers": 0,
+            "max_epochs": 2,
+            "lr_initial": 0.0003,
+        },
+    }
@@ -7,6 +7,27 @@ from finetuna.tests.cases.online_ft_uncertainty_CuNP_test import (
 )
 from finetuna.tests.cases.online_ft_gemnet_dT_CuNP_test import online_ft_gemnet_dT_CuNP
 from finetuna.tests.cases.online_ft_gemnet_oc_CuNP_test import online_ft_gemnet_oc_CuNP
+from finetuna.tests.cases.convert_to_singlepoint_test import (
+    convert_to_singlepoint_executor,
+)
+from finetuna.tests.cases.online_learner_prediction_test import (
+    online_learner_prediction,
+)
+from finetuna.tests.cases.compact_dataset_test import compact_dataset
+from finetuna.tests.cases.coreset_test import coreset
+from finetuna.tests.cases.offline_query_test import offline_query
+from finetuna.tests.cases.endpoint_cache_test import endpoint_cache
+from finetuna.tests.cases.md_learner_test import md_learner
+from finetuna.tests.cases.ladder_learner_test import ladder_learner
+from finetuna.tests.cases.campaign_test import campaign
+from finetuna.tests.cases.parent_store_test import parent_store
+from finetuna.tests.cases.embedding_index_test import embedding_index
+from finetuna.tests.cases.traj_io_test import traj_io
+from finetuna.tests.cases.result_cache_test import result_cache
+from finetuna.tests.cases.graph_pruning_test import graph_pruning
+from finetuna.tests.cases.inference_snapshot_test import inference_snapshot
+from finetuna.tests.cases.shared_trunk_test import shared_trunk
+from finetuna.tests.cases.neb_learner_test import neb_learner
 
 # initialize the test suite
 loader = unittest.TestLoader()
@@ -16,3 +37,20 @@ suite = unittest.TestSuite()
 suite.addTests(loader.loadTestsFromModule(online_ft_uncertainty_CuNP))
 suite.addTests(loader.loadTestsFromModule(online_ft_gemnet_dT_CuNP))
 suite.addTests(loader.loadTestsFromModule(online_ft_gemnet_oc_CuNP))
+suite.addTests(loader.loadTestsFromModule(convert_to_singlepoint_executor))
+suite.addTests(loader.loadTestsFromModule(online_learner_prediction))
+suite.addTests(loader.loadTestsFromModule(compact_dataset))
+suite.addTests(loader.loadTestsFromModule(coreset))
+suite.addTests(loader.loadTestsFromModule(offline_query))
+suite.addTests(loader.loadTestsFromModule(endpoint_cache))
+suite.addTests(loader.loadTestsFromModule(md_learner))
+suite.addTests(loader.loadTestsFromModule(ladder_learner))
+suite.addTests(loader.loadTestsFromModule(campaign))
+suite.addTests(loader.loadTestsFromModule(parent_store))
+suite.addTests(loader.loadTestsFromModule(embedding_index))
+suite.addTests(loader.loadTestsFromModule(traj_io))
+suite.addTests(loader.loadTestsFromModule(result_cache))
+suite.addTests(loader.loadTestsFromModule(graph_pruning))
+suite.addTests(loader.loadTestsFromModule(inference_snapshot))
+suite.addTests(loader.loadTestsFromModule(shared_trunk))
+suite.addTests(loader.loadTestsFromModule(neb_learner))
@@ -0,0 +1,268 @@
+import json
+import os
+import queue
+import threading
+import numpy as np
+from ase.atoms import Atoms
+from ase.calculators.singlepoint import SinglePointCalculator
+from ase.constraints import FixAtoms
+
+
+class ChunkedTrajectoryWriter:
+    """
+    Buffered trajectory writer for long runs, used like an ase Trajectory opened for writing
+    (e.g. dyn.attach(writer.write, interval=10) for decimation).
+
+    Frames are copied into preallocated chunk arrays (positions, cell, energy, forces and momenta if present),
+    full chunks are written by a background thread so the dynamics only pay for the copy.
+    Numbers, pbc, tags and fixed atoms are stored once, they must not change during the run.
+    Chunks are written to the directory path as compressed .npz files, or as .npy files per array
+    (which ChunkedTrajectory reads memory-mapped) if compress is False.
+    An index.json listing the written chunks is updated after every chunk.
+
+    Parameters
+    ----------
+    path: str
+        directory to write the chunks to
+
+    atoms: Atoms
+        atoms written when write() is called without arguments
+
+    chunk_size: int
+        number of frames per chunk
+
+    compress: bool
+        whether to write compressed .npz chunks
+
+    dtype: numpy dtype
+        dtype the per frame arrays are stored with
+    """
+
+    def __init__(
+        self, path, atoms=None, chunk_size=1000, compress=True, dtype=np.float64
+    ):
+        self.path = path
+        self.atoms = atoms
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.dtype = dtype
+        os.makedirs(path, exist_ok=True)
+
+        self.index = None
+        self.buffers = None
+        self.n_buffered = 0
+        self.error = None
+        # at most two chunks wait for the writer thread, bounding the memory held by the buffers
+        self.chunks = queue.Queue(maxsize=2)
+        self.thread = threading.Thread(
+            target=self._run, name="finetuna-trajectory-writer", daemon=True
+        )
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, atoms=None):
+        if atoms is None:
+            atoms = self.atoms
+        if self.error is not None:
+            raise RuntimeError("Asynchronous trajectory write failed") from self.error
+        if self.index is None:
+            self.init_index(atoms)
+        if self.buffers is None:
+            self.buffers = self.new_buffers(len(atoms), atoms.has("momenta"))
+
+        i = self.n_buffered
+        self.buffers["positions"][i] = atoms.positions
+        self.buffers["cell"][i] = atoms.cell.array
+        if atoms.calc is not None:
+            self.buffers["energy"][i] = atoms.get_potential_energy()
+            self.buffers["forces"][i] = atoms.get_forces(apply_constraint=False)
+        if "momenta" in self.buffers:
+            self.buffers["momenta"][i] = atoms.get_momenta()
+        self.n_buffered += 1
+
+        if self.n_buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands the buffered frames over to the writer thread.
+        """
+        if self.n_buffered == 0:
+            return
+        chunk = {
+            name: buffer[: self.n_buffered] for name, buffer in self.buffers.items()
+        }
+        self.chunks.put(chunk)
+        self.buffers = None
+        self.n_buffered = 0
+
+    def close(self):
+        """
+        Writes the remaining frames and waits for the writer thread to finish.
+        """
+        self.flush()
+        self.chunks.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError("Asynchronous trajectory write failed") from self.error
+
+    def init_index(self, atoms):
+        fixed = []
+        for constraint in atoms.constraints:
+            if isinstance(constraint, FixAtoms):
+                fixed += [int(i) for i in constraint.get_indices()]
+        self.index = {
+            "numbers": atoms.get_atomic_numbers().tolist(),
+            "pbc": atoms.pbc.tolist(),
+            "tags": atoms.get_tags().tolist(),
+            "fixed": fixed,
+            "compress": self.compress,
+            "chunks": [],
+        }
+        self.write_index()
+
+    def new_buffers(self, natoms, momenta):
+        buffers = {
+            "positions": np.zeros((self.chunk_size, natoms, 3), dtype=self.dtype),
+            "cell": np.zeros((self.chunk_size, 3, 3), dtype=self.dtype),
+            "energy": np.full(self.chunk_size, np.nan),
+            "forces": np.full((self.chunk_size, natoms, 3), np.nan, dtype=self.dtype),
+        }
+        if momenta:
+            buffers["momenta"] = np.zeros(
+                (self.chunk_size, natoms, 3), dtype=self.dtype
+            )
+        return buffers
+
+    def write_index(self):
+        temp_path = os.path.join(self.path, "index.json.tmp")
+        with open(temp_path, "w") as file:
+            json.dump(self.index, file)
+        os.replace(temp_path, os.path.join(self.path, "index.json"))
+
+    def _run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                name = "chunk_%06i" % len(self.index["chunks"])
+                if self.compress:
+                    np.savez_compressed(os.path.join(self.path, name + ".npz"), **chunk)
+                else:
+                    for key, array in chunk.items():
+                        np.save(
+                            os.path.join(self.path, name + "_" + key + ".npy"), array
+                        )
+                self.index["chunks"].append(
+                    {"name": name, "length": len(chunk["positions"])}
+                )
+                self.write_index()
+            except Exception as error:
+                self.error = error
+
+
+class ChunkedTrajectory:
+    """
+    Lazy reader of a trajectory written by ChunkedTrajectoryWriter, used like an ase Trajectory opened for reading.
+
+    Only the index is read on construction, chunks are loaded when a frame in them is accessed
+    (memory-mapped for uncompressed chunks) and the last loaded chunk is kept.
+    Frames are returned as Atoms with a SinglePointCalculator holding the stored energy and forces.
+
+    Parameters
+    ----------
+    path: str
+        directory the chunks were written to
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json"), "r") as file:
+            self.index = json.load(file)
+        lengths = [chunk["length"] for chunk in self.index["chunks"]]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+        self.loaded = None
+        self.loaded_chunk = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("ChunkedTrajectory index out of range")
+        chunk_index = int(np.searchsorted(self.offsets, index, side="right")) - 1
+        chunk = self.get_chunk(chunk_index)
+        i = index - self.offsets[chunk_index]
+
+        atoms = Atoms(
+            numbers=self.index["numbers"],
+            positions=chunk["positions"][i],
+            cell=chunk["cell"][i],
+            pbc=self.index["pbc"],
+            tags=self.index["tags"],
+        )
+        if self.index["fixed"]:
+            atoms.set_constraint(FixAtoms(indices=self.index["fixed"]))
+        if "momenta" in chunk:
+            atoms.set_momenta(chunk["momenta"][i])
+        if not np.isnan(chunk["energy"][i]):
+            sp_calc = SinglePointCalculator(
+                atoms,
+                energy=float(chunk["energy"][i]),
+                forces=np.array(chunk["forces"][i], dtype=np.float64),
+            )
+            sp_calc.implemented_properties = ["energy", "forces"]
+            atoms.calc = sp_calc
+        return atoms
+
+    def get_chunk(self, chunk_index):
+        if self.loaded_chunk != chunk_index:
+            name = self.index["chunks"][chunk_index]["name"]
+            if self.index["compress"]:
+                with np.load(os.path.join(self.path, name + ".npz")) as data:
+                    self.loaded = {key: data[key] for key in data.files}
+            else:
+                self.loaded = {}
+                for key in ["positions", "cell", "energy", "forces", "momenta"]:
+                    file_path = os.path.join(self.path, name + "_" + key + ".npy")
+                    if os.path.exists(file_path):
+                        self.loaded[key] = np.load(file_path, mmap_mode="r")
+            self.loaded_chunk = chunk_index
+        return self.loaded
+
+    def get_array(self, name):
+        """
+        Returns the stored array name ("positions", "cell", "energy", "forces" or "momenta") of all frames.
+        """
+        return np.concatenate(
+            [self.get_chunk(i)[name] for i in range(len(self.index["chunks"]))]
+        )
+
+
+def open_trajectory(filename, traj_format="traj"):
+    """
+    Opens the trajectory written for filename, as an ase Trajectory or a ChunkedTrajectory.
+    """
+    if traj_format == "chunked":
+        return ChunkedTrajectory(filename + ".chunks")
+    elif traj_format == "traj":
+        from ase.io import Trajectory
+
+        return Trajectory(filename + ".traj")
+    raise ValueError("invalid trajectory format given (" + str(traj_format) + ")")
@@ -2,18 +2,25 @@ from ase.calculators.singlepoint import SinglePointCalculator as sp
 from ase.io import write
 from ase.constraints import Hookean
 from ase.geometry.analysis import Analysis
-from pymatgen.core.bonds import _load_bond_length_data
+from ase.db.core import now
+from ase.db.row import AtomsRow
 import numpy as np
+import os
+import hashlib
+import sqlite3
 import subprocess
 import re
 import tempfile
 import random
+import copy
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from finetuna.calcs import DeltaCalc
 import numpy as np
 from numpy.linalg import norm
 
 
-def convert_to_singlepoint(images):
+def convert_to_singlepoint(images, executor=None, inplace=False):
     """
     Replaces the attached calculators with singlepoint calculators
 
@@ -22,48 +29,145 @@ def convert_to_singlepoint(images):
 
     images: list
         List of ase atoms images with attached calculators for forces and energies.
+
+    executor: concurrent.futures.Executor or str
+        Executor used to run the calculators of the images concurrently,
+        or "thread"/"process" to use a thread/process pool for this call only.
+        Calculators attached to more than one image are copied per image when running concurrently (see copy_calc),
+        every copy runs in its own subdirectory image_<i> of the calculator directory.
+        Socket and interactive calculators (e.g. SocketIOCalculator, VaspInteractive) can't be copied,
+        give every image its own calculator to run them concurrently.
+        Calculators implementing calculate_batch (e.g. FinetunerCalc) always evaluate their images in batches instead.
+        By default images are calculated one after the other.
+
+    inplace: bool
+        If True, the calculators of the given images are replaced directly instead of on copies of the images.
     """
 
-    images = copy_images(images)
-    singlepoint_images = []
-    # cwd = os.getcwd()
-    for image in images:
-        if isinstance(image.get_calculator(), sp):
-            singlepoint_images.append(image)
+    if not inplace:
+        images = copy_images(images)
+
+    pending = [image for image in images if not isinstance(image.calc, sp)]
+
+    # batched fast path for calculators that can evaluate several images at once
+    batched = {}
+    for image in pending:
+        if hasattr(image.calc, "calculate_batch"):
+            batched.setdefault(id(image.calc), []).append(image)
+    for batch_images in batched.values():
+        if len(batch_images) < 2:
             continue
-        # os.makedirs("./vasp_temp", exist_ok=True)
-        # os.chdir("./vasp_temp")
-        sample_energy = image.get_potential_energy(apply_constraint=False)
-        sample_forces = image.get_forces(apply_constraint=False)
-        if isinstance(image.get_calculator(), DeltaCalc):
-            image.info["parent energy"] = image.get_calculator().parent_results[
-                "energy"
-            ]
-            image.info["base energy"] = image.get_calculator().base_results["energy"]
-            image.info["parent fmax"] = np.max(
-                np.abs(image.get_calculator().parent_results["forces"])
+        calc = batch_images[0].calc
+        for image, (energy, forces) in zip(
+            batch_images, calc.calculate_batch(batch_images)
+        ):
+            attach_singlepoint(image, energy, forces)
+    pending = [image for image in pending if not isinstance(image.calc, sp)]
+
+    if executor is None or len(pending) < 2:
+        for image in pending:
+            energy, forces, info = get_singlepoint_results(image)
+            attach_singlepoint(image, energy, forces)
+        return images
+
+    executor, owned = get_executor(executor)
+    try:
+        # shared calculators are copied for thread and process pools alike,
+        # process pools would otherwise run pickled copies in the same directory
+        calc_counts = Counter(id(image.calc) for image in pending)
+        for i, image in enumerate(pending):
+            if calc_counts[id(image.calc)] > 1:
+                image.calc = copy_calc(image.calc, "image_" + str(i))
+        futures = [executor.submit(get_singlepoint_results, image) for image in pending]
+        for image, future in zip(pending, futures):
+            energy, forces, info = future.result()
+            image.info.update(info)
+            attach_singlepoint(image, energy, forces)
+    finally:
+        if owned:
+            executor.shutdown()
+
+    return images
+
+
+def copy_calc(calc, subdirectory):
+    """
+    Returns a copy of calc running in subdirectory of the directory of calc,
+    so copies of file based calculators (e.g. Vasp, Espresso) don't overwrite each other's files.
+    Calculators wrapped by calc in calc.calcs (e.g. DeltaCalc, LinearCombinationCalculator) are copied along,
+    each running in its own subdirectory calc_<j> of subdirectory.
+    Raises a ValueError for socket and interactive calculators, which can't be copied.
+    """
+    from ase.calculators.socketio import SocketIOCalculator
+
+    for wrapped_calc in get_wrapped_calcs(calc):
+        if (
+            isinstance(wrapped_calc, SocketIOCalculator)
+            or hasattr(wrapped_calc, "_pause_calc")
+            or "Interactive" in type(wrapped_calc).__name__
+        ):
+            raise ValueError(
+                "can't copy the socket or interactive calculator "
+                + type(wrapped_calc).__name__
+                + " to run images concurrently, attach a separate calculator to every image instead"
             )
+    calc_copy = copy.deepcopy(calc)
+    set_copy_directory(calc_copy, subdirectory)
+    return calc_copy
 
-        sp_calc = sp(atoms=image, energy=float(sample_energy), forces=sample_forces)
-        sp_calc.implemented_properties = ["energy", "forces"]
-        image.set_calculator(sp_calc)
-        # image.get_potential_energy()
-        # image.get_forces()
 
-        # image.calc.results["energy"] = float(image.calc.results["energy"])
+def get_wrapped_calcs(calc):
+    """
+    Returns calc and all calculators it wraps in calc.calcs, recursively.
+    """
+    calcs = [calc]
+    for wrapped_calc in getattr(calc, "calcs", []):
+        calcs += get_wrapped_calcs(wrapped_calc)
+    return calcs
 
-        # sp_calc = sp(atoms=image, **image.calc.results)
-        # sp_calc.implemented_properties = list(image.calc.results.keys())
 
-        # image.set_calculator(sp_calc)
-        singlepoint_images.append(image)
-        # os.chdir(cwd)
-        # os.system("rm -rf ./vasp_temp")
+def set_copy_directory(calc, subdirectory):
+    calc.directory = os.path.join(calc.directory, subdirectory)
+    for j, wrapped_calc in enumerate(getattr(calc, "calcs", [])):
+        set_copy_directory(wrapped_calc, os.path.join(subdirectory, "calc_" + str(j)))
 
-    return singlepoint_images
+
+def get_singlepoint_results(image):
+    """
+    Runs the calculator attached to image.
+    Returns the energy, the forces and the info dict of the image (which calculators may add to).
+    """
+    sample_energy = image.get_potential_energy(apply_constraint=False)
+    sample_forces = image.get_forces(apply_constraint=False)
+    if isinstance(image.get_calculator(), DeltaCalc):
+        image.info["parent energy"] = image.get_calculator().parent_results["energy"]
+        image.info["base energy"] = image.get_calculator().base_results["energy"]
+        image.info["parent fmax"] = np.max(
+            np.abs(image.get_calculator().parent_results["forces"])
+        )
+    return float(sample_energy), sample_forces, image.info
+
+
+def attach_singlepoint(image, energy, forces):
+    sp_calc = sp(atoms=image, energy=float(energy), forces=forces)
+    sp_calc.implemented_properties = ["energy", "forces"]
+    image.set_calculator(sp_calc)
 
 
-def compute_with_calc(images, calculator):
+def get_executor(executor):
+    """
+    Returns the executor to use and whether it was created here (and should be shut down after use).
+    """
+    if executor == "thread":
+        return ThreadPoolExecutor(), True
+    elif executor == "process":
+        return ProcessPoolExecutor(), True
+    elif isinstance(executor, Executor):
+        return executor, False
+    raise ValueError("invalid executor given (" + str(executor) + ")")
+
+
+def compute_with_calc(images, calculator, executor=None, inplace=False):
     """
     Calculates forces and energies of images with calculator.
     Returned images have singlepoint calculators.
@@ -75,15 +179,22 @@ def compute_with_calc(images, calculator):
         List of ase atoms images to be calculated.
     calculator: ase Calculator object
         Calculator used to get forces and energies.
+    executor: concurrent.futures.Executor or str
+        Executor to run the calculations concurrently, see convert_to_singlepoint.
+    inplace: bool
+        If True, calculator is attached to the given images instead of copies of them.
     """
 
-    images = copy_images(images)
+    if not inplace:
+        images = copy_images(images)
     for image in images:
         image.set_calculator(calculator)
-    return convert_to_singlepoint(images)
+    return convert_to_singlepoint(images, executor=executor, inplace=True)
 
 
-def subtract_deltas(images, base_calc, refs):
+def subtract_deltas(
+    images, base_calc, refs, executor=None, inplace=False, base_cache=None
+):
     """
     Produces the delta values of the image with precalculated values.
     This function is intended to be used by images that have
@@ -103,14 +214,28 @@ def subtract_deltas(images, base_calc, refs):
     refs: list
         List of two images, they have results from parent and base calc
         respectively
+    executor: concurrent.futures.Executor or str
+        Executor to run the base calculations concurrently, see convert_to_singlepoint.
+        The base calc is copied for every image in that case (see copy_calc).
+    inplace: bool
+        If True, the calculators of the given images are replaced instead of on copies of them.
+    base_cache: ResultCache
+        Cache of the base calc results shared with other delta calcs (see DeltaCalc),
+        so geometries already evaluated with the base calc are not evaluated again.
     """
 
-    images = copy_images(images)
-    for image in images:
+    if not inplace:
+        images = copy_images(images)
+    for i, image in enumerate(images):
         parent_calc_sp = image.calc
-        delta_sub_calc = DeltaCalc([parent_calc_sp, base_calc], "sub", refs)
+        image_base_calc = base_calc
+        if executor is not None and len(images) > 1:
+            image_base_calc = copy_calc(base_calc, "image_" + str(i))
+        delta_sub_calc = DeltaCalc(
+            [parent_calc_sp, image_base_calc], "sub", refs, base_cache=base_cache
+        )
         image.set_calculator(delta_sub_calc)
-    return convert_to_singlepoint(images)
+    return convert_to_singlepoint(images, executor=executor, inplace=True)
 
 
 def copy_images(images):
@@ -194,6 +319,42 @@ def write_to_db_online(
         )
 
 
+def get_structure_hash(atoms, key="", decimals=4):
+    """
+    Returns a hash of the structure (atomic numbers, positions and cell rounded to decimals, pbc and tags)
+    and of key, to identify structures stored in ase dbs.
+    """
+    sha = hashlib.sha256()
+    sha.update(key.encode())
+    sha.update(atoms.get_atomic_numbers().tobytes())
+    sha.update(np.round(atoms.positions, decimals).tobytes())
+    sha.update(np.round(atoms.cell.array, decimals).tobytes())
+    sha.update(atoms.pbc.tobytes())
+    sha.update(atoms.get_tags().tobytes())
+    return sha.hexdigest()
+
+
+def write_unique_row(database, image, unique_hash, **key_value_pairs):
+    """
+    Writes image to the ase db with the hash (e.g. of get_structure_hash) as unique id,
+    unless a row with that unique id is stored already. Returns whether the row was written.
+    The random unique id of ase db is not safe here, the logger reseeds random every step.
+    A row written by another process between the check and the write is skipped as well.
+    """
+    unique_id = unique_hash[:32]
+    if database.count(unique_id=unique_id) > 0:
+        return False
+    row = AtomsRow(image)
+    row.unique_id = unique_id
+    row.ctime = now()
+    row.user = os.getenv("USER")
+    try:
+        database.write(row, **key_value_pairs)
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
 def calculate_rmsd(img1, img2):
     """
     Calculate rmsd between two images.
@@ -240,6 +401,7 @@ def calculate_surface_k_points(atoms):
 
 
 def asedb_row_to_atoms(row, calc="parent"):
+    # the retrained results are only logged with the learner param logger: retrained_prediction
     image = row.toatoms()
     # get the energy and the forces string
     if calc == "parent":
@@ -249,6 +411,13 @@ def asedb_row_to_atoms(row, calc="parent"):
         sample_energy = row.ml_energy
         sample_forces = row.ml_forces
     elif calc == "retrained":
+        if row.get("retrained_energy") is None or row.get("retrained_forces") is None:
+            raise ValueError(
+                "row "
+                + str(row.id)
+                + " has no retrained results, they are only logged with the learner param "
+                + "logger: {'retrained_prediction': True}"
+            )
         sample_energy = row.retrained_energy
         sample_forces = row.retrained_forces
     else:
@@ -300,6 +469,8 @@ def add_hookean_constraint(
         the bond is 30% over the bond length, apply the restorative force.
     """
 
+    from pymatgen.core.bonds import _load_bond_length_data
+
     bond_lengths = _load_bond_length_data()
     ana = Analysis(image)
     cons = image.constraints